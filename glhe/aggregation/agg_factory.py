@@ -1,4 +1,6 @@
 from glhe.aggregation.dynamic import Dynamic
+from glhe.aggregation.hierarchical import Hierarchical
+from glhe.aggregation.mlaa import MLAA
 from glhe.aggregation.no_agg import NoAgg
 from glhe.aggregation.static import Static
 from glhe.input_processor.input_processor import InputProcessor
@@ -16,10 +18,17 @@ def make_agg_method(inputs: dict, ip: InputProcessor):
 
     method = inputs['method']
     if method == 'static':
+        inputs = merge_dicts(inputs, {'runtime': ip.input_dict['simulation']['runtime']})
         return Static(inputs)
     elif method == 'dynamic':
         inputs = merge_dicts(inputs, {'runtime': ip.input_dict['simulation']['runtime']})
         return Dynamic(inputs)
+    elif method == 'hierarchical':
+        inputs = merge_dicts(inputs, {'runtime': ip.input_dict['simulation']['runtime']})
+        return Hierarchical(inputs)
+    elif method == 'mlaa':
+        inputs = merge_dicts(inputs, {'runtime': ip.input_dict['simulation']['runtime']})
+        return MLAA(inputs)
     elif method == 'none':
         return NoAgg(inputs)
     else:
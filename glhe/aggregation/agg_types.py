@@ -6,3 +6,5 @@ class AggregationTypes(Enum):
     STATIC = 'STATIC'
     SUB_HOUR = 'SUB-HOUR'
     DYNAMIC = 'DYNAMIC'
+    HIERARCHICAL = 'HIERARCHICAL'
+    MLAA = 'MLAA'
@@ -0,0 +1,300 @@
+from abc import abstractmethod
+from math import ceil
+from typing import Union
+
+import numpy as np
+
+from glhe.aggregation.base_agg import BaseAgg
+from glhe.aggregation.sub_hourly import SubHour
+from glhe.utilities.constants import SEC_IN_HOUR
+
+
+class BinnedAgg(BaseAgg):
+    """
+    Base class for aggregation methods which close the energy rolled off of the sub-hourly method into fixed bins.
+
+    Energy which rolls off of the sub-hourly method is collected in an 'open' bin. Each time it spans the closing
+    duration, its oldest part is closed and handed to the derived method, which then lays out the closed bins.
+
+    The closed bins are held in preallocated buffers, followed by the open bin. The closed bins are only gathered,
+    and their g-function values only evaluated, when the layout changes. The history of the closed bins, and the
+    g-function value of the open bin, are then found for all of the time steps until the next bin is closed, and
+    looked up by the number of time steps since. The g-function values of the sub-hourly bins are cached for each
+    layout of the sub-hourly bins. So each time step only needs the lookups plus a dot product over the open and
+    sub-hourly bins, whose loads are held in preallocated buffers.
+    """
+
+    def __init__(self, inputs: dict, dt_close: int, capacity: int):
+        """
+        :param inputs: load aggregation inputs
+        :param dt_close: time spanned by each bin closed from the open bin, in seconds
+        :param capacity: initial number of closed bins the buffers can hold
+        """
+
+        BaseAgg.__init__(self, inputs)
+
+        # sub-hourly tracker for the first hour
+        self.sub_hr = SubHour(inputs)
+
+        # open bin collecting the energy rolled off of the sub-hourly method
+        self.open_energy = 0
+        self.open_dt = 0
+        self.dt_close = dt_close
+
+        # total time spanned by all closed bins
+        self.closed_time = 0
+
+        # closed bins, ordered oldest to newest, followed by the open bin
+        self.energy_buf = np.zeros(capacity + 1, dtype=float)
+        self.dts_buf = np.zeros(capacity + 1, dtype=float)
+        self.set_closed_bins(0)
+
+        # load of the newest closed bin, the open bin, and the sub-hourly bins, and the change in load between them
+        self.q_buf = np.zeros(self.sub_hr.capacity + 2, dtype=float)
+        self.dq_buf = np.zeros(self.sub_hr.capacity + 1, dtype=float)
+
+        # g-function values of the sub-hourly bins, keyed on the time step, flow rate, and sub-hourly bin widths
+        self.sub_hr_cache = {}
+        self.max_cache_size = 64
+
+    @abstractmethod
+    def close_bin(self, energy: float):
+        """
+        Log a bin closed from the open bin
+
+        :param energy: bin energy, in Joules
+        """
+        pass  # pragma: no cover
+
+    @abstractmethod
+    def update_closed_bins(self):
+        """
+        Lay out the closed bins after one or more bins have been closed. Derived methods write the closed bins
+        into the buffers, ordered oldest to newest, then call 'set_closed_bins'.
+        """
+        pass  # pragma: no cover
+
+    def reserve(self, num_closed: int):
+        """
+        Make sure the buffers can hold the closed bins, plus the open bin
+
+        :param num_closed: number of closed bins
+        """
+
+        if num_closed + 1 > self.energy_buf.size:
+            self.energy_buf = np.zeros(2 * (num_closed + 1), dtype=float)
+            self.dts_buf = np.zeros(2 * (num_closed + 1), dtype=float)
+
+    def set_closed_bins(self, num_closed: int):
+        """
+        Set the views of the closed bins written to the buffers, and reset the cached history
+
+        :param num_closed: number of closed bins
+        """
+
+        self.energy_buf[num_closed] = self.open_energy
+        self.dts_buf[num_closed] = self.open_dt
+
+        # closed bins, then the open bin
+        self.energy = self.energy_buf[:num_closed + 1]
+        self.dts = self.dts_buf[:num_closed + 1]
+        self.closed_energy = self.energy[:-1]
+        self.closed_dts = self.dts[:-1]
+
+        # change in load between the closed bins, and the time from the start of each closed bin to the newest edge
+        self.closed_q = self.closed_energy / self.closed_dts
+        self.closed_dq = np.diff(self.closed_q, prepend=0)
+        self.closed_times = np.flipud(np.cumsum(np.flipud(self.closed_dts)))
+
+        # time from the start of each closed bin, and of the open bin, to the newest closed edge
+        self.edge_times = np.append(self.closed_times, 0)
+
+        # history of the closed bins and g-function values of the open bin, keyed on the time step and flow rate
+        self.hist_cache = {}
+
+    def aggregate(self, time: int, energy: float):
+        """
+        Aggregate energy. Check for a new time step and aggregate.
+
+        :param time: end sim time of energy value, in seconds. This should be the current sim time.
+        :param energy: energy to be logged, in Joules
+        """
+
+        # check for iteration
+        if self.prev_update_time == time:
+            return
+
+        # run through sub-hourly method to track the first hour
+        e_1 = self.sub_hr.aggregate(time, energy)
+
+        # the open bin spans everything between the closed bins and the first hour
+        self.open_energy += e_1
+        self.open_dt = max(time - SEC_IN_HOUR - self.closed_time, 0)
+
+        # close the oldest part of the open bin once it spans the closing duration
+        dt_bin = self.dt_close
+        if self.open_dt >= dt_bin:
+            while self.open_dt >= dt_bin:
+                e_bin = self.open_energy * dt_bin / self.open_dt
+                self.open_energy -= e_bin
+                self.open_dt -= dt_bin
+                self.closed_time += dt_bin
+                self.close_bin(e_bin)
+
+            self.update_closed_bins()
+        else:
+            self.energy[-1] = self.open_energy
+            self.dts[-1] = self.open_dt
+
+        # update time
+        self.prev_update_time = time
+
+    def calc_closed_history(self, time_step: int, offset: float, flow_rate: float = None) -> tuple:
+        """
+        Temporal superposition of the closed bins, and the g-function values of the open bin. These are found for all
+        of the time steps until the next bin is closed at once, assuming the time step stays the same, and cached
+        until the next bin is closed. Later time steps are looked up by the number of time steps since.
+
+        :param time_step: time step, in seconds
+        :param offset: time from the newest closed bin edge to the end of the current time step, in seconds
+        :param flow_rate: flow rate, in kg/s
+        :return: tuple of the g-function and g_b-function history, and the open bin g-function and g_b-function
+        values. g_b-function values are zero if not used.
+        """
+
+        # nothing to do until the open bin starts to fill
+        if self.closed_dq.size == 0 and self.open_dt == 0:
+            return 0, 0, 0, 0
+
+        key = (time_step, flow_rate)
+        if key in self.hist_cache:
+            start_offset, hist = self.hist_cache[key]
+            steps = (offset - start_offset) / time_step
+            idx = int(round(steps))
+            if abs(steps - idx) < 1e-9 and 0 <= idx < hist.shape[0]:
+                return tuple(hist[idx].tolist())
+
+        # the open bin grows by one time step each step until the next bin is closed
+        # if the cache was already filled for other inputs, only find the current time step
+        if self.hist_cache and key not in self.hist_cache:
+            num_steps = 1
+        else:
+            num_steps = max(int(ceil((self.dt_close - self.open_dt) / time_step)), 1)
+
+        # bound the cache when the inputs keep changing
+        if len(self.hist_cache) >= self.max_cache_size:
+            self.hist_cache.clear()
+
+        offsets = offset + np.arange(num_steps) * time_step
+        lntts = np.log((self.edge_times[np.newaxis, :] + offsets[:, np.newaxis]) / self.ts)
+
+        # columns hold the g-function and g_b-function history, then the open bin values
+        hist = np.zeros((num_steps, 4), dtype=float)
+        g = self.interp_g(lntts)
+        hist[:, 0] = np.dot(g[:, :-1], self.closed_dq)
+        hist[:, 2] = g[:, -1]
+
+        if self.interp_g_b:
+            if not flow_rate:
+                g_b = self.interp_g_b(lntts)
+            else:
+                g_b = self.interp_g_b(lntts, flow_rate)
+            hist[:, 1] = np.dot(g_b[:, :-1], self.closed_dq)
+            hist[:, 3] = g_b[:, -1]
+
+        self.hist_cache[key] = (offset, hist)
+        return tuple(hist[0].tolist())
+
+    def calc_sub_hour_g_values(self, time_step: int, flow_rate: float = None) -> tuple:
+        """
+        g-function values of the sub-hourly bins, referenced from the end of the current time step. These are cached
+        for each layout of the sub-hourly bins, which repeats every time step for uniform time steps.
+
+        :param time_step: time step, in seconds
+        :param flow_rate: flow rate, in kg/s
+        :return: tuple of the g-function and g_b-function values. g_b-function values are None if not used.
+        """
+
+        # bin widths are whole seconds, so they are keyed as integers
+        dts = self.sub_hr.dts
+        key = (time_step, flow_rate, np.rint(dts).astype(np.int64).tobytes())
+
+        try:
+            return self.sub_hr_cache[key]
+        except KeyError:
+            pass
+
+        # bound the cache when the inputs keep changing
+        if len(self.sub_hr_cache) >= self.max_cache_size:
+            self.sub_hr_cache.clear()
+
+        times = np.flipud(np.cumsum(np.flipud(dts))) + time_step
+        lntts = np.log(times / self.ts)
+        g = self.interp_g(lntts)
+
+        g_b = None
+        if self.interp_g_b:
+            if not flow_rate:
+                g_b = self.interp_g_b(lntts)
+            else:
+                g_b = self.interp_g_b(lntts, flow_rate)
+
+        self.sub_hr_cache[key] = (g, g_b)
+        return g, g_b
+
+    def calc_temporal_superposition(self, time_step: int, flow_rate: float = None) -> Union[float, tuple]:
+
+        # compute temporal superposition
+        # this includes all thermal history before the present time
+        # closed bins, referenced from the end of the current time step
+        offset = self.open_dt + self.sub_hr.total_time + time_step
+        hist_g, hist_g_b, g_open, g_b_open = self.calc_closed_history(time_step, offset, flow_rate)
+        g_sub, g_b_sub = self.calc_sub_hour_g_values(time_step, flow_rate)
+
+        # load of the newest closed bin, then the open bin, then the sub-hourly bins. the open bin is skipped when
+        # empty.
+        num_sub = self.sub_hr.energy.size
+        if self.q_buf.size < num_sub + 2:
+            self.q_buf = np.zeros(2 * (num_sub + 2), dtype=float)
+            self.dq_buf = np.zeros(2 * (num_sub + 2) - 1, dtype=float)
+
+        q = self.q_buf
+        q[0] = self.closed_q[-1] if self.closed_q.size else 0
+        open_bin = self.open_dt > 0
+        start = 1
+        if open_bin:
+            q[1] = self.open_energy / self.open_dt
+            start = 2
+
+        end = start + num_sub
+        np.divide(self.sub_hr.energy, self.sub_hr.dts, out=q[start:end])
+        dq = np.subtract(q[1:end], q[:end - 1], out=self.dq_buf[:end - 1])
+
+        # convolution of delta_q and the g-function values
+        sum_g = hist_g + float(np.dot(dq[start - 1:], g_sub))
+        if open_bin:
+            sum_g += dq[0] * g_open
+
+        if self.interp_g_b:
+            # convolution for "g" and "g_b" g-functions
+            sum_g_b = hist_g_b + float(np.dot(dq[start - 1:], g_b_sub))
+            if open_bin:
+                sum_g_b += dq[0] * g_b_open
+            return sum_g, sum_g_b
+        else:
+            # convolution for "g" g-functions only
+            return sum_g
+
+    def get_g_value(self, time_step: int) -> float:
+        lntts = np.log(time_step / self.ts)
+        return float(self.interp_g(lntts))
+
+    def get_g_b_value(self, time_step: int, flow_rate: float = None) -> float:
+        lntts = np.log(time_step / self.ts)
+        if not flow_rate:
+            return float(self.interp_g_b(lntts))
+        else:
+            return float(self.interp_g_b(lntts, flow_rate))
+
+    def get_q_prev(self) -> float:
+        return float(self.sub_hr.energy[-1] / self.sub_hr.dts[-1])
@@ -36,6 +36,23 @@ class Dynamic(BaseAgg):
         except KeyError:  # pragma: no cover
             self.bins_per_level = 9  # pragma: no cover
 
+        # resolution used to bucket flow rates when looking up cached g_b-function values. apply default if needed.
+        # flow rates are not bucketed if zero.
+        try:
+            self.flow_rate_resolution = inputs['flow-rate-resolution']
+        except KeyError:
+            self.flow_rate_resolution = 1e-6
+
+        # memoized g-function values, keyed on the time step, sub-hourly bin layout, and flow rate bucket
+        # the long time step bin widths never change, so these only need refreshed when the layout changes
+        self.g_cache = {}
+
+        # memoized single g-function and g_b-function values, keyed on the function, time step, and flow rate bucket
+        self.g_value_cache = {}
+
+        # both caches are cleared when they reach this size
+        self.max_cache_size = 256
+
         # total simulation runtime to make available for method
         run_time = inputs['runtime']
 
@@ -92,6 +109,56 @@ class Dynamic(BaseAgg):
         # update time
         self.prev_update_time = time
 
+    def get_flow_bucket(self, flow_rate: float = None) -> Union[float, None]:
+        """
+        Bucket the flow rate for g_b-function value lookups. g_b-function values are evaluated at the bucket value.
+
+        :param flow_rate: flow rate, in kg/s
+        :return: flow rate bucket, or None if the flow rate is not set
+        """
+
+        if not flow_rate:
+            return None
+        elif self.flow_rate_resolution <= 0:
+            return flow_rate
+        return round(flow_rate / self.flow_rate_resolution) * self.flow_rate_resolution
+
+    def get_g_vectors(self, time_step: int, flow_rate: float = None) -> tuple:
+        """
+        Get the g-function and g_b-function values for all bins, referenced from the end of the current time step.
+
+        :param time_step: time step, in seconds
+        :param flow_rate: flow rate, in kg/s
+        :return: tuple of g-function values and g_b-function values. g_b-function values are None if not used.
+        """
+
+        flow_bucket = self.get_flow_bucket(flow_rate)
+        key = (time_step, flow_bucket, self.sub_hr.dts.tobytes())
+
+        try:
+            return self.g_cache[key]
+        except KeyError:
+            pass
+
+        # bound the cache when the sub-hourly layout keeps changing, e.g. for irregular time steps
+        if len(self.g_cache) >= self.max_cache_size:
+            self.g_cache.clear()
+
+        dts = np.append(np.concatenate((self.dts, self.sub_hr.dts)), time_step)
+        times = np.flipud(np.cumsum(np.flipud(dts)))[:-1]
+        lntts = np.log(times / self.ts)
+        g = self.interp_g(lntts)
+
+        g_b = None
+        if self.interp_g_b:
+            if not flow_bucket:
+                g_b = self.interp_g_b(lntts)
+            else:
+                g_b = self.interp_g_b(lntts, flow_bucket)
+
+        self.g_cache[key] = (g, g_b)
+        return g, g_b
+
     def calc_temporal_superposition(self, time_step: int, flow_rate: float = None) -> Union[float, tuple]:
 
         # compute temporal superposition
@@ -102,33 +169,52 @@ class Dynamic(BaseAgg):
         dq = np.diff(q, prepend=0)
 
         # g-function values
-        dts = np.append(np.concatenate((self.dts, self.sub_hr.dts)), time_step)
-        times = np.flipud(np.cumsum(np.flipud(dts)))[:-1]
-        lntts = np.log(times / self.ts)
-        g = self.interp_g(lntts)
+        g, g_b = self.get_g_vectors(time_step, flow_rate)
 
         # convolution of delta_q and the g-function values
         if self.interp_g_b:
             # convolution for "g" and "g_b" g-functions
-            if not flow_rate:
-                g_b = self.interp_g_b(lntts)
-            else:
-                g_b = np.flipud(self.interp_g_b(lntts, flow_rate))
             return float(np.dot(dq, g)), float(np.dot(dq, g_b))
         else:
             # convolution for "g" g-functions only
             return float(np.dot(dq, g))
 
     def get_g_value(self, time_step: int) -> float:
+        key = ('g', time_step, None)
+
+        try:
+            return self.g_value_cache[key]
+        except KeyError:
+            pass
+
+        if len(self.g_value_cache) >= self.max_cache_size:
+            self.g_value_cache.clear()
+
         lntts = np.log(time_step / self.ts)
-        return float(self.interp_g(lntts))
+        g = float(self.interp_g(lntts))
+        self.g_value_cache[key] = g
+        return g
 
     def get_g_b_value(self, time_step: int, flow_rate: float = None) -> float:
+        flow_bucket = self.get_flow_bucket(flow_rate)
+        key = ('g_b', time_step, flow_bucket)
+
+        try:
+            return self.g_value_cache[key]
+        except KeyError:
+            pass
+
+        # bound the cache when the flow rate keeps changing
+        if len(self.g_value_cache) >= self.max_cache_size:
+            self.g_value_cache.clear()
+
         lntts = np.log(time_step / self.ts)
-        if not flow_rate:
-            return float(self.interp_g_b(lntts))
+        if not flow_bucket:
+            g_b = float(self.interp_g_b(lntts))
         else:
-            return float(self.interp_g_b(lntts, flow_rate))
+            g_b = float(self.interp_g_b(lntts, flow_bucket))
+        self.g_value_cache[key] = g_b
+        return g_b
 
     def get_q_prev(self) -> float:
         return float(self.sub_hr.energy[-1] / self.sub_hr.dts[-1])
@@ -0,0 +1,293 @@
+from bisect import bisect_right
+from math import floor
+from typing import Union
+
+import numpy as np
+
+
+class GFunctionTable(object):
+    """
+    g-function lookup table for linear interpolation, with linear extrapolation beyond the data.
+
+    The range of the data is split into a uniform ln(t/ts) grid, with cells no wider than the smallest interval
+    in the data, and the data interval at the start of each cell is stored. A lookup is then direct index arithmetic
+    on the grid, plus at most one step forward to the next data interval, followed by linear blending. For data
+    which is already uniformly spaced, the grid and the data intervals are the same. Values outside of the data are
+    linearly extrapolated from the first and last data intervals.
+    """
+
+    max_num_cells = 1000000
+
+    def __init__(self, lntts: Union[list, np.ndarray], g: Union[list, np.ndarray]):
+        """
+        :param lntts: ln(t/ts) data
+        :param g: corresponding g-function data
+        """
+
+        lntts = np.asarray(lntts, dtype=float)
+        g = np.asarray(g, dtype=float)
+
+        if lntts.ndim != 1 or lntts.shape != g.shape:
+            raise ValueError('Number of lntts and g elements is not consistent')
+
+        lntts, idx = np.unique(lntts, return_index=True)
+        g = g[idx]
+
+        if lntts.size < 2:
+            raise ValueError('At least 2 unique lntts values are required')
+
+        self.lntts = lntts
+        self.g = g
+        self.max_idx = lntts.size - 2
+
+        # slope and intercept of each data interval
+        intervals = np.diff(lntts)
+        self.slopes = np.diff(g) / intervals
+        self.intercepts = g[:-1] - self.slopes * lntts[:-1]
+
+        # start of the next data interval, for each data interval
+        self.next_lntts = np.append(lntts[1:-1], np.inf)
+
+        # uniform grid over the data
+        span = lntts[-1] - lntts[0]
+        if np.allclose(intervals, intervals[0], rtol=1e-9, atol=0):
+            num_cells = lntts.size - 1
+        else:
+            num_cells = int(floor(span / np.min(intervals))) + 1
+
+        # grid cells can only hold more than one data point when the grid size is limited
+        self.is_single_step = num_cells <= self.max_num_cells
+        num_cells = min(num_cells, self.max_num_cells)
+
+        self.x_0 = float(lntts[0])
+        self.inv_dx = num_cells / span
+
+        # data interval at the start of each grid cell
+        cell_starts = self.x_0 + np.arange(num_cells + 1) / self.inv_dx
+        self.cell_idx = np.searchsorted(lntts, cell_starts, side='right') - 1
+        np.clip(self.cell_idx, 0, self.max_idx, out=self.cell_idx)
+        self.max_cell = num_cells
+
+    @classmethod
+    def from_csv(cls, data_path: str):
+        """
+        Load the table from a csv file with columnated data, e.g. 'lntts1,g1'
+
+        :param data_path: path to csv file
+        :return: initialized GFunctionTable object
+        """
+
+        data = np.genfromtxt(data_path, delimiter=',')
+        _, num_col = data.shape
+
+        if num_col != 2:
+            raise ValueError("Number of columns in '{}' must be 2".format(data_path))
+
+        return cls(data[:, 0], data[:, 1])
+
+    def get_index(self, lntts: float) -> int:
+        """
+        Find the data interval for a single ln(t/ts) value
+
+        :param lntts: ln(t/ts) value
+        :return: data interval index
+        """
+
+        cell = min(max(int(floor((lntts - self.x_0) * self.inv_dx)), 0), self.max_cell)
+        idx = self.cell_idx[cell]
+
+        # step forward when data points fall inside the grid cell
+        while lntts >= self.next_lntts[idx]:
+            idx += 1
+        return idx
+
+    def get_indices(self, lntts: np.ndarray) -> np.ndarray:
+        """
+        Find the data intervals for an array of ln(t/ts) values
+
+        :param lntts: array of ln(t/ts) values
+        :return: array of data interval indices
+        """
+
+        if self.is_single_step:
+            # clamp to the grid before truncating, so truncation is the same as flooring
+            cell = (lntts - self.x_0) * self.inv_dx
+            np.maximum(cell, 0, out=cell)
+            np.minimum(cell, self.max_cell, out=cell)
+            idx = self.cell_idx[cell.astype(int)]
+
+            # step forward when a data point falls inside the grid cell
+            idx += lntts >= self.next_lntts[idx]
+        else:
+            # grid cells may hold several data points, so fall back to a search
+            idx = np.searchsorted(self.lntts, lntts, side='right') - 1
+            np.maximum(idx, 0, out=idx)
+            np.minimum(idx, self.max_idx, out=idx)
+
+        return idx
+
+    def __call__(self, lntts: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """
+        Look up g-function values
+
+        :param lntts: ln(t/ts) value, or array of values
+        :return: g-function value, or array of values with the same shape as the input
+        """
+
+        if np.ndim(lntts) == 0:
+            lntts = float(lntts)
+            idx = self.get_index(lntts)
+            return float(self.g[idx] + (lntts - self.lntts[idx]) * self.slopes[idx])
+
+        lntts = np.asarray(lntts, dtype=float)
+        idx = self.get_indices(lntts)
+        return self.intercepts[idx] + lntts * self.slopes[idx]
+
+
+class GFunctionFlowTable(GFunctionTable):
+    """
+    Flow dependent g_b-function lookup table, for bilinear interpolation over ln(t/ts) and flow rate.
+
+    The ln(t/ts) lookup uses the same uniform grid as GFunctionTable. For each flow rate, the bracketing flow rate
+    series and the blending weight between them are found once, and the blended interval coefficients are cached,
+    so a query for a vector of ln(t/ts) values at one flow rate costs the same as a 1-D lookup.
+    Values outside of the data are clamped to the nearest data edge, in both ln(t/ts) and flow rate.
+    """
+
+    max_cache_size = 64
+
+    def __init__(self, lntts: Union[list, np.ndarray], flow_rates: Union[list, np.ndarray],
+                 g_b: Union[list, np.ndarray]):
+        """
+        :param lntts: ln(t/ts) data
+        :param flow_rates: flow rate of each g_b-function data series
+        :param g_b: g_b-function data, with one row for each ln(t/ts) value and one column for each flow rate
+        """
+
+        lntts = np.asarray(lntts, dtype=float)
+        flow_rates = np.asarray(flow_rates, dtype=float)
+        g_b = np.asarray(g_b, dtype=float)
+
+        if lntts.ndim != 1 or flow_rates.ndim != 1 or g_b.shape != (lntts.size, flow_rates.size):
+            raise ValueError('Number of lntts, flow rate, and g_b elements is not consistent')
+
+        lntts, idx = np.unique(lntts, return_index=True)
+        flow_rates, idx_flow = np.unique(flow_rates, return_index=True)
+        g_b = g_b[idx][:, idx_flow]
+
+        GFunctionTable.__init__(self, lntts, g_b[:, 0])
+
+        self.flow_rates = flow_rates
+        self.flow_rates_list = flow_rates.tolist()
+        self.max_flow_idx = max(flow_rates.size - 2, 0)
+        self.lntts_min = float(lntts[0])
+        self.lntts_max = float(lntts[-1])
+
+        # slope and intercept of each data interval, for each flow rate series.
+        # stored with the flow rate series along the first axis so each series is contiguous.
+        g_b = np.transpose(g_b)
+        self.flow_slopes = np.diff(g_b, axis=1) / np.diff(lntts)
+        self.flow_intercepts = g_b[:, :-1] - self.flow_slopes * lntts[:-1]
+
+        # blended interval coefficients for each flow rate
+        self.flow_cache = {}
+
+        # queries are clamped to the data, so the grid cells don't need to be clamped.
+        # pad the cells in case the last data point rounds up into the next cell.
+        self.cell_idx = np.append(self.cell_idx, self.cell_idx[-1])
+
+    @classmethod
+    def from_csv(cls, data_path: str, flow_rates: list):
+        """
+        Load the table from a csv file with columnated data, e.g. 'lntts1,g_b1,g_b2,...,g_bn'
+
+        :param data_path: path to csv file
+        :param flow_rates: flow rate for each g_b-function data column
+        :return: initialized GFunctionFlowTable object
+        """
+
+        data = np.genfromtxt(data_path, delimiter=',', ndmin=2)
+        _, num_col = data.shape
+
+        if num_col - 1 != len(flow_rates):
+            raise ValueError("Number of columns in '{}' inconsistent with flow rates".format(data_path))
+
+        return cls(data[:, 0], flow_rates, data[:, 1:])
+
+    def get_flow_weights(self, flow_rate: float) -> tuple:
+        """
+        Find the bracketing flow rate series and the blending weight of the upper series
+
+        :param flow_rate: flow rate
+        :return: tuple of lower series index, upper series index, and upper series weight
+        """
+
+        if self.flow_rates.size == 1:
+            return 0, 0, 0.0
+
+        flow_rates = self.flow_rates_list
+        flow_rate = min(max(flow_rate, flow_rates[0]), flow_rates[-1])
+        idx = min(bisect_right(flow_rates, flow_rate) - 1, self.max_flow_idx)
+        flow_lo = flow_rates[idx]
+        flow_hi = flow_rates[idx + 1]
+        return idx, idx + 1, (flow_rate - flow_lo) / (flow_hi - flow_lo)
+
+    def get_flow_coefficients(self, flow_rate: float) -> tuple:
+        """
+        Get the intercept and slope of each data interval, blended for the flow rate
+
+        :param flow_rate: flow rate
+        :return: tuple of intercept and slope arrays
+        """
+
+        try:
+            return self.flow_cache[flow_rate]
+        except KeyError:
+            pass
+
+        # bound the cache when the flow rate keeps changing
+        if len(self.flow_cache) >= self.max_cache_size:
+            self.flow_cache.clear()
+
+        idx_lo, idx_hi, w = self.get_flow_weights(flow_rate)
+        if w == 0:
+            coefficients = (self.flow_intercepts[idx_lo], self.flow_slopes[idx_lo])
+        else:
+            intercepts = (1 - w) * self.flow_intercepts[idx_lo] + w * self.flow_intercepts[idx_hi]
+            slopes = (1 - w) * self.flow_slopes[idx_lo] + w * self.flow_slopes[idx_hi]
+            coefficients = (intercepts, slopes)
+
+        self.flow_cache[flow_rate] = coefficients
+        return coefficients
+
+    def __call__(self, lntts: Union[float, np.ndarray], flow_rate: float = None) -> Union[float, np.ndarray]:
+        """
+        Look up g_b-function values
+
+        :param lntts: ln(t/ts) value, or array of values
+        :param flow_rate: flow rate. if not given, the lowest flow rate series is used.
+        :return: g_b-function value, or array of values with the same shape as the input
+        """
+
+        if flow_rate is None:
+            flow_rate = self.flow_rates[0]
+
+        intercepts, slopes = self.get_flow_coefficients(flow_rate)
+
+        if np.ndim(lntts) == 0:
+            lntts = min(max(float(lntts), self.lntts_min), self.lntts_max)
+            idx = self.get_index(lntts)
+            return float(intercepts[idx] + lntts * slopes[idx])
+
+        lntts = np.maximum(lntts, self.lntts_min)
+        np.minimum(lntts, self.lntts_max, out=lntts)
+
+        if self.is_single_step:
+            idx = self.cell_idx[((lntts - self.x_0) * self.inv_dx).astype(int)]
+
+            # step forward when a data point falls inside the grid cell
+            idx += lntts >= self.next_lntts[idx]
+        else:
+            idx = self.get_indices(lntts)
+
+        return intercepts[idx] + lntts * slopes[idx]
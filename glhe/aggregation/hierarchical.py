@@ -0,0 +1,37 @@
+from glhe.aggregation.agg_types import AggregationTypes
+from glhe.aggregation.static import Static
+from glhe.utilities.functions import merge_dicts
+
+
+class Hierarchical(Static):
+    """
+    Hierarchical load aggregation method.
+
+    Liu, X. 2005. 'Development and experimental validation of simulation of hydronic snow melting systems
+    for bridges.' Ph.D. Thesis. Oklahoma State University, Stillwater, OK.
+
+    Loads are aggregated into blocks of increasing duration. Blocks of each level are only aggregated into
+    the next level once the level's waiting period has passed. This is the same bin handling as the static method,
+    with the waiting periods as the minimum number of bins for each level, so the blocks are kept in the same
+    preallocated circular buffers and the history of the closed blocks is only evaluated when a block is closed.
+    The waiting period of the last level is not used.
+    """
+
+    Type = AggregationTypes.HIERARCHICAL
+
+    def __init__(self, inputs):
+
+        # set the block durations for each level. apply default if needed.
+        try:
+            dts_blocks = inputs['block-durations-in-hours']
+        except KeyError:
+            dts_blocks = [1, 24, 120, 8760]
+
+        # set the waiting period, in number of blocks, for each level. apply default if needed.
+        try:
+            waiting_periods = inputs['waiting-periods']
+        except KeyError:
+            waiting_periods = [12, 3, 40, 3]
+
+        Static.__init__(self, merge_dicts(inputs, {'bin-durations-in-hours': dts_blocks,
+                                                   'minimum-num-bins-for-each-level': waiting_periods}))
@@ -0,0 +1,102 @@
+from math import ceil
+
+import numpy as np
+
+from glhe.aggregation.agg_types import AggregationTypes
+from glhe.aggregation.binned_agg import BinnedAgg
+from glhe.utilities.constants import SEC_IN_HOUR
+
+
+class MLAA(BinnedAgg):
+    """
+    Multiple load aggregation algorithm.
+
+    Bernier, M.A., Labib, R., Pinel, P., and Paillot, R. 2004. 'A multiple load aggregation algorithm
+    for annual hourly simulations of GCHP systems.' HVAC&R Research, 10(4): 471-487.
+
+    Hourly loads are aggregated into immediate, daily, weekly, and monthly blocks, by default. Blocks are
+    referenced back from the most recent hour, so the block layout moves with the simulation. All hourly energy is
+    kept as a cumulative sum in a preallocated array, so the block energies are found by differencing the cumulative
+    sum at the block edges, without re-summing the hourly loads. Since the block layout changes each hour, the
+    closed blocks and their g-function values are updated once per hour.
+    """
+
+    Type = AggregationTypes.MLAA
+
+    def __init__(self, inputs):
+        # set the block durations for each level. apply default if needed.
+        try:
+            self.dts_blocks = np.array(inputs['block-durations-in-hours'], dtype=int)
+        except KeyError:
+            self.dts_blocks = np.array([1, 24, 168, 730], dtype=int)
+
+        # set the number of blocks for each level, except the last. apply default if needed.
+        # the last level holds however many blocks are needed to cover the remaining history.
+        try:
+            num_blocks = inputs['number-blocks-per-level']
+        except KeyError:
+            num_blocks = [12, 2, 1]
+
+        if len(num_blocks) != self.dts_blocks.size - 1:
+            raise ValueError("'number-blocks-per-level' must have one less entry than 'block-durations-in-hours'.")
+
+        # widths and edges of the fixed blocks, in hours, ordered from the most recent hour backwards
+        self.fixed_widths = np.repeat(self.dts_blocks[:-1], num_blocks)
+        self.fixed_edges = np.cumsum(self.fixed_widths)
+
+        # cumulative hourly energy, preallocated for the simulation runtime if given
+        try:
+            capacity = int(ceil(inputs['runtime'] / SEC_IN_HOUR)) + 1
+        except KeyError:
+            capacity = 1024
+
+        self.cum_energy = np.zeros(capacity + 1, dtype=float)
+        self.num_hours = 0
+
+        BinnedAgg.__init__(self, inputs, SEC_IN_HOUR, int(self.fixed_widths.size + capacity // self.dts_blocks[-1]) + 2)
+
+    def close_bin(self, energy: float):
+        """
+        Log the energy of a closed hour.
+
+        :param energy: hourly energy, in Joules
+        """
+
+        if self.num_hours + 1 >= self.cum_energy.size:
+            self.cum_energy = np.concatenate((self.cum_energy, np.zeros(self.cum_energy.size, dtype=float)))
+
+        self.cum_energy[self.num_hours + 1] = self.cum_energy[self.num_hours] + energy
+        self.num_hours += 1
+
+    def update_closed_bins(self):
+        """
+        Update the block layout and block energies, referenced back from the most recent hour.
+        """
+
+        num_hours = self.num_hours
+
+        # fixed blocks. the oldest one may only be partly filled.
+        num_fixed = int(np.searchsorted(self.fixed_edges, num_hours, side='right'))
+        widths = [self.fixed_widths[:num_fixed]]
+
+        covered = self.fixed_edges[num_fixed - 1] if num_fixed > 0 else 0
+        if num_fixed < self.fixed_widths.size:
+            if num_hours > covered:
+                widths.append([num_hours - covered])
+        else:
+            # blocks of the last level, plus whatever partial block is left at the start of the simulation
+            num_last, remainder = divmod(num_hours - covered, self.dts_blocks[-1])
+            widths.append(np.full(num_last, self.dts_blocks[-1], dtype=int))
+            if remainder > 0:
+                widths.append([remainder])
+
+        widths = np.concatenate(widths).astype(int)
+        upper = num_hours - np.cumsum(widths) + widths
+        lower = upper - widths
+
+        # reorder oldest to newest
+        num_closed = widths.size
+        self.reserve(num_closed)
+        self.energy_buf[:num_closed] = np.flipud(self.cum_energy[upper] - self.cum_energy[lower])
+        self.dts_buf[:num_closed] = np.flipud(widths * SEC_IN_HOUR)
+        self.set_closed_bins(num_closed)
@@ -1,12 +1,20 @@
+from typing import Union
+
 import numpy as np
+from scipy.signal import fftconvolve
 
 from glhe.aggregation.agg_types import AggregationTypes
 from glhe.aggregation.base_agg import BaseAgg
+from glhe.aggregation.g_function_table import GFunctionFlowTable
 
 
 class NoAgg(BaseAgg):
     """
     No aggregation. Just keep all of the values.
+
+    Values are logged into preallocated buffers which are doubled in size when full. When all time steps
+    are the same length, the g-function values for each history term are cached, so the temporal superposition
+    reduces to a single dot product over the history.
     """
 
     Type = AggregationTypes.NO_AGG
@@ -14,45 +22,185 @@ class NoAgg(BaseAgg):
     def __init__(self, inputs):
         BaseAgg.__init__(self, inputs)
 
+        # preallocated history buffers. set the initial capacity. apply default if needed.
+        try:
+            self.capacity = inputs['initial-capacity']
+        except KeyError:
+            self.capacity = 1024
+
+        self.num_bins = 0
+        self.energy_buf = np.zeros(self.capacity, dtype=float)
+        self.dts_buf = np.zeros(self.capacity, dtype=float)
+
+        # change in load between each bin
+        self.dq_buf = np.zeros(self.capacity, dtype=float)
+        self.q_prev = 0
+
+        # time step, if all logged time steps are equal. otherwise, None.
+        self.uniform_dt = None
+        self.is_uniform = True
+
+        # cached g-function values for each history term, ordered from the most recent term backwards
+        self.lntts_hist = np.empty((0,), dtype=float)
+        self.g_hist = np.empty((0,), dtype=float)
+        self.g_b_hist = np.empty((0,), dtype=float)
+        self.g_hist_dt = None
+
+        self.g_b_flow_dependent = isinstance(self.interp_g_b, GFunctionFlowTable)
+
+    def grow(self):
+        """
+        Double the capacity of the history buffers.
+        """
+
+        self.energy_buf = np.concatenate((self.energy_buf, np.zeros(self.capacity, dtype=float)))
+        self.dts_buf = np.concatenate((self.dts_buf, np.zeros(self.capacity, dtype=float)))
+        self.dq_buf = np.concatenate((self.dq_buf, np.zeros(self.capacity, dtype=float)))
+        self.capacity *= 2
+
     def aggregate(self, time: int, energy: float):
         # check for iteration
         if self.prev_update_time == time:
             return
 
+        if self.num_bins >= self.capacity:
+            self.grow()
+
         # log the values
-        self.energy = np.append(self.energy, energy)
+        idx = self.num_bins
         dt = time - self.prev_update_time
-        self.dts = np.append(self.dts, dt)
+        self.energy_buf[idx] = energy
+        self.dts_buf[idx] = dt
+
+        q = energy / dt
+        self.dq_buf[idx] = q - self.q_prev
+        self.q_prev = q
+
+        # check whether the time steps are still uniform
+        if self.uniform_dt is None and self.is_uniform:
+            self.uniform_dt = dt
+        elif self.uniform_dt != dt:
+            self.uniform_dt = None
+            self.is_uniform = False
+
+        self.num_bins += 1
+        self.energy = self.energy_buf[:self.num_bins]
+        self.dts = self.dts_buf[:self.num_bins]
 
         # update time
         self.prev_update_time = time
 
-    def calc_temporal_superposition(self, time_step: int) -> float:
+    def update_g_history(self, time_step: int, num_terms: int):
+        """
+        Extend the cached g-function values to cover the history terms, for uniform time steps.
+        Flow dependent g_b-function values are not cached.
+
+        :param time_step: time step, in seconds
+        :param num_terms: number of history terms
+        """
+
+        if self.g_hist_dt != time_step:
+            self.lntts_hist = np.empty((0,), dtype=float)
+            self.g_hist = np.empty((0,), dtype=float)
+            self.g_b_hist = np.empty((0,), dtype=float)
+            self.g_hist_dt = time_step
+
+        num_cached = self.g_hist.size
+        if num_terms <= num_cached:
+            return
+
+        # the k-th most recent term is referenced (k + 2) time steps back from the end of the current time step
+        k = np.arange(num_cached, max(num_terms, 2 * num_cached))
+        lntts = np.log((k + 2) * time_step / self.ts)
+        self.lntts_hist = np.concatenate((self.lntts_hist, lntts))
+        self.g_hist = np.concatenate((self.g_hist, self.interp_g(lntts)))
+
+        if self.interp_g_b and not self.g_b_flow_dependent:
+            self.g_b_hist = np.concatenate((self.g_b_hist, self.interp_g_b(lntts)))
+
+    def calc_temporal_superposition(self, time_step: int, flow_rate: float = None) -> Union[float, tuple]:
         # compute temporal superposition
         # this includes all thermal history before the present time
-        q = self.energy / self.dts
-        dq = np.diff(q, prepend=0)
+        num_bins = self.num_bins
+        dq = self.dq_buf[:num_bins]
 
-        # g-function values
-        dts = np.append(self.dts, time_step)
-        times = np.flipud(np.cumsum(np.flipud(dts)))[:-1]
-        lntts = np.log(times / self.ts)
-        g = self.interp_g(lntts)
+        cached = self.uniform_dt is not None and time_step == self.uniform_dt
+        if cached:
+            # g-function values are cached for uniform time steps, ordered from the most recent term backwards
+            self.update_g_history(time_step, num_bins)
+            dq = dq[::-1]
+            lntts = self.lntts_hist[:num_bins]
+            g = self.g_hist[:num_bins]
+        else:
+            # g-function values
+            dts = np.append(self.dts, time_step)
+            times = np.flipud(np.cumsum(np.flipud(dts)))[:-1]
+            lntts = np.log(times / self.ts)
+            g = self.interp_g(lntts)
 
         # convolution of delta_q and the g-function values
         if self.interp_g_b:
             # convolution for "g" and "g_b" g-functions
-            g_b = self.interp_g_b(lntts)
-            return float(np.dot(dq, np.add(g, g_b)))
+            if self.g_b_flow_dependent:
+                g_b = self.interp_g_b(lntts, flow_rate)
+            elif cached:
+                g_b = self.g_b_hist[:num_bins]
+            else:
+                g_b = self.interp_g_b(lntts)
+            return float(np.dot(dq, g)), float(np.dot(dq, g_b))
         else:
             # convolution for "g" g-functions only
             return float(np.dot(dq, g))
 
+    def calc_temporal_superposition_batch(self, energy: np.ndarray, time_step: int,
+                                          flow_rate: float = None) -> Union[np.ndarray, tuple]:
+        """
+        Temporal superposition for a known energy profile with uniform time steps, computed for all time steps
+        at once by FFT convolution. The result at each time step is the same as logging the energy of all previous
+        time steps and calling calc_temporal_superposition. The logged history is not used or changed.
+
+        :param energy: energy for each time step, in Joules
+        :param time_step: time step, in seconds
+        :param flow_rate: flow rate, in kg/s. only used for flow dependent g_b-functions.
+        :return: temporal superposition of the thermal history at each time step. tuple of the g-function and
+        g_b-function superposition if g_b-functions are used.
+        """
+
+        num_steps = energy.size
+        if num_steps == 0:
+            hist = np.empty((0,), dtype=float)
+            return (hist, hist.copy()) if self.interp_g_b else hist
+
+        q = energy / time_step
+        dq = np.diff(q, prepend=0)
+
+        # no history term for the first time step
+        self.update_g_history(time_step, num_steps)
+        num_terms = num_steps - 1
+
+        def convolve(g_hist):
+            kernel = np.concatenate(([0], g_hist[:num_terms]))
+            return fftconvolve(dq, kernel)[:num_steps]
+
+        if self.interp_g_b:
+            if self.g_b_flow_dependent:
+                g_b_hist = self.interp_g_b(self.lntts_hist[:num_terms], flow_rate)
+            else:
+                g_b_hist = self.g_b_hist
+            return convolve(self.g_hist), convolve(g_b_hist)
+        else:
+            return convolve(self.g_hist)
+
     def get_g_value(self, time_step: int) -> float:
-        pass  # pragma: no cover
+        lntts = np.log(time_step / self.ts)
+        return float(self.interp_g(lntts))
 
-    def get_g_b_value(self, time_step: int) -> float:
-        pass  # pragma: no cover
+    def get_g_b_value(self, time_step: int, flow_rate: float = None) -> float:
+        lntts = np.log(time_step / self.ts)
+        if self.g_b_flow_dependent:
+            return float(self.interp_g_b(lntts, flow_rate))
+        else:
+            return float(self.interp_g_b(lntts))
 
     def get_q_prev(self) -> float:
-        pass  # pragma: no cover
+        return float(self.q_prev)
@@ -1,26 +1,30 @@
+from math import ceil
+
 import numpy as np
 
 from glhe.aggregation.agg_types import AggregationTypes
-from glhe.aggregation.base_agg import BaseAgg
-from glhe.aggregation.sub_hourly import SubHour
+from glhe.aggregation.binned_agg import BinnedAgg
 from glhe.utilities.constants import SEC_IN_HOUR
 
 
-class Static(BaseAgg):
+class Static(BinnedAgg):
     """
     Static aggregation method.
 
     Yavuzturk, C. and Spitler, J.D. 1999. 'A short time step response factor model for
     vertical ground loop heat exchangers.' ASHRAE Transactions. 105(2):475-485.
+
+    Bins are closed from the open bin once it spans the first level bin duration, and pushed into the first level.
+    Once a level holds its minimum number of bins, plus enough bins to fill one bin of the next level, its oldest
+    bins are merged and pushed into the next level. Nothing is merged out of the last level, so its minimum number of
+    bins is not used.
+
+    The bins of each level are kept in fixed, preallocated circular buffers, so pushing a bin costs O(1) per level.
     """
 
     Type = AggregationTypes.STATIC
 
     def __init__(self, inputs):
-        BaseAgg.__init__(self, inputs)
-
-        # sub-hourly tracker for the first hour
-        self.sub_hr = SubHour(inputs)
 
         # set the minimum bins for each level. apply default if needed.
         try:
@@ -34,45 +38,91 @@ class Static(BaseAgg):
         except KeyError:
             dts_bins = [1, 24, 96, 384]
 
+        if len(self.min_num_bins) != len(dts_bins):
+            raise ValueError("'minimum-num-bins-for-each-level' and 'bin-durations-in-hours' must be the same length.")
+
         self.dts_bins = np.array(dts_bins, dtype=int) * SEC_IN_HOUR
+        self.num_levels = len(dts_bins)
+
+        # number of bins from each level which are merged into one bin of the next level
+        self.bins_per_merge = []
+        for idx in range(self.num_levels - 1):
+            if self.dts_bins[idx + 1] % self.dts_bins[idx] != 0 or self.dts_bins[idx + 1] <= self.dts_bins[idx]:
+                raise ValueError("'bin-durations-in-hours' must be increasing multiples of the previous level.")
+            self.bins_per_merge.append(int(self.dts_bins[idx + 1] // self.dts_bins[idx]))
+
+        # preallocated circular buffers for each level
+        # all levels except the last hold at most the minimum number of bins, plus one bin for the next level.
+        # the last level is sized for the simulation runtime, if given.
+        try:
+            num_last = int(ceil(inputs['runtime'] / self.dts_bins[-1])) + 1
+        except KeyError:
+            num_last = 64
 
-        # initial values
-        self.energy = np.append(self.energy, 0)
-        self.dts = np.append(self.dts, self.dts_bins[0])
+        capacities = [n + m for n, m in zip(self.min_num_bins[:-1], self.bins_per_merge)] + [num_last]
+        self.level_energy = [np.zeros(cap, dtype=float) for cap in capacities]
+        self.level_heads = [0] * self.num_levels
+        self.level_counts = [0] * self.num_levels
 
-        # previous update hour
-        self.prev_update_time_hr = 0
+        BinnedAgg.__init__(self, inputs, self.dts_bins[0], sum(capacities))
 
-    def aggregate(self, time: int, energy: float):
+    def push_bin(self, level: int, energy: float):
         """
-        Aggregate energy. Check for a new time step and aggregate.
+        Push a closed bin into a level, merging the oldest bins into the next level when needed.
 
-        :param time: end sim time of energy value, in seconds. This should be the current sim time.
-        :param energy: energy to be logged, in Joules
+        :param level: level index
+        :param energy: bin energy, in Joules
         """
 
-        # check for iteration
-        if self.prev_update_time == time:
-            return
-
-        # run through sub-hourly method to track the first hour
-        e_1 = self.sub_hr.aggregate(time, energy)
+        count = self.level_counts[level]
+        head = self.level_heads[level]
+        vals = self.level_energy[level]
+        capacity = vals.size
+
+        if count >= capacity:
+            # only the last level can fill
+            vals = np.concatenate((np.roll(vals, -head), np.zeros(capacity, dtype=float)))
+            self.level_energy[level] = vals
+            head = 0
+            capacity = vals.size
+
+        vals[(head + count) % capacity] = energy
+        count += 1
+
+        if level < self.num_levels - 1:
+            num_merge = self.bins_per_merge[level]
+            if count >= self.min_num_bins[level] + num_merge:
+                merged = np.sum(vals.take(range(head, head + num_merge), mode='wrap'))
+                self.level_heads[level] = (head + num_merge) % capacity
+                self.level_counts[level] = count - num_merge
+                self.push_bin(level + 1, merged)
+                return
+
+        self.level_heads[level] = head
+        self.level_counts[level] = count
+
+    def close_bin(self, energy: float):
+        self.push_bin(0, energy)
+
+    def update_closed_bins(self):
+        """
+        Gather the closed bins from all levels, ordered oldest to newest.
+        """
 
-        # only update the long time step aggregation method once per simulation hour
-        if int(time / SEC_IN_HOUR) == self.prev_update_time_hr:
-            # store whatever rolls off of the sub-hourly method
+        num_closed = sum(self.level_counts)
+        self.reserve(num_closed)
 
-            # need to think about this
-            self.energy[-1] += e_1
-            return
-        else:
-            # aggregate
-            dts_flip = np.flipud(self.dts)
-            vals, idxs, cnts = np.unique(dts_flip, return_counts=True, return_index=True)
-            self.energy[-1] += e_1
+        idx = 0
+        for level in range(self.num_levels - 1, -1, -1):
+            head = self.level_heads[level]
+            count = self.level_counts[level]
+            vals = self.level_energy[level]
 
-            # numpy split will do a lot of work too
+            # circular buffer may wrap around
+            num_first = min(count, vals.size - head)
+            self.energy_buf[idx:idx + num_first] = vals[head:head + num_first]
+            self.energy_buf[idx + num_first:idx + count] = vals[:count - num_first]
+            self.dts_buf[idx:idx + count] = self.dts_bins[level]
+            idx += count
 
-        # update times
-        self.prev_update_time = time
-        self.prev_update_time_hr = int(time / SEC_IN_HOUR)
+        self.set_closed_bins(num_closed)
@@ -8,16 +8,55 @@ from glhe.utilities.constants import SEC_IN_HOUR
 class SubHour(BaseAgg):
     """
     Sub-hourly load aggregation method. Handles all sub-hourly energy for the first simulation hour.
+
+    Bins are kept in preallocated buffers as a sliding window, between the 'head' (oldest bin) and 'tail' indices,
+    along with the running total time spanned by the window. Bins are only ever added at the tail and shifted out
+    at the head, so each time step costs amortized O(1). The window is moved back to the start of the buffers
+    when it reaches the end, or the buffers are doubled in size if the window fills more than half of them.
+    The running total is reset to its exact value whenever the window is trimmed to one hour, and recomputed
+    from the window whenever it is moved, so it does not drift.
     """
 
     Type = AggregationTypes.SUB_HOUR
 
     def __init__(self, inputs):
         BaseAgg.__init__(self, inputs)
-        self.energy = np.append(self.energy, 0)
-        self.dts = np.append(self.dts, SEC_IN_HOUR)
+
+        self.capacity = 64
+        self.energy_buf = np.zeros(self.capacity, dtype=float)
+        self.dts_buf = np.zeros(self.capacity, dtype=float)
+
+        # initial bin
+        self.head = 0
+        self.tail = 1
+        self.dts_buf[0] = SEC_IN_HOUR
+
+        # total time spanned by all bins
+        self.total_time = SEC_IN_HOUR
+
+        self.energy = self.energy_buf[self.head:self.tail]
+        self.dts = self.dts_buf[self.head:self.tail]
         self.prev_update_time = 0
 
+    def make_room(self):
+        """
+        Make room for a new bin at the tail of the window.
+        """
+
+        num_bins = self.tail - self.head
+        if num_bins > self.capacity // 2:
+            self.energy_buf = np.concatenate((self.energy_buf, np.zeros(self.capacity, dtype=float)))
+            self.dts_buf = np.concatenate((self.dts_buf, np.zeros(self.capacity, dtype=float)))
+            self.capacity *= 2
+        else:
+            self.energy_buf[:num_bins] = self.energy_buf[self.head:self.tail]
+            self.dts_buf[:num_bins] = self.dts_buf[self.head:self.tail]
+            self.head = 0
+            self.tail = num_bins
+
+        # recompute the running total from the window
+        self.total_time = float(np.sum(self.dts_buf[self.head:self.tail]))
+
     def aggregate(self, time: int, energy: float):
         """
         Aggregate sub-hourly energy
@@ -32,42 +71,39 @@ class SubHour(BaseAgg):
         if self.prev_update_time == time:
             return 0
 
-        # append current values
-        self.energy = np.append(self.energy, energy)
+        if self.tail >= self.capacity:
+            self.make_room()
 
-        # respective time steps for each bin
-        self.dts = np.append(self.dts, time - self.prev_update_time)
-
-        # upper and lower bin edges referenced from current time
-        # also, FFR dt_u = time referenced backwards from current time
-        dt_u = np.flipud(np.cumsum(np.flipud(self.dts)))
-        dt_l = dt_u - self.dts
-
-        # indices from bins where all or part of the load has to be shifted
-        idx_full = np.where((dt_l >= SEC_IN_HOUR))[0]
-        idx_part = np.where((dt_u > SEC_IN_HOUR) & (dt_l < SEC_IN_HOUR))[0]
+        # append current values
+        dt = time - self.prev_update_time
+        self.energy_buf[self.tail] = energy
+        self.dts_buf[self.tail] = dt
+        self.tail += 1
+        self.total_time += dt
 
         load_to_shift = 0
 
         # full bins to shift
-        if len(idx_full) > 0:
-            load_to_shift = np.sum(self.energy[idx_full])
+        # the lower edge of the oldest bin, referenced backwards from the current time, is past the first hour
+        while self.total_time - self.dts_buf[self.head] >= SEC_IN_HOUR:
+            load_to_shift += self.energy_buf[self.head]
+            self.total_time -= self.dts_buf[self.head]
+            self.head += 1
 
         # partial bin to shift
-        if len(idx_part) > 0:
-            idx = idx_part[0]
-            u_edge = dt_u[idx]
-            l_edge = dt_l[idx]
-            f = (u_edge - SEC_IN_HOUR) / (u_edge - l_edge)
-            load_to_shift += f * self.energy[idx]
-
-            # update the partial bin
-            self.energy[idx] = (1 - f) * self.energy[idx]
-            self.dts[idx] = (1 - f) * self.dts[idx]
-
-        # finally, delete the values
-        self.energy = np.delete(self.energy, idx_full)
-        self.dts = np.delete(self.dts, idx_full)
+        if self.total_time > SEC_IN_HOUR:
+            idx = self.head
+            f = (self.total_time - SEC_IN_HOUR) / self.dts_buf[idx]
+            load_to_shift += f * self.energy_buf[idx]
+
+            # update the partial bin. the window now spans exactly one hour, so reset the running total to avoid
+            # accumulating round-off over long runs.
+            self.total_time = SEC_IN_HOUR
+            self.energy_buf[idx] = (1 - f) * self.energy_buf[idx]
+            self.dts_buf[idx] = (1 - f) * self.dts_buf[idx]
+
+        self.energy = self.energy_buf[self.head:self.tail]
+        self.dts = self.dts_buf[self.head:self.tail]
 
         # update time
         self.prev_update_time = time
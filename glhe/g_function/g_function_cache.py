@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+
+class GFunctionCache(object):
+    """
+    Persistent, content-addressed cache of g-function data.
+
+    Entries are keyed by a hash of all inputs which determine the g-function data, e.g. the borehole field
+    geometry, soil properties, and ln(t/ts) grid, and are stored as '.npz' files in the cache directory.
+    When the cache is over its entry count or size limit, the least recently used entries are evicted.
+    """
+
+    # bump when the generated data, or the data used to form the keys, changes
+    version = 1
+
+    def __init__(self, inputs: dict):
+        """
+        :param inputs: dict with 'path' to the cache directory, and optional 'max-entries' and 'max-size-mb' limits
+        """
+
+        self.cache_dir = os.path.normpath(os.path.join(os.getcwd(), inputs['path']))
+
+        # set the eviction limits. apply defaults if needed.
+        try:
+            self.max_entries = inputs['max-entries']
+        except KeyError:
+            self.max_entries = 100
+
+        try:
+            self.max_size = inputs['max-size-mb'] * 1e6
+        except KeyError:
+            self.max_size = 500e6
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def make_key(cls, kind: str, data: dict) -> str:
+        """
+        Hash the inputs which determine an entry
+
+        :param kind: kind of entry, e.g. 'g' or 'g_b'
+        :param data: dict of inputs. values must be numbers, strings, lists, or numpy arrays.
+        :return: hex digest key
+        """
+
+        def to_serializable(x):
+            if isinstance(x, np.ndarray):
+                return x.tolist()
+            elif isinstance(x, np.generic):
+                return x.item()
+            raise TypeError("'{}' cannot be used in a g-function cache key".format(type(x).__name__))
+
+        payload = json.dumps({'kind': kind, 'version': cls.version, 'data': data}, sort_keys=True,
+                             default=to_serializable)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, '{}.npz'.format(key))
+
+    def load(self, key: str):
+        """
+        Load an entry
+
+        :param key: entry key
+        :return: dict of arrays, or None if the entry is not found
+        """
+
+        path = self.entry_path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {k: data[k] for k in data.files}
+        except (OSError, ValueError, zipfile.BadZipFile):
+            return None
+
+        # mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return arrays
+
+    def store(self, key: str, **arrays):
+        """
+        Store an entry, then evict old entries if the cache is over its limits
+
+        :param key: entry key
+        :param arrays: arrays to store
+        """
+
+        # write to a temporary file first so other processes never load a partial entry
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temp_path, self.entry_path(key))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        self.evict(keep=key)
+
+    def evict(self, keep: str = None):
+        """
+        Remove the least recently used entries until the cache is within its limits
+
+        :param keep: key of an entry which should not be removed
+        """
+
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npz'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        # oldest first
+        entries.sort()
+        num_entries = len(entries)
+        total_size = sum(e[1] for e in entries)
+        keep_path = self.entry_path(keep) if keep else None
+
+        for _, size, path in entries:
+            if num_entries <= self.max_entries and total_size <= self.max_size:
+                break
+            if path == keep_path:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            num_entries -= 1
+            total_size -= size
@@ -1,52 +1,627 @@
 import datetime as dt
 import os
-from os.path import join, normpath
+import warnings
+from fnmatch import fnmatchcase
+from operator import attrgetter
+from os.path import join, normpath, splitext
 
+import numpy as np
 import pandas as pd
 
+from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
+from glhe.utilities.functions import load_json
+from glhe.utilities.functions import write_json
+
+
+class OutputFormats(object):
+    """
+    All supported output file formats
+    """
+
+    CSV = 'csv'
+    HDF5 = 'hdf5'
+    NPY = 'npy-memmap'
+    PARQUET = 'parquet'
+
+    # key under which data are stored in HDF5 files
+    HDF5Key = 'glhe'
+
+
+# file extensions mapped to the output format they select
+output_format_extensions = {'.csv': OutputFormats.CSV,
+                            '.h5': OutputFormats.HDF5,
+                            '.hdf': OutputFormats.HDF5,
+                            '.hdf5': OutputFormats.HDF5,
+                            '.npy': OutputFormats.NPY,
+                            '.parquet': OutputFormats.PARQUET,
+                            '.pq': OutputFormats.PARQUET}
+
+
+class ReportAggregationTypes(object):
+    """
+    Methods for aggregating report variables over a reporting interval
+    """
+
+    LAST = 'last'
+    MAX = 'max'
+    MEAN = 'mean'
+    MIN = 'min'
+
+
+def split_report_key(key: str) -> tuple:
+    """
+    Split a report variable key, or a key pattern, into its 'Type', 'Name', and 'Variable' fields.
+
+    Component types and report variables never contain ':', but component names can. A key with no ':' is taken
+    to be a variable only, and a key with only one ':' to have an empty name.
+
+    :param key: report variable key, e.g. 'Pipe:PIPE 1:Outlet Temp. [C]'
+    :return: tuple of type, name, and variable fields
+    """
+
+    if ':' not in key:
+        return '', '', key
+
+    comp_type, rest = key.split(':', 1)
+    if ':' not in rest:
+        return comp_type, '', rest
+
+    name, variable = rest.rsplit(':', 1)
+    return comp_type, name, variable
+
+
+def split_report_pattern(pattern: str) -> tuple:
+    """
+    Split a report variable pattern into its 'Type', 'Name', and 'Variable' fields.
+    Fields not given in the pattern match anything.
+
+    Only the '*' and '?' wildcards are supported. '[' is matched literally since it appears in the report
+    variable units.
+
+    :param pattern: report variable pattern, e.g. 'Pipe:*:Outlet Temp. [C]'
+    :return: tuple of lower-cased type, name, and variable patterns
+    """
+
+    comp_type, name, variable = split_report_key(pattern.lower().replace('[', '[[]'))
+
+    if ':' not in pattern:
+        return '*', '*', variable
+    elif pattern.count(':') == 1:
+        return comp_type, '*', variable
+    else:
+        return comp_type, name, variable
+
+
+def get_output_format(path: str, output_format: str = None) -> str:
+    """
+    Determine the output file format. Inferred from the file extension if not given explicitly.
+    Unknown extensions default to CSV.
+
+    :param path: output file path
+    :param output_format: output format, if specified
+    :return: output format
+    """
+
+    valid_formats = [OutputFormats.CSV, OutputFormats.HDF5, OutputFormats.NPY, OutputFormats.PARQUET]
+
+    if output_format is None:
+        return output_format_extensions.get(splitext(path)[1].lower(), OutputFormats.CSV)
+    elif output_format in valid_formats:
+        return output_format
+    else:
+        raise ValueError("Output format '{}' is not valid.".format(output_format))
+
+
+def npy_column_names_path(path: str) -> str:
+    """
+    Path to the file holding the column names for a 'npy-memmap' output file.
+
+    :param path: output file path
+    :return: column names file path
+    """
+
+    return '{}.json'.format(splitext(path)[0])
+
+
+def load_output(path: str, columns: list = None, output_format: str = None) -> pd.DataFrame:
+    """
+    Load output data written by the OutputProcessor. Only the requested columns are read.
+
+    CSV files still need to be parsed line-by-line, but the binary formats only read the requested columns.
+    'npy-memmap' files are memory-mapped, so only the pages holding the requested columns are loaded.
+
+    :param path: output file path
+    :param columns: list of columns to load. all columns are loaded if not passed.
+    :param output_format: output format. inferred from the file extension if not passed.
+    :return: DataFrame of the requested output data
+    """
+
+    output_format = get_output_format(path, output_format)
+
+    if output_format == OutputFormats.CSV:
+        if columns is None:
+            return pd.read_csv(path)
+        return pd.read_csv(path, usecols=columns)
+    elif output_format == OutputFormats.HDF5:
+        return pd.read_hdf(path, key=OutputFormats.HDF5Key, columns=columns)
+    elif output_format == OutputFormats.PARQUET:
+        return pd.read_parquet(path, columns=columns)
+    else:
+        names = load_json(npy_column_names_path(path))['columns']
+        data = np.load(path, mmap_mode='r')
+        if columns is None:
+            columns = names
+        return pd.DataFrame({col: np.array(data[names.index(col)]) for col in columns}, columns=columns)
+
 
 class OutputProcessor(object):
 
-    def __init__(self, output_dir: str, output_name: str) -> None:
+    def __init__(self, output_dir: str, output_name: str, initial_capacity: int = 1024,
+                 chunk_size: int = None, output_format: str = None, output_variables: list = None,
+                 report_interval: float = None, report_aggregation: str = ReportAggregationTypes.MEAN) -> None:
         """
         Output processor manages output data
+
+        Data are held column-wise in a preallocated NumPy buffer which grows by doubling its capacity.
+        The DataFrame is only built when requested.
+
+        If a chunk size is given, the output processor runs in streaming mode. Every 'chunk_size' rows the buffer
+        is appended to the output file and cleared, so memory use stays bounded for long runs. The report variables
+        are fixed once the first chunk has been written. Streaming is supported for the 'csv' and 'hdf5' formats.
+
+        Output can be written as 'csv', 'parquet', 'hdf5', or 'npy-memmap'. Unless the format is given, it is
+        inferred from the output file extension. 'npy-memmap' output is a single 2-D array with one row per report
+        variable, with the column names written to a JSON file beside it. Use 'load_output' to read any of these.
+
+        Report variables can be selected with a list of patterns matched field-wise, and without regard to case,
+        against the 'Type:Name:Variable' keys, e.g. 'Pipe:*:Outlet Temp. [C]'. The '*' and '?' wildcards are
+        supported within each field. A pattern with no ':' matches the variable field only. Components
+        can check 'report_component' before building their report variables.
+
+        If a reporting interval is given, the time steps within each interval are aggregated into a single row
+        using the 'mean', 'min', 'max', or 'last' value. 'Elapsed Time [s]' is always reported, and is
+        always taken at the end of the interval.
+
+        :param output_dir: directory where the output file is written
+        :param output_name: output file name
+        :param initial_capacity: initial number of rows preallocated in the output buffer
+        :param chunk_size: number of rows held in memory before being flushed to the output file
+        :param output_format: output file format
+        :param output_variables: list of report variable patterns to report. all variables reported if not passed.
+        :param report_interval: reporting interval, in seconds. every time step reported if not passed.
+        :param report_aggregation: method used to aggregate report variables over the reporting interval
         """
 
         self.output_dir = output_dir
         self.output_file = output_name
         self.write_path = normpath(join(output_dir, output_name))
-        self.df = pd.DataFrame()
+        self.output_format = get_output_format(output_name, output_format)
+        self.start_time = dt.datetime(year=dt.datetime.now().year, month=1, day=1, hour=0, minute=0)
+
+        # total number of rows collected
         self.idx_count = 0
 
+        # rows currently held in the buffer, and the index of the first one
+        self.num_rows = 0
+        self.idx_offset = 0
+
+        # streaming mode
+        self.chunk_size = None
+        self.header_written = False
+        if chunk_size is not None:
+            self.chunk_size = int(chunk_size)
+            if self.chunk_size < 1:
+                raise ValueError("Output chunk size must be greater than 0.")
+            if self.output_format not in [OutputFormats.CSV, OutputFormats.HDF5]:
+                raise ValueError("Output format '{}' does not support streaming.".format(self.output_format))
+            initial_capacity = self.chunk_size
+
+        # column-store buffer. one row of the array per report variable. the number of report variables the
+        # buffer can hold also grows by doubling, so the rows past the registered variables are unused.
+        self.capacity = max(int(initial_capacity), 1)
+        self.col_capacity = 16
+        self.col_names = []
+        self.col_idxs = {}
+        self.data = np.full((self.col_capacity, self.capacity), np.nan, dtype=float)
+
+        # tracks whether all values logged to a column are integers so they are written back out as such
+        self.col_is_int = np.ones((self.col_capacity,), dtype=bool)
+
+        # registered report variables. each entry holds the attribute getter, the component, and the columns
+        # the values are written to. values are gathered into the report row each time step.
+        self.report_entries = []
+        self.report_row = np.full((self.col_capacity,), np.nan, dtype=float)
+
+        # DataFrame is built lazily from the buffer
+        self._df = None
+
+        # report variable selection
+        self.output_variables = None
+        if output_variables is not None:
+            self.output_variables = [split_report_pattern(x) for x in output_variables]
+        self.reported_keys = {ReportTypes.ElapsedTime: True}
+        self.reported_comps = {}
+
+        # reporting interval
+        self.report_interval = None
+        self.report_aggregation = report_aggregation
+        self.next_report_time = None
+
+        # buffer row where the current reporting interval starts
+        self.interval_start = 0
+
+        if report_interval is not None:
+            self.report_interval = report_interval
+            if self.report_interval <= 0:
+                raise ValueError("Reporting interval must be greater than 0.")
+
+            self.next_report_time = self.report_interval
+
+            valid_aggs = [ReportAggregationTypes.LAST, ReportAggregationTypes.MAX,
+                          ReportAggregationTypes.MEAN, ReportAggregationTypes.MIN]
+            if self.report_aggregation not in valid_aggs:
+                raise ValueError("Report aggregation '{}' is not valid.".format(self.report_aggregation))
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """
+        DataFrame view of the collected output data. Built from the buffer on first access after new data is logged.
+        """
+
+        if self._df is None:
+            self._df = self.to_dataframe()
+        return self._df
+
+    @df.setter
+    def df(self, df: pd.DataFrame) -> None:
+        self._df = df
+
+    def report_component(self, comp_type: str, name: str) -> bool:
+        """
+        Check whether any report variables of a component are selected for output.
+
+        :param comp_type: component type
+        :param name: component name
+        :return: True if any of the component report variables may be reported
+        """
+
+        try:
+            return self.reported_comps[(comp_type, name)]
+        except KeyError:
+            if self.output_variables is None:
+                reported = True
+            else:
+                comp_type_lower = comp_type.lower()
+                name_lower = name.lower()
+                reported = any(fnmatchcase(comp_type_lower, p_type) and fnmatchcase(name_lower, p_name)
+                               for p_type, p_name, _ in self.output_variables)
+            self.reported_comps[(comp_type, name)] = reported
+            return reported
+
+    def is_reported(self, key: str) -> bool:
+        """
+        Check whether a report variable is selected for output.
+
+        :param key: report variable key
+        :return: True if the report variable is reported
+        """
+
+        try:
+            return self.reported_keys[key]
+        except KeyError:
+            if self.output_variables is None:
+                reported = True
+            else:
+                comp_type, name, variable = split_report_key(key.lower())
+                reported = False
+                for p_type, p_name, p_var in self.output_variables:
+                    if fnmatchcase(comp_type, p_type) and fnmatchcase(name, p_name) and fnmatchcase(variable, p_var):
+                        reported = True
+                        break
+            self.reported_keys[key] = reported
+            return reported
+
+    def register_output(self, name: str) -> int:
+        """
+        Register a report variable with the output processor. Registering a variable more than once is allowed.
+
+        :param name: report variable name
+        :return: column index of the report variable within the output buffer
+        """
+
+        try:
+            return self.col_idxs[name]
+        except KeyError:
+            if self.header_written:
+                raise ValueError("Report variable '{}' cannot be added after output has been "
+                                 "written to '{}'.".format(name, self.write_path))
+
+            idx = len(self.col_names)
+            if idx >= self.col_capacity:
+                self.grow_cols()
+
+            self.col_names.append(name)
+            self.col_idxs[name] = idx
+            return idx
+
+    def register_report_variables(self, report_vars: ReportVariables) -> None:
+        """
+        Register the report variables of a component, and all of its sub-components.
+        Only the selected report variables are registered.
+
+        :param report_vars: ReportVariables instance of the component
+        """
+
+        for child in report_vars.children:
+            self.register_report_variables(child)
+
+        if not self.report_component(report_vars.comp_type, report_vars.name or ''):
+            return
+
+        idxs = []
+        attrs = []
+        for key, attr in zip(report_vars.keys, report_vars.attrs):
+            if self.is_reported(key):
+                idx = self.register_output(key)
+                self.col_is_int[idx] = False
+                idxs.append(idx)
+                attrs.append(attr)
+
+        if idxs:
+            self.report_entries.append((attrgetter(*attrs), report_vars.obj, np.array(idxs, dtype=int)))
+
+    def collect_report_row(self, elapsed_time: float) -> None:
+        """
+        Collect the current values of all registered report variables and log them in the output buffer.
+
+        :param elapsed_time: elapsed simulation time, in seconds
+        """
+
+        idx_time = self.register_output(ReportTypes.ElapsedTime)
+        row = self.report_row
+        row[idx_time] = elapsed_time
+        if self.col_is_int[idx_time] and not isinstance(elapsed_time, (int, np.integer)):
+            self.col_is_int[idx_time] = False
+
+        for getter, obj, idxs in self.report_entries:
+            row[idxs] = getter(obj)
+
+        if self.num_rows >= self.capacity:
+            self.grow()
+
+        self.data[:, self.num_rows] = row
+        self.end_row(elapsed_time)
+
+    def grow(self) -> None:
+        """
+        Double the row capacity of the output buffer.
+        """
+
+        new_data = np.full((self.col_capacity, 2 * self.capacity), np.nan, dtype=float)
+        new_data[:, :self.capacity] = self.data
+        self.data = new_data
+        self.capacity *= 2
+
+    def grow_cols(self) -> None:
+        """
+        Double the number of report variables the output buffer can hold.
+        """
+
+        new_data = np.full((2 * self.col_capacity, self.capacity), np.nan, dtype=float)
+        new_data[:self.col_capacity, :] = self.data
+        self.data = new_data
+        self.col_is_int = np.concatenate((self.col_is_int, np.ones((self.col_capacity,), dtype=bool)))
+        self.report_row = np.concatenate((self.report_row, np.full((self.col_capacity,), np.nan, dtype=float)))
+        self.col_capacity *= 2
+
     def collect_output(self, data_dict: dict) -> None:
         """
-        Collect output data and log it in a DataFrame until it's written to a file.
+        Collect output data and log it in the output buffer until it's written to a file.
 
         :param data_dict: dictionary of data to be logged
         """
 
-        df_temp = pd.DataFrame(data_dict, index=[self.idx_count])
-        self.df = pd.concat([self.df, df_temp], axis=0, sort=True)
+        if self.num_rows >= self.capacity:
+            self.grow()
+
+        row = self.num_rows
+        for name, val in data_dict.items():
+            try:
+                idx = self.col_idxs[name]
+            except KeyError:
+                if not self.is_reported(name):
+                    continue
+                idx = self.register_output(name)
+
+            self.data[idx, row] = val
+
+            if self.col_is_int[idx] and not isinstance(val, (int, np.integer)):
+                self.col_is_int[idx] = False
+
+        if self.report_interval:
+            self.end_row(data_dict[ReportTypes.ElapsedTime])
+        else:
+            self.end_row()
+
+    def end_row(self, elapsed_time: float = None) -> None:
+        """
+        Finish logging a row of the output buffer.
+
+        :param elapsed_time: elapsed simulation time, in seconds. required if a reporting interval is set.
+        """
+
+        self.num_rows += 1
+        self._df = None
+
+        if self.report_interval:
+            # wait until the end of the reporting interval
+            if elapsed_time < self.next_report_time:
+                return
+
+            while self.next_report_time <= elapsed_time:
+                self.next_report_time += self.report_interval
+
+            self.aggregate_interval()
+
         self.idx_count += 1
 
+        if self.chunk_size and self.num_rows >= self.chunk_size:
+            self.flush()
+
+    def aggregate_interval(self) -> None:
+        """
+        Collapse the buffer rows logged during the current reporting interval into a single row.
+        """
+
+        start = self.interval_start
+        end = self.num_rows
+
+        if end - start > 1:
+            vals = self.data[:, start:end]
+
+            with warnings.catch_warnings():
+                # columns with no values logged during the interval are left as NaN
+                warnings.simplefilter('ignore', category=RuntimeWarning)
+                if self.report_aggregation == ReportAggregationTypes.MEAN:
+                    row = np.nanmean(vals, axis=1)
+                elif self.report_aggregation == ReportAggregationTypes.MIN:
+                    row = np.nanmin(vals, axis=1)
+                elif self.report_aggregation == ReportAggregationTypes.MAX:
+                    row = np.nanmax(vals, axis=1)
+                else:
+                    row = vals[:, -1]
+
+            try:
+                # time is always taken from the end of the interval
+                idx_time = self.col_idxs[ReportTypes.ElapsedTime]
+                row[idx_time] = vals[idx_time, -1]
+            except KeyError:
+                pass
+
+            self.data[:, start] = row
+            self.data[:, start + 1:end] = np.nan
+
+            if self.report_aggregation == ReportAggregationTypes.MEAN:
+                is_int = self.col_is_int.copy()
+                self.col_is_int[:] = False
+                if ReportTypes.ElapsedTime in self.col_idxs:
+                    idx_time = self.col_idxs[ReportTypes.ElapsedTime]
+                    self.col_is_int[idx_time] = is_int[idx_time]
+
+        self.num_rows = start + 1
+        self.interval_start = self.num_rows
+
+    def flush(self) -> None:
+        """
+        Append the rows held in the buffer to the output file and clear the buffer. Streaming mode only.
+        """
+
+        if not self.header_written:
+            if os.path.exists(self.write_path):
+                os.remove(self.write_path)
+
+        if self.num_rows > 0 or not self.header_written:
+            self.convert_time_to_timestamp()
+            self.write_frame(self.df, append=self.header_written)
+            self.header_written = True
+
+        # reset the buffer
+        self.data[:, :self.num_rows] = np.nan
+        self.idx_offset = self.idx_count
+        self.num_rows = 0
+        self.interval_start = 0
+        self._df = None
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Build a DataFrame from the output buffer. Columns are sorted by name.
+
+        In streaming mode, only the rows which have not yet been written to file are included.
+
+        :return: DataFrame of collected output data
+        """
+
+        d = {}
+        for name in sorted(self.col_names):
+            idx = self.col_idxs[name]
+            vals = self.data[idx, :self.num_rows]
+            if self.col_is_int[idx] and not np.isnan(vals).any():
+                d[name] = vals.astype(np.int64)
+            else:
+                d[name] = vals.copy()
+
+        index = pd.RangeIndex(self.idx_offset, self.idx_offset + self.num_rows)
+        return pd.DataFrame(d, index=index, columns=sorted(self.col_names))
+
     def write_to_file(self) -> None:
         """
         Write the DataFrame holding the simulation data to a file.
+
+        In streaming mode, the remaining rows are appended to the output file.
         """
+
+        # report any partial reporting interval at the end of the simulation
+        if self.report_interval and self.num_rows > self.interval_start:
+            self.aggregate_interval()
+            self.idx_count += 1
+
+        if self.chunk_size:
+            self.flush()
+            return
+
         if os.path.exists(self.write_path):
             os.remove(self.write_path)
 
-        self.convert_time_to_timestamp()
-        self.df.to_csv(self.write_path)
+        if self.output_format == OutputFormats.NPY:
+            self.write_npy()
+        else:
+            self.convert_time_to_timestamp()
+            self.write_frame(self.df)
+
+    def write_frame(self, df: pd.DataFrame, append: bool = False) -> None:
+        """
+        Write a DataFrame to the output file in the selected format.
+
+        :param df: data to write
+        :param append: append to an existing output file rather than create a new one
+        """
+
+        if self.output_format == OutputFormats.CSV:
+            if append:
+                df.to_csv(self.write_path, mode='a', header=False)
+            else:
+                df.to_csv(self.write_path)
+        elif self.output_format == OutputFormats.HDF5:
+            # report variable names aren't valid Python identifiers, which PyTables warns about for every column
+            with warnings.catch_warnings():
+                warnings.filterwarnings('ignore', message='object name is not a valid Python identifier')
+                df.to_hdf(self.write_path, key=OutputFormats.HDF5Key, format='table', append=append,
+                          data_columns=True)
+        elif self.output_format == OutputFormats.PARQUET:
+            df.to_parquet(self.write_path)
+        else:
+            raise ValueError("Output format '{}' cannot be written from a DataFrame.".format(self.output_format))
+
+    def write_npy(self) -> None:
+        """
+        Write the output buffer to a NumPy file, with one row of the array per report variable.
+        Column names are written to a JSON file beside it.
+        """
+
+        col_names = sorted(self.col_names)
+        idxs = [self.col_idxs[name] for name in col_names]
+        with open(self.write_path, 'wb') as f:
+            np.save(f, self.data[idxs, :self.num_rows])
+        write_json(npy_column_names_path(self.write_path), {'columns': col_names})
 
     def convert_time_to_timestamp(self) -> None:
         """"
         Convert the 'Elapsed Time' column to a standardized date/time format.
         """
         try:
-            dts = [dt.timedelta(seconds=x) for x in self.df['Elapsed Time [s]'].values.tolist()]
-            start_time = dt.datetime(year=dt.datetime.now().year, month=1, day=1, hour=0, minute=0)
-            time_stamps = [start_time + x for x in dts]
+            dts = [dt.timedelta(seconds=x) for x in self.df[ReportTypes.ElapsedTime].values.tolist()]
+            time_stamps = [self.start_time + x for x in dts]
             self.df['Date/Time'] = time_stamps
             self.df.set_index('Date/Time', inplace=True)
         except KeyError:
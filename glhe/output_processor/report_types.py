@@ -3,6 +3,9 @@ class ReportTypes(object):
     All report variables, grouped.
     """
 
+    # time
+    ElapsedTime = 'Elapsed Time [s]'
+
     # heat transfer
     HeatRate = 'Heat Rate [W]'
     HeatRateBH = 'BH Heat Rate [W]'
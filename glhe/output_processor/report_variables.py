@@ -0,0 +1,61 @@
+class ReportVariables(object):
+
+    def __init__(self, obj, comp_type: str, name: str = None, variables: list = None, children: list = None) -> None:
+        """
+        Report variables declared by a component.
+
+        The report variable keys are built once here, rather than every time step. Values are read from the
+        component attributes when the output processor collects them.
+
+        :param obj: component instance which owns the report variables
+        :param comp_type: component type
+        :param name: component name. keys are formatted as 'Type:Variable' if not passed.
+        :param variables: list of (report variable, attribute name) tuples
+        :param children: list of ReportVariables instances of sub-components which are reported with this component
+        """
+
+        self.obj = obj
+        self.comp_type = comp_type
+        self.name = name
+
+        if variables is None:
+            variables = []
+
+        if children is None:
+            children = []
+
+        if name is None:
+            self.keys = ['{}:{}'.format(comp_type, var) for var, _ in variables]
+        else:
+            self.keys = ['{}:{}:{}'.format(comp_type, name, var) for var, _ in variables]
+
+        self.attrs = [attr for _, attr in variables]
+        self.children = children
+
+    def get_values(self, attrs: list) -> tuple:
+        """
+        Get the current values of the component attributes.
+
+        :param attrs: attribute names
+        :return: tuple of attribute values
+        """
+
+        return tuple(getattr(self.obj, attr) for attr in attrs)
+
+    def to_dict(self, op) -> dict:
+        """
+        Current values of all selected report variables of this component and its sub-components.
+
+        :param op: output processor instance used to check the report variable selection
+        :return: dict of report variable values
+        """
+
+        d = {}
+        for child in self.children:
+            d.update(child.to_dict(op))
+
+        if not op.report_component(self.comp_type, self.name or ''):
+            return d
+
+        d.update(zip(self.keys, self.get_values(self.attrs)))
+        return d
@@ -5,6 +5,7 @@ from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
 
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 
 
 class ConstantFlow(SimulationEntryPoint):
@@ -16,8 +17,11 @@ class ConstantFlow(SimulationEntryPoint):
         self.ip = ip
         self.op = op
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.FlowRate, 'flow_rate')])
+
     def simulate_time_step(self, inputs: SimulationResponse):
         return SimulationResponse(inputs.time, inputs.time_step, self.flow_rate, inputs.temperature)
 
     def report_outputs(self):
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.FlowRate): float(self.flow_rate)}
+        return self.report_vars.to_dict(self.op)
@@ -4,6 +4,7 @@ from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 
 
 class ConstantLoad(SimulationEntryPoint):
@@ -19,6 +20,11 @@ class ConstantLoad(SimulationEntryPoint):
         self.inlet_temp = ip.init_temp()
         self.outlet_temp = ip.init_temp()
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.InletTemp, 'inlet_temp'),
+                                            (ReportTypes.OutletTemp, 'outlet_temp'),
+                                            (ReportTypes.HeatRate, 'load')])
+
     def simulate_time_step(self, inputs: SimulationResponse):
         self.inlet_temp = inputs.temperature
         flow_rate = inputs.flow_rate
@@ -31,6 +37,4 @@ class ConstantLoad(SimulationEntryPoint):
         return SimulationResponse(inputs.time, inputs.time_step, inputs.flow_rate, self.outlet_temp)
 
     def report_outputs(self):
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.InletTemp): float(self.inlet_temp),
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): float(self.outlet_temp),
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRate): float(self.load)}
+        return self.report_vars.to_dict(self.op)
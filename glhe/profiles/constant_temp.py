@@ -5,6 +5,7 @@ from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
 
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 
 
 class ConstantTemp(SimulationEntryPoint):
@@ -18,9 +19,12 @@ class ConstantTemp(SimulationEntryPoint):
 
         self.inlet_temperature = ip.init_temp()
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.InletTemp, 'inlet_temperature'),
+                                            (ReportTypes.OutletTemp, 'temperature')])
+
     def simulate_time_step(self, inputs: SimulationResponse):
         return SimulationResponse(inputs.time, inputs.time_step, inputs.flow_rate, self.temperature)
 
     def report_outputs(self):
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.InletTemp): self.inlet_temperature,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): self.temperature}
+        return self.report_vars.to_dict(self.op)
@@ -4,6 +4,7 @@ from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 from glhe.profiles.external_base import ExternalBase
 
 
@@ -26,6 +27,10 @@ class ExternalLoad(ExternalBase, SimulationEntryPoint):
         self.load = self.get_value(0)
         self.outlet_temp = 0
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.OutletTemp, 'outlet_temp'),
+                                            (ReportTypes.HeatRate, 'load')])
+
     def simulate_time_step(self, inputs: SimulationResponse):
         flow_rate = inputs.flow_rate
 
@@ -42,5 +47,4 @@ class ExternalLoad(ExternalBase, SimulationEntryPoint):
         return SimulationResponse(inputs.time, inputs.time_step, inputs.flow_rate, self.outlet_temp)
 
     def report_outputs(self):
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): float(self.outlet_temp),
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRate): float(self.load)}
+        return self.report_vars.to_dict(self.op)
@@ -4,6 +4,7 @@ from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 from glhe.profiles.external_base import ExternalBase
 
 
@@ -25,9 +26,12 @@ class ExternalTemps(ExternalBase, SimulationEntryPoint):
         # report variables
         self.outlet_temp = self.get_value(0)
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.OutletTemp, 'outlet_temp')])
+
     def simulate_time_step(self, inputs: SimulationResponse):
         self.outlet_temp = self.get_value(inputs.time + inputs.time_step)
         return SimulationResponse(inputs.time, inputs.time_step, inputs.flow_rate, self.outlet_temp)
 
     def report_outputs(self):
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): float(self.outlet_temp)}
+        return self.report_vars.to_dict(self.op)
@@ -3,6 +3,7 @@ from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 
 
 class PulseLoad(SimulationEntryPoint):
@@ -19,6 +20,10 @@ class PulseLoad(SimulationEntryPoint):
         # report variables
         self.outlet_temp = 0
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.OutletTemp, 'outlet_temp'),
+                                            (ReportTypes.HeatRate, 'load')])
+
     def simulate_time_step(self, inputs: SimulationResponse):
 
         if self.start_time <= inputs.time + inputs.time_step < self.end_time:
@@ -37,5 +42,4 @@ class PulseLoad(SimulationEntryPoint):
             return inputs
 
     def report_outputs(self):
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): float(self.outlet_temp),
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRate): float(self.load)}
+        return self.report_vars.to_dict(self.op)
@@ -6,6 +6,7 @@ from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 
 
 class SinusoidLoad(SimulationEntryPoint):
@@ -23,6 +24,10 @@ class SinusoidLoad(SimulationEntryPoint):
         self.load = 0
         self.outlet_temp = 0
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.OutletTemp, 'outlet_temp'),
+                                            (ReportTypes.HeatRate, 'load')])
+
     def simulate_time_step(self, inputs: SimulationResponse):
         flow_rate = inputs.flow_rate
 
@@ -39,5 +44,4 @@ class SinusoidLoad(SimulationEntryPoint):
         return SimulationResponse(inputs.time, inputs.time_step, inputs.flow_rate, self.outlet_temp)
 
     def report_outputs(self):
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): float(self.outlet_temp),
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRate): float(self.load)}
+        return self.report_vars.to_dict(self.op)
@@ -8,6 +8,7 @@ from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 
 
 class SyntheticBase(object):
@@ -110,6 +111,10 @@ class SyntheticLoad(SyntheticBase, SimulationEntryPoint):
         else:
             raise ValueError("Synthetic method '{}' is not valid.".format(method))
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.OutletTemp, 'outlet_temp'),
+                                            (ReportTypes.HeatRate, 'load')])
+
     def simulate_time_step(self, inputs: SimulationResponse):
         flow_rate = inputs.flow_rate
 
@@ -126,5 +131,4 @@ class SyntheticLoad(SyntheticBase, SimulationEntryPoint):
         return SimulationResponse(inputs.time, inputs.time_step, inputs.flow_rate, self.outlet_temp)
 
     def report_outputs(self):
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): float(self.outlet_temp),
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRate): float(self.load)}
+        return self.report_vars.to_dict(self.op)
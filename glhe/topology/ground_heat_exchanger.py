@@ -1,3 +1,5 @@
+import os
+
 from glhe.input_processor.component_types import ComponentTypes
 from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
@@ -23,23 +25,40 @@ class GroundHeatExchanger(SimulationEntryPoint):
             # init TRCM model
             self.sts_ghe = GroundHeatExchangerSTS(inputs, ip, op)
 
+            generated = {}
+            if 'g-function-path' not in inputs:
+                generated['g-function-path'] = os.path.join(op.output_dir, 'g.csv')
+
             if 'g_b-function-path' not in inputs:
-                if 'g_b-flow-rate' not in inputs:
-                    self.sts_ghe.generate_g_b()
+                if 'g_b-flow-rates' in inputs:
+                    flow_rates = inputs['g_b-flow-rates']
+                elif 'g_b-flow-rate' in inputs:
+                    flow_rates = [inputs['g_b-flow-rate']]
                 else:
-                    self.sts_ghe.generate_g_b(inputs['g_b-flow-rate'])
+                    flow_rates = self.get_flow_profile_rates()
+                    if len(flow_rates) > 1:
+                        generated['g_b-flow-rates'] = flow_rates
+
+                # generate in the main process, unless workers are requested
+                try:
+                    workers = inputs['g_b-generation-workers']
+                except KeyError:
+                    workers = 1
+
+                generated['g_b-function-path'] = self.sts_ghe.generate_g_b_table(flow_rates, workers)
 
             # init enhanced model
             d_bh_ave = self.sts_ghe.average_bh()
-            lts_inputs = merge_dicts(inputs, {'length': self.sts_ghe.h,
-                                              'number-boreholes': self.sts_ghe.num_bh,
-                                              'average-borehole': d_bh_ave})
+            lts_inputs = merge_dicts(inputs, merge_dicts(generated, {'length': self.sts_ghe.h,
+                                                                     'number-boreholes': self.sts_ghe.num_bh,
+                                                                     'average-borehole': d_bh_ave}))
 
             self.lts_ghe = GroundHeatExchangerLTS(lts_inputs, ip, op)
 
             # alias functions based on sim mode
             self.simulate_time_step = self.lts_ghe.simulate_time_step
             self.report_outputs = self.lts_ghe.report_outputs
+            self.report_vars = self.lts_ghe.report_vars
 
         elif self.sim_mode == 'direct':
             # init TRCM model only
@@ -48,10 +67,31 @@ class GroundHeatExchanger(SimulationEntryPoint):
             # alias functions based on sim mode
             self.simulate_time_step = self.sts_ghe.simulate_time_step
             self.report_outputs = self.sts_ghe.report_outputs
+            self.report_vars = self.sts_ghe.report_vars
 
         else:
             raise ValueError("Simulation mode '{]' is not valid".format(self.sim_mode))  # pragma: no cover
 
+    def get_flow_profile_rates(self) -> list:
+        """
+        Flow rates of the constant flow profiles in the inputs, at which to generate the g_b-functions.
+        Defaults to 0.5 kg/s if there are none, e.g. if the flow profiles are external.
+
+        :return: sorted list of flow rates, in kg/s
+        """
+
+        flow_rates = set()
+        try:
+            for profile in self.ip.input_dict['flow-profile']:
+                if profile['flow-profile-type'].lower() == 'constant' and profile['value'] > 0:
+                    flow_rates.add(profile['value'])
+        except KeyError:
+            pass
+
+        if not flow_rates:
+            return [0.5]
+        return sorted(flow_rates)
+
     def simulate_time_step(self, inputs: SimulationResponse):
         pass  # pragma: no cover
 
@@ -1,12 +1,16 @@
 from math import pi
 
+import numpy as np
+
 from glhe.aggregation.agg_factory import make_agg_method
+from glhe.aggregation.no_agg import NoAgg
 from glhe.input_processor.component_types import ComponentTypes
 from glhe.input_processor.input_processor import InputProcessor
 from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 from glhe.topology.borehole_factory import make_borehole
 from glhe.topology.cross_ghe import CrossGHE
 from glhe.utilities.functions import merge_dicts
@@ -35,10 +39,16 @@ class GroundHeatExchangerLTS(SimulationEntryPoint):
                                                              'g_b-function-path': inputs['g_b-function-path'],
                                                              'time-scale': ts})
 
+        self.g_b_flow_dependent = False
         if 'g_b-flow-rates' in inputs:
             la_inputs['g_b-flow-rates'] = inputs['g_b-flow-rates']
+            self.g_b_flow_dependent = True
         self.load_agg = make_agg_method(la_inputs, ip)
 
+        # no aggregation instance for batch simulations. only created if needed.
+        self.la_inputs = la_inputs
+        self.batch_agg = None
+
         # average borehole
         d_ave_bh = {'average-borehole': inputs['average-borehole'],
                     'name': 'average-borehole',
@@ -81,6 +91,15 @@ class GroundHeatExchangerLTS(SimulationEntryPoint):
         self.resist_b = 0
         self.resist_b_eff = 0
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.HeatRate, 'heat_rate'),
+                                            (ReportTypes.InletTemp, 'inlet_temperature'),
+                                            (ReportTypes.OutletTemp, 'outlet_temperature'),
+                                            (ReportTypes.BHWallTemp, 'bh_wall_temperature'),
+                                            (ReportTypes.BHResist, 'resist_b'),
+                                            (ReportTypes.BHEffResist, 'resist_b_eff')],
+                                           children=[self.ave_bh.report_vars])
+
     def simulate_time_step(self, inputs: SimulationResponse):
         time = inputs.time
         dt = inputs.time_step
@@ -140,14 +159,74 @@ class GroundHeatExchangerLTS(SimulationEntryPoint):
 
         return SimulationResponse(inputs.time, inputs.time_step, inputs.flow_rate, self.outlet_temperature)
 
+    def simulate_batch(self, heat_rates: np.ndarray, time_step: int, flow_rate: float) -> dict:
+        """
+        Simulate a known load profile for the whole run at once.
+
+        With the heat transfer rate prescribed in advance there is no feedback from the fluid temperatures, so the
+        response is a single convolution of the load steps with the g-functions. This is computed by FFT with
+        NoAgg.calc_temporal_superposition_batch, so the load aggregation method isn't used. Time steps and the flow
+        rate must be constant.
+
+        This is only available from the library, not from the simulation inputs. It differs from running
+        simulate_time_step over the same load profile in that:
+        - the borehole resistance and the fluid specific heat are evaluated once, at the initial temperature,
+        rather than at the inlet temperature of each time step
+        - cross-loads are not supported
+        With the same properties, the results match simulate_time_step with no load aggregation.
+
+        :param heat_rates: total heat transfer rate for each time step, in W. positive for heat rejected to the ground.
+        :param time_step: time step, in seconds
+        :param flow_rate: total mass flow rate, in kg/s
+        :return: dict of report variable arrays, one value per time step
+        """
+
+        if self.cross_ghe_present:
+            raise ValueError("Batch simulation is not valid with cross-loads.")
+
+        heat_rates = np.asarray(heat_rates, dtype=float)
+        num_steps = heat_rates.size
+        flow_rate_path = flow_rate / self.num_paths
+
+        if self.batch_agg is None:
+            self.batch_agg = NoAgg(self.la_inputs)
+
+        # change in normalized heat transfer rate (W/m) at the start of each time step
+        q = heat_rates / (self.h * self.num_bh)
+        dq = np.diff(q, prepend=0)
+
+        # convolution of delta_q and the g-function values for the history, by FFT
+        hist_g, hist_g_b = self.batch_agg.calc_temporal_superposition_batch(q * time_step, time_step, flow_rate_path)
+
+        # current time step
+        g = self.batch_agg.get_g_value(time_step)
+        g_b = self.batch_agg.get_g_b_value(time_step, flow_rate_path)
+
+        init_temp = self.ip.init_temp()
+        resist_b = self.ave_bh.calc_bh_average_resistance(temperature=init_temp, flow_rate=flow_rate)
+        cp = self.fluid.get_cp(init_temp)
+
+        times = np.arange(num_steps) * time_step
+        soil_temps = np.array([self.soil.get_temp(t, self.h) for t in times], dtype=float)
+
+        outlet_temps = soil_temps + self.c_0 * (hist_g + dq * g) + resist_b * (hist_g_b + dq * g_b)
+        inlet_temps = outlet_temps + heat_rates / (flow_rate * cp)
+        bh_wall_temps = soil_temps + self.c_0 * hist_g
+
+        # set report variables to the final time step
+        if num_steps > 0:
+            self.q = q[-1]
+            self.energy = self.q * time_step
+            self.heat_rate = heat_rates[-1]
+            self.inlet_temperature = inlet_temps[-1]
+            self.outlet_temperature = outlet_temps[-1]
+            self.bh_wall_temperature = bh_wall_temps[-1]
+            self.resist_b = resist_b
+
+        return {ReportTypes.HeatRate: heat_rates,
+                ReportTypes.InletTemp: inlet_temps,
+                ReportTypes.OutletTemp: outlet_temps,
+                ReportTypes.BHWallTemp: bh_wall_temps}
+
     def report_outputs(self):
-        d = {}
-        d = merge_dicts(d, self.ave_bh.report_outputs())
-        d_self = {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRate): self.heat_rate,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.InletTemp): self.inlet_temperature,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): self.outlet_temperature,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.BHWallTemp): self.bh_wall_temperature,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.BHResist): self.resist_b,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.BHEffResist): self.resist_b_eff}
-
-        return merge_dicts(d, d_self)
+        return self.report_vars.to_dict(self.op)
@@ -1,19 +1,27 @@
+import json
 import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pygfunction as gt
 from math import log, pi
 
 from glhe.aggregation.agg_factory import make_agg_method
+from glhe.g_function.g_function_cache import GFunctionCache
 from glhe.input_processor.component_types import ComponentTypes
 from glhe.input_processor.input_processor import InputProcessor
 from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 from glhe.topology.borehole_factory import make_borehole
+from glhe.topology.parallel_paths import ParallelPaths
 from glhe.topology.path import Path
 from glhe.topology.radial_numerical_borehole import RadialNumericalBH
+from glhe.topology.vectorized_borehole_field import VectorizedBoreholeField
 from glhe.utilities.constants import SEC_IN_DAY
 from glhe.utilities.functions import merge_dicts
 from glhe.utilities.functions import resample_g_functions
@@ -25,6 +33,7 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
 
     def __init__(self, inputs: dict, ip: InputProcessor, op: OutputProcessor):
         SimulationEntryPoint.__init__(self, inputs)
+        self.inputs = inputs
         self.ip = ip
         self.op = op
 
@@ -42,6 +51,51 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
         self.num_bh = self.count_bhs()
         self.num_paths = len(self.paths)
 
+        # all paths get the same inlet conditions, so paths with the same definitions have the same response.
+        # only one representative of each set of identical paths is simulated, and it's weighted by the number of
+        # paths it represents.
+        self.unique_paths = []
+        self.unique_paths_inputs = []
+        self.path_multiplicity = []
+        self.path_copies = []
+        self.find_unique_paths(inputs['flow-paths'])
+
+        # set the borehole field engine. apply default if needed.
+        # 'object' simulates each path, borehole, and segment instance in turn. 'vectorized' advances all boreholes
+        # together, with their states stored in arrays.
+        try:
+            self.field_engine = inputs['field-engine']
+        except KeyError:
+            self.field_engine = 'object'
+
+        # instances whose report variables are copied to the other paths
+        also_reported = {src for src, _, _ in self.path_copies}
+
+        if self.field_engine == 'vectorized':
+            if 'parallel-paths' in inputs:
+                raise ValueError("'parallel-paths' cannot be used with the vectorized field engine.")
+            self.field = VectorizedBoreholeField(self.unique_paths, op, also_reported=also_reported)
+        elif self.field_engine == 'object':
+            self.field = None
+        else:
+            raise ValueError("Field engine '{}' is not valid.".format(self.field_engine))
+
+        # paths are only simulated in direct mode. in enhanced mode, this model only provides the borehole data.
+        try:
+            sim_mode = inputs['simulation-mode']
+        except KeyError:
+            sim_mode = 'direct'
+
+        # simulate the paths on a pool of worker processes. optional, and only started in direct mode.
+        try:
+            workers = inputs['parallel-paths']['workers']
+        except KeyError:
+            workers = 1
+
+        if sim_mode == 'direct' and workers > 1 and len(self.unique_paths) > 1:
+            self.field = ParallelPaths(self.unique_paths, self.unique_paths_inputs, ip, op, workers,
+                                       also_reported=also_reported)
+
         # generate the g-function data
         self.ts = self.h ** 2 / (9 * self.soil.diffusivity)
         self.lntts = None
@@ -49,6 +103,11 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
         self.lntts_b = None
         self.g_b = None
 
+        # persistent g-function cache. optional.
+        self.g_cache = None
+        if 'g-function-cache' in inputs:
+            self.g_cache = GFunctionCache(inputs['g-function-cache'])
+
         if 'g-function-path' in inputs:
             data_g = np.genfromtxt(inputs['g-function-path'], delimiter=',')
             self.lntts = data_g[:, 0]
@@ -74,6 +133,78 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
         self.outlet_temperature = ip.init_temp()
         self.bh_wall_temperature = ip.init_temp()
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.HeatRate, 'heat_rate'),
+                                            (ReportTypes.HeatRateBH, 'heat_rate_bh'),
+                                            (ReportTypes.InletTemp, 'inlet_temperature'),
+                                            (ReportTypes.OutletTemp, 'outlet_temperature'),
+                                            (ReportTypes.BHWallTemp, 'bh_wall_temperature')],
+                                           children=[path.report_vars for path in self.paths])
+
+    def get_path_key(self, path_inputs: dict) -> str:
+        """
+        Key of the definitions which determine the response of a path to its inlet conditions.
+        Component names and borehole locations are not included.
+
+        :param path_inputs: flow path inputs
+        :return: path key
+        """
+
+        def get_definition(obj_type, name):
+            return {k: v for k, v in self.ip.get_definition_object(obj_type, name).items() if k != 'name'}
+
+        comps = []
+        for comp in path_inputs['components']:
+            comp_type = comp['comp-type']
+            comp_inputs = get_definition(comp_type, comp['name'])
+            if comp_type == 'borehole':
+                bh_def = get_definition('borehole-definitions', comp_inputs['borehole-def-name'])
+                comp_inputs = {'borehole-definition': bh_def,
+                               'pipe-definition': get_definition('pipe-definitions', bh_def['pipe-def-name']),
+                               'grout-definition': get_definition('grout-definitions', bh_def['grout-def-name'])}
+            else:
+                comp_inputs['pipe-definition'] = get_definition('pipe-definitions', comp_inputs['pipe-def-name'])
+            comps.append([comp_type, comp_inputs])
+
+        return json.dumps(comps, sort_keys=True)
+
+    def find_unique_paths(self, paths_inputs: list):
+        """
+        Group the paths with the same definitions. The first path of each group is simulated, and the report
+        variables of the others are copied from it.
+
+        :param paths_inputs: list of flow path inputs
+        """
+
+        groups = {}
+        groups_inputs = {}
+        for path, path_inputs in zip(self.paths, paths_inputs):
+            key = self.get_path_key(path_inputs)
+            groups.setdefault(key, []).append(path)
+            groups_inputs.setdefault(key, []).append(path_inputs)
+
+        self.unique_paths = [group[0] for group in groups.values()]
+        self.unique_paths_inputs = [path_inputs[0] for path_inputs in groups_inputs.values()]
+        self.path_multiplicity = np.array([len(group) for group in groups.values()], dtype=float)
+
+        # report variables of the reported components on the other paths
+        def add_copies(src, dst):
+            for src_child, dst_child in zip(src.children, dst.children):
+                add_copies(src_child, dst_child)
+
+            if dst.attrs and self.op.report_component(dst.comp_type, dst.name or ''):
+                self.path_copies.append((src.obj, dst.obj, dst.attrs))
+
+        self.path_copies = []
+        for group in groups.values():
+            for path in group[1:]:
+                add_copies(group[0].report_vars, path.report_vars)
+
+    def copy_path_report_vars(self):
+        for src, dst, attrs in self.path_copies:
+            for attr in attrs:
+                setattr(dst, attr, getattr(src, attr))
+
     def average_bh(self):
         # local variables for later use
         ave_pipe_outer_dia = 0
@@ -135,6 +266,7 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
         # these are Eskilson-type g-functions for computing the bh wall temperature rise
         # determine "average" bh
         boreholes = []
+        bh_data = []
         for idx_path, path in enumerate(self.paths):
             for idx_comp, comp in enumerate(path.components):
                 if comp.Type == ComponentTypes.BoreholeSingleUTubeGrouted:
@@ -145,6 +277,7 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
                     x = comp.location.x
                     y = comp.location.y
                     boreholes.append(gt.boreholes.Borehole(h, d, r_b, x, y))
+                    bh_data.append([h, d, r_b, x, y])
 
         # generate lts g-functions using pygfunction
         end_time = self.ip.input_dict['simulation']['runtime']
@@ -154,12 +287,8 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
         lntts_start = log(min_fls_time / self.ts)
 
         lntts_lts = []
-        g_lts = []
-
         if end_time > min_fls_time:
             lntts_lts = np.arange(lntts_start, lntts_end, step=0.1)
-            times = np.exp(lntts_lts) * self.ts
-            g_lts = gt.gfunction.uniform_heat_extraction(boreholes, times, self.soil.diffusivity)
 
         # generate sts g-functions using radial-numerical model
         d_ave_bh = self.average_bh()
@@ -182,6 +311,33 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
                  'shank-spacing': d_ave_bh['shank-spacing'],
                  'length': d_ave_bh['length']}
 
+        # radial numerical model mesh and time stepping options. optional.
+        try:
+            d_sts.update(self.inputs['radial-numerical-model'])
+        except KeyError:
+            pass
+
+        # check the cache
+        key = None
+        if self.g_cache:
+            key = GFunctionCache.make_key('g', {'boreholes': bh_data,
+                                                'soil-diffusivity': self.soil.diffusivity,
+                                                'average-borehole': d_sts,
+                                                'time-scale': self.ts,
+                                                'min-fls-time': min_fls_time,
+                                                'lntts-lts': lntts_lts})
+            cached = self.g_cache.load(key)
+            if cached is not None:
+                self.lntts = cached['lntts']
+                self.g = cached['g']
+                write_arrays_to_csv(os.path.join(self.op.output_dir, 'g.csv'), [self.lntts, self.g])
+                return
+
+        g_lts = []
+        if end_time > min_fls_time:
+            times = np.exp(lntts_lts) * self.ts
+            g_lts = gt.gfunction.uniform_heat_extraction(boreholes, times, self.soil.diffusivity)
+
         rn_model = RadialNumericalBH(d_sts)
         lntts_sts, g_sts = rn_model.calc_sts_g_functions(final_time=min_fls_time, calculate_at_bh_wall=True)
 
@@ -198,6 +354,9 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
         self.g = np.insert(self.g, 0, 0)
         write_arrays_to_csv(os.path.join(self.op.output_dir, 'g.csv'), [self.lntts, self.g])
 
+        if self.g_cache:
+            self.g_cache.store(key, lntts=self.lntts, g=self.g)
+
     def generate_g_b(self, flow_rate=0.5):
 
         q = 10  # W/m
@@ -256,6 +415,95 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
 
         write_arrays_to_csv(os.path.join(self.op.output_dir, 'g_b.csv'), [self.lntts_b, self.g_b])
 
+    def make_g_b_key(self, flow_rate: float) -> str:
+        """
+        Cache key for the g_b-functions at one flow rate.
+
+        The g_b-functions depend on the full short time step model, so the key includes the model inputs,
+        the definitions they reference, the simulation runtime and initial temperature, and the g-function data.
+        The load profiles and plant topology are not included.
+
+        :param flow_rate: flow rate, in kg/s
+        :return: cache key
+        """
+
+        ghe_inputs = {k: v for k, v in self.inputs.items() if k not in ['g-function-path', 'g-function-cache']}
+        def_keys = ['borehole-definitions', 'borehole', 'pipe-definitions', 'grout-definitions', 'fluid', 'soil',
+                    'ground-temperature-model']
+        definitions = {k: self.ip.input_dict[k] for k in def_keys if k in self.ip.input_dict}
+        sim = self.ip.input_dict['simulation']
+
+        return GFunctionCache.make_key('g_b', {'ground-heat-exchanger': ghe_inputs,
+                                               'definitions': definitions,
+                                               'runtime': sim['runtime'],
+                                               'initial-temperature': self.ip.init_temp(),
+                                               'lntts': self.lntts,
+                                               'g': self.g,
+                                               'flow-rate': flow_rate})
+
+    def generate_g_b_table(self, flow_rates: list, workers: int = 1) -> str:
+        """
+        Generate g_b-functions for each flow rate, and write them to one file with a column for each flow rate,
+        e.g. 'lntts1,g_b1,g_b2,...,g_bn', which is the format expected for 'g_b-flow-rates' inputs.
+
+        Each flow rate is run with a new instance of the short time step model, in parallel worker processes if
+        more than one worker is requested. Flow rates found in the g-function cache, if used, are loaded instead.
+
+        :param flow_rates: flow rates, in kg/s
+        :param workers: number of worker processes. defaults to running in the main process.
+        :return: path to the g_b-function file
+        """
+
+        results = {}
+        keys = {}
+
+        if self.g_cache:
+            for flow_rate in flow_rates:
+                keys[flow_rate] = self.make_g_b_key(flow_rate)
+                cached = self.g_cache.load(keys[flow_rate])
+                if cached is not None:
+                    results[flow_rate] = (cached['lntts'], cached['g_b'])
+
+        to_run = [flow_rate for flow_rate in flow_rates if flow_rate not in results]
+
+        if to_run:
+            # the workers load the g-function data from file, rather than generating it again
+            temp_dir = tempfile.mkdtemp()
+            try:
+                path_g = os.path.join(temp_dir, 'g.csv')
+                write_arrays_to_csv(path_g, [self.lntts, self.g])
+
+                inputs = {k: v for k, v in self.inputs.items() if k not in ['g-function-cache', 'parallel-paths']}
+                inputs['g-function-path'] = path_g
+                args = [(inputs, self.ip, flow_rate) for flow_rate in to_run]
+
+                workers = min(workers, len(to_run))
+
+                if workers > 1:
+                    with ProcessPoolExecutor(max_workers=workers) as pool:
+                        responses = list(pool.map(generate_g_b_worker, args))
+                else:
+                    responses = [generate_g_b_worker(arg) for arg in args]
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+            for flow_rate, (lntts_b, g_b) in zip(to_run, responses):
+                results[flow_rate] = (lntts_b, g_b)
+                if self.g_cache:
+                    self.g_cache.store(keys[flow_rate], lntts=lntts_b, g_b=g_b)
+
+        # merge onto a common ln(t/ts) grid.
+        # the flow rates may converge at different times. the last value is held past the end of each.
+        lntts_min = min(results[flow_rate][0][0] for flow_rate in flow_rates)
+        lntts_max = max(results[flow_rate][0][-1] for flow_rate in flow_rates)
+        num_points = int(round((lntts_max - lntts_min) / 0.1)) + 1
+        self.lntts_b = np.linspace(lntts_min, lntts_max, num_points)
+        self.g_b = np.transpose([np.interp(self.lntts_b, *results[flow_rate]) for flow_rate in flow_rates])
+
+        path = os.path.join(self.op.output_dir, 'g_b_flow_rates.csv')
+        write_arrays_to_csv(path, [self.lntts_b] + list(np.transpose(self.g_b)))
+        return path
+
     def calc_bh_ave_length(self):
         valid_bh_types = [ComponentTypes.BoreholeSingleUTubeGrouted]
         ave_length = 0
@@ -297,11 +545,18 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
 
         path_inlet_conditions = SimulationResponse(inputs.time, inputs.time_step, flow, inlet_temp,
                                                    self.bh_wall_temperature)
-        path_responses = []
-        for path in self.paths:
-            path_responses.append(path.simulate_time_step(path_inlet_conditions))
+        if self.field:
+            path_outlet_temps = self.field.simulate_time_step(path_inlet_conditions)
+            outlet_temp = self.mix_temperatures(np.full(len(self.unique_paths), flow), path_outlet_temps,
+                                                self.path_multiplicity)
+        else:
+            path_responses = []
+            for path in self.unique_paths:
+                path_responses.append(path.simulate_time_step(path_inlet_conditions))
 
-        outlet_temp = self.mix_paths(path_responses)
+            outlet_temp = self.mix_paths(path_responses, self.path_multiplicity)
+
+        self.copy_path_report_vars()
 
         # update report variables
         # TODO: generalize first-law computations everywhere
@@ -320,35 +575,55 @@ class GroundHeatExchangerSTS(SimulationEntryPoint):
         return SimulationResponse(inputs.time, inputs.time_step, flow, outlet_temp)
 
     def get_heat_rate_bh(self):
+        if self.field:
+            return self.field.get_heat_rate_bh(self.path_multiplicity)
+
         bh_ht_rate = 0
-        for path in self.paths:
-            bh_ht_rate += path.get_heat_rate_bh()
+        for path, multiplicity in zip(self.unique_paths, self.path_multiplicity):
+            bh_ht_rate += multiplicity * path.get_heat_rate_bh()
         return bh_ht_rate
 
-    def mix_paths(self, responses: list) -> float:
-        sum_mdot_cp_temp = 0
-        sum_mdot = 0
-        sum_cp = 0
-        for r in responses:
-            temp = r.temperature
-            m_dot = r.flow_rate
-            cp = self.fluid.get_cp(temp)
-            sum_mdot_cp_temp += m_dot * cp * temp
-            sum_mdot += m_dot
-            sum_cp += cp
-
-        ave_cp = sum_cp / len(responses)
-        return sum_mdot_cp_temp / (sum_mdot * ave_cp)
+    def mix_paths(self, responses: list, multiplicity: np.ndarray = None) -> float:
+        flow_rates = np.array([r.flow_rate for r in responses], dtype=float)
+        temps = np.array([r.temperature for r in responses], dtype=float)
+        return self.mix_temperatures(flow_rates, temps, multiplicity)
+
+    def mix_temperatures(self, flow_rates: np.ndarray, temps: np.ndarray, multiplicity: np.ndarray = None) -> float:
+        """
+        Mix the path outlet flows
+
+        :param flow_rates: path flow rates, kg/s
+        :param temps: path outlet temperatures, C
+        :param multiplicity: number of paths represented by each flow. defaults to one each.
+        :return: mixed outlet temperature, C
+        """
+
+        if multiplicity is None:
+            multiplicity = np.ones(temps.size)
+
+        cp = self.fluid.cp_interp(temps)
+        ave_cp = np.sum(multiplicity * cp) / np.sum(multiplicity)
+        return float(np.sum(multiplicity * flow_rates * cp * temps) / (np.sum(multiplicity * flow_rates) * ave_cp))
 
     def report_outputs(self) -> dict:
-        d = {}
-        for path in self.paths:
-            d = merge_dicts(d, path.report_outputs())
+        return self.report_vars.to_dict(self.op)
+
+
+def generate_g_b_worker(args: tuple) -> tuple:
+    """
+    Generate the g_b-functions for one flow rate, with a new instance of the short time step model.
+
+    :param args: tuple of short time step model inputs, input processor, and flow rate
+    :return: tuple of lntts and g_b-function values
+    """
+
+    inputs, ip, flow_rate = args
 
-        d_self = {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRate): self.heat_rate,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRateBH): self.heat_rate_bh,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.InletTemp): self.inlet_temperature,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): self.outlet_temperature,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.BHWallTemp): self.bh_wall_temperature}
+    temp_dir = tempfile.mkdtemp()
+    try:
+        ghe = GroundHeatExchangerSTS(inputs, ip, OutputProcessor(temp_dir, 'out.csv'))
+        ghe.generate_g_b(flow_rate)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
-        return merge_dicts(d, d_self)
+    return ghe.lntts_b, ghe.g_b
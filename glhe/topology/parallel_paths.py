@@ -0,0 +1,283 @@
+import multiprocessing
+import shutil
+import tempfile
+import traceback
+import weakref
+
+import numpy as np
+
+from glhe.interface.response import SimulationResponse
+from glhe.output_processor.output_processor import OutputProcessor
+from glhe.topology.path import Path
+
+
+def get_report_attrs(report_vars) -> list:
+    """
+    Flatten the report variables of a component and its sub-components
+
+    :param report_vars: ReportVariables instance
+    :return: list of (instance, attribute name) tuples, with the sub-components first
+    """
+
+    attrs = []
+    for child in report_vars.children:
+        attrs.extend(get_report_attrs(child))
+    attrs.extend((report_vars.obj, attr) for attr in report_vars.attrs)
+    return attrs
+
+
+def calc_path_cost(path_inputs: dict, ip) -> int:
+    """
+    Estimate the relative cost of simulating a path, from the number of borehole segments
+
+    :param path_inputs: flow path inputs
+    :param ip: input processor instance
+    :return: relative cost
+    """
+
+    cost = 0
+    for comp in path_inputs['components']:
+        cost += 1
+        if comp['comp-type'] == 'borehole':
+            bh_inputs = ip.get_definition_object('borehole', comp['name'])
+            bh_def = ip.get_definition_object('borehole-definitions', bh_inputs['borehole-def-name'])
+            try:
+                cost += bh_def['segments']
+            except KeyError:
+                cost += 1
+    return cost
+
+
+def path_worker(conn, shm_name: str, shape: tuple, path_idxs: list, paths_inputs: list, ip):
+    """
+    Worker process loop. The worker holds its own instances of its paths, and simulates them for each set of inlet
+    conditions it receives. The path outlet temperatures, borehole heat transfer rates, and report variable values
+    are written to the path rows of the shared results array.
+
+    :param conn: connection to the main process
+    :param shm_name: name of the shared memory block holding the results array
+    :param shape: shape of the results array
+    :param path_idxs: rows of the paths simulated by this worker
+    :param paths_inputs: list of flow path inputs, for all rows
+    :param ip: input processor instance
+    """
+
+    from multiprocessing.shared_memory import SharedMemory
+
+    temp_dir = tempfile.mkdtemp()
+    shm = SharedMemory(name=shm_name)
+    results = np.ndarray(shape, dtype=float, buffer=shm.buf)
+
+    try:
+        op = OutputProcessor(temp_dir, 'out.csv')
+        paths = [Path(paths_inputs[idx], ip, op) for idx in path_idxs]
+        report_attrs = [get_report_attrs(path.report_vars) for path in paths]
+
+        while True:
+            msg = conn.recv()
+            if msg is None:
+                break
+
+            try:
+                inputs = SimulationResponse(*msg)
+                for idx, path, attrs in zip(path_idxs, paths, report_attrs):
+                    response = path.simulate_time_step(inputs)
+                    results[idx, 0] = response.temperature
+                    results[idx, 1] = path.get_heat_rate_bh()
+                    results[idx, 2:2 + len(attrs)] = np.array([getattr(obj, attr) for obj, attr in attrs],
+                                                              dtype=float)
+                conn.send(None)
+            except Exception:
+                conn.send(traceback.format_exc())
+    finally:
+        del results
+        shm.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def shutdown_workers(conns: list, procs: list, shm):
+    """
+    Stop the worker processes, and release the shared memory
+
+    :param conns: connections to the workers
+    :param procs: worker processes
+    :param shm: shared memory block holding the results array
+    """
+
+    for conn in conns:
+        try:
+            conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+
+    for proc in procs:
+        proc.join(timeout=5)
+        if proc.is_alive():
+            proc.terminate()
+
+    for conn in conns:
+        conn.close()
+
+    # the results array may still be referenced at exit
+    try:
+        shm.close()
+    except BufferError:
+        pass
+    shm.unlink()
+
+
+class ParallelPaths(object):
+    """
+    Simulate flow paths on a persistent pool of worker processes.
+
+    Paths are independent within a time step, since they all get the same inlet conditions. Each worker holds its own
+    instances of a share of the paths, and keeps their state between time steps, so only the inlet conditions are
+    sent to the workers. The results are written to a shared memory array, with one row for each path, so they are
+    collected in path order no matter which worker finishes first.
+
+    The paths are assigned to the workers to balance the number of borehole segments. The report variables of the
+    path instances in the main process are updated from the results after each time step, but only for the
+    instances which have report variables selected for output.
+    """
+
+    def __init__(self, paths: list, paths_inputs: list, ip, op, workers: int, also_reported: set = None):
+        """
+        :param paths: list of Path instances in the main process. they are not simulated, only their report variables
+        are updated.
+        :param paths_inputs: list of flow path inputs, in the same order as the paths
+        :param ip: input processor instance
+        :param op: output processor instance
+        :param workers: number of worker processes
+        :param also_reported: set of path and sub-component instances which are updated even when they are not
+        reported, e.g. when other instances copy their report variables
+        """
+
+        if workers < 1:
+            raise ValueError("Number of workers '{}' is not valid.".format(workers))
+
+        # shared memory is only available from Python 3.8, so it's only required when workers are used
+        try:
+            from multiprocessing.shared_memory import SharedMemory
+        except ImportError:
+            raise ImportError('Parallel flow paths require Python 3.8 or later. Set the number of '
+                              'workers to 1.')
+
+        self.paths = paths
+        self.num_paths = len(paths)
+        self.workers = min(workers, self.num_paths)
+
+        if also_reported is None:
+            also_reported = set()
+
+        # report variables of the instances which are reported
+        report_attrs = [get_report_attrs(path.report_vars) for path in paths]
+        self.report_entries = []
+        for idx, attrs in enumerate(report_attrs):
+            for col, (obj, attr) in enumerate(attrs):
+                rv = obj.report_vars
+                if obj in also_reported or op.report_component(rv.comp_type, rv.name or ''):
+                    self.report_entries.append((obj, attr, idx, col + 2))
+
+        # results array. outlet temperature, borehole heat transfer rate, then the report variables of each path.
+        shape = (self.num_paths, 2 + max(len(attrs) for attrs in report_attrs))
+        self.shm = SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+        self.results = np.ndarray(shape, dtype=float, buffer=self.shm.buf)
+        self.results[:] = 0
+
+        # assign each path to the worker with the least work so far, starting with the most expensive paths
+        costs = [calc_path_cost(path_inputs, ip) for path_inputs in paths_inputs]
+        loads = [0] * self.workers
+        self.path_idxs = [[] for _ in range(self.workers)]
+        for idx in sorted(range(self.num_paths), key=lambda i: -costs[i]):
+            worker = loads.index(min(loads))
+            self.path_idxs[worker].append(idx)
+            loads[worker] += costs[idx]
+
+        self.conns = []
+        self.procs = []
+        for path_idxs in self.path_idxs:
+            conn, worker_conn = multiprocessing.Pipe()
+            proc = multiprocessing.Process(target=path_worker,
+                                           args=(worker_conn, self.shm.name, shape, sorted(path_idxs),
+                                                 paths_inputs, ip),
+                                           daemon=True)
+            proc.start()
+            worker_conn.close()
+            self.conns.append(conn)
+            self.procs.append(proc)
+
+        # stop the workers when this instance is discarded, or at exit
+        self.finalizer = weakref.finalize(self, shutdown_workers, self.conns, self.procs, self.shm)
+
+    def simulate_time_step(self, inputs: SimulationResponse) -> np.ndarray:
+        """
+        Simulate all flow paths, which share the same inlet conditions
+
+        :param inputs: path inlet conditions, with the borehole wall temperature
+        :return: outlet temperature of each path
+        """
+
+        msg = (inputs.time, inputs.time_step, inputs.flow_rate, inputs.temperature, inputs.bh_wall_temp)
+        for worker, conn in enumerate(self.conns):
+            try:
+                conn.send(msg)
+            except (BrokenPipeError, EOFError, OSError):
+                self.raise_worker_stopped(worker)
+
+        errors = []
+        for worker, conn in enumerate(self.conns):
+            try:
+                errors.append(conn.recv())
+            except (BrokenPipeError, EOFError, OSError):
+                self.raise_worker_stopped(worker)
+
+        for error in errors:
+            if error is not None:
+                raise RuntimeError('Path worker failed.\n{}'.format(error))
+
+        self.update_components()
+        return self.results[:, 0].copy()
+
+    def raise_worker_stopped(self, worker: int):
+        """
+        Shut the pool down, and report a worker which stopped without sending its results
+
+        :param worker: worker index
+        """
+
+        proc = self.procs[worker]
+        proc.join(timeout=5)
+        exitcode = proc.exitcode
+        path_names = [self.paths[idx].name for idx in sorted(self.path_idxs[worker])]
+        self.close()
+        raise RuntimeError("Path worker {} for paths {} stopped unexpectedly with exit code "
+                           "{}.".format(worker, path_names, exitcode))
+
+    def get_heat_rate_bh(self, multiplicity: np.ndarray = None) -> float:
+        """
+        Total borehole wall heat transfer rate
+
+        :param multiplicity: number of paths represented by each path. defaults to one each.
+        :return: heat transfer rate, W
+        """
+
+        if multiplicity is None:
+            return float(np.sum(self.results[:, 1]))
+        return float(np.dot(multiplicity, self.results[:, 1]))
+
+    def update_components(self):
+        """
+        Update the report variables of the instances in the main process which are reported
+        """
+
+        results = self.results.tolist()
+        for obj, attr, idx, col in self.report_entries:
+            setattr(obj, attr, results[idx][col])
+
+    def close(self):
+        """
+        Stop the worker processes
+        """
+
+        self.results = None
+        self.finalizer()
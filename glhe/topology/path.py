@@ -2,8 +2,8 @@ from glhe.input_processor.component_types import ComponentTypes
 from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 from glhe.topology.ground_heat_exchanger_component_factory import make_ghe_component
-from glhe.utilities.functions import merge_dicts
 
 
 class Path(SimulationEntryPoint):
@@ -32,6 +32,12 @@ class Path(SimulationEntryPoint):
         self.outlet_temperature = ip.init_temp()
         self.flow_rate = 0
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.FlowRate, 'flow_rate'),
+                                            (ReportTypes.InletTemp, 'inlet_temperature'),
+                                            (ReportTypes.OutletTemp, 'outlet_temperature')],
+                                           children=[comp.report_vars for comp in self.components])
+
     def get_heat_rate_bh(self):
         bh_ht_rate = 0
         for comp in self.components:
@@ -57,12 +63,4 @@ class Path(SimulationEntryPoint):
         return response
 
     def report_outputs(self) -> dict:
-        d = {}
-        for comp in self.components:
-            d = merge_dicts(d, comp.report_outputs())
-
-        d_self = {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.FlowRate): self.flow_rate,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.InletTemp): self.inlet_temperature,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): self.outlet_temperature}
-
-        return merge_dicts(d, d_self)
+        return self.report_vars.to_dict(self.op)
@@ -1,16 +1,16 @@
 from collections import deque
 
 import numpy as np
-from math import ceil, log, pi, sqrt
+from math import log, pi
 
 from glhe.input_processor.component_types import ComponentTypes
 from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 from glhe.properties.base_properties import PropertiesBase
 from glhe.utilities.functions import lin_interp
 from glhe.utilities.functions import smoothing_function
-from glhe.utilities.functions import tdma_1
 
 
 class Pipe(PropertiesBase, SimulationEntryPoint):
@@ -80,6 +80,12 @@ class Pipe(PropertiesBase, SimulationEntryPoint):
         self.inlet_temps_times = deque([0.0])
         self.outlet_temperature = ip.init_temp()
 
+        # pipes internal to other components are not named
+        self.report_vars = ReportVariables(self, self.Type, getattr(self, 'name', None),
+                                           [(ReportTypes.OutletTemp, 'outlet_temperature'),
+                                            (ReportTypes.PipeResist, 'resist_pipe'),
+                                            (ReportTypes.ReynoldsNo, 're')])
+
     def calc_transit_time(self, flow_rate: float, temperature: float) -> float:
         """
         Compute transit time of pipe.
@@ -118,22 +124,12 @@ class Pipe(PropertiesBase, SimulationEntryPoint):
 
         if dt_tot > 0:
             re = self.m_dot_to_re(m_dot, inlet_temp)
-            r_p = self.inner_radius
-            l = self.length
 
             # total transit time
             tau = self.calc_transit_time(m_dot, inlet_temp)
 
-            # Rees Eq. 18
-            # Peclet number
-            peclet = 1 / (2 * r_p / l * (3.e7 * re ** -2.1 + 1.35 * re ** -0.125))
-
-            # Rees Eq. 17
-            # transit time for ideal-mixed cells
-            tau_n = tau * sqrt(2 / (num_cells * peclet))
-
-            # transit time for plug-flow cell
-            tau_0 = tau - num_cells * tau_n
+            # transit times for the ideal-mixed cells and the plug-flow cell
+            tau_n, tau_0 = self.calc_mixing_transit_times(tau, re, self.inner_radius, self.length, num_cells)
 
             # volume flow rate
             v_dot = m_dot / self.fluid.get_rho(inlet_temp)
@@ -142,32 +138,21 @@ class Pipe(PropertiesBase, SimulationEntryPoint):
             v_n = tau_n * v_dot
 
             # check for sub-stepping
-            # limit maximum step to 10% of the transit time
-            if (dt_tot / tau) > 0.10:
-                num_sub_steps = ceil(dt_tot / tau)
-                dt = dt_tot / num_sub_steps
-            else:
-                num_sub_steps = 1
-                dt = dt_tot
+            num_sub_steps = int(self.calc_num_sub_steps(dt_tot, tau))
+            dt = dt_tot / num_sub_steps
 
             steps = [dt] * num_sub_steps
             t_sub = time
 
-            # setup tri-diagonal equations
-            a = np.full(num_cells - 1, -v_dot)
-            b = np.full(num_cells, v_n / dt + v_dot)
-            b[0] = 1
-            c = np.full(num_cells - 1, 0)
             for _ in steps:
-                d = np.full(num_cells, v_n / dt) * self.cell_temps
                 if self.apply_transit_delay:
                     self.log_inlet_temps(inlet_temp, t_sub + dt)
-                    d[0] = self.plug_flow_outlet_temp(t_sub + dt - tau_0)
+                    cell_inlet_temp = self.plug_flow_outlet_temp(t_sub + dt - tau_0)
                 else:
-                    d[0] = inlet_temp
+                    cell_inlet_temp = inlet_temp
 
                 # solve for cell temps
-                self.cell_temps = tdma_1(a, b, c, d)
+                self.cell_temps = self.solve_mixed_cells(self.cell_temps, cell_inlet_temp, v_dot, v_n / dt)
 
                 # update time
                 t_sub += dt
@@ -226,9 +211,7 @@ class Pipe(PropertiesBase, SimulationEntryPoint):
         self.inlet_temps_times.append(time)
 
     def report_outputs(self) -> dict:
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): self.outlet_temperature,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.PipeResist): self.resist_pipe,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.ReynoldsNo): self.re}
+        return self.report_vars.to_dict(self.op)
 
     def m_dot_to_re(self, flow_rate, temp) -> float:
         """
@@ -238,7 +221,7 @@ class Pipe(PropertiesBase, SimulationEntryPoint):
         :param temp: temperature, C
         :return: Reynolds number
         """
-        self.re = 4 * flow_rate / (self.fluid.get_mu(temp) * pi * self.inner_diameter)
+        self.re = self.calc_reynolds_number(flow_rate, self.fluid.get_mu(temp), self.inner_diameter)
         return self.re
 
     def calc_friction_factor(self, re: float) -> float:
@@ -249,22 +232,7 @@ class Pipe(PropertiesBase, SimulationEntryPoint):
         In Advances in Heat Transfer, ed. T.F. Irvine and J.P. Hartnett, Vol. 6. New York Academic Press.
         """
 
-        # limits picked be within about 1% of actual values
-        low_reynolds = 1500
-        high_reynolds = 5000
-
-        if re < low_reynolds:
-            self.friction_factor = self.laminar_friction_factor(re)
-        elif low_reynolds <= re < high_reynolds:
-            f_low = self.laminar_friction_factor(re)
-
-            # pure turbulent flow
-            f_high = self.turbulent_friction_factor(re)
-            sigma = smoothing_function(re, a=3000, b=450)
-            self.friction_factor = (1 - sigma) * f_low + sigma * f_high
-        else:
-            self.friction_factor = self.turbulent_friction_factor(re)
-
+        self.friction_factor = float(self.smooth_friction_factor(re))
         return self.friction_factor
 
     def calc_cond_resist(self):
@@ -291,21 +259,9 @@ class Pipe(PropertiesBase, SimulationEntryPoint):
         :return convection resistance, K/(W/m)
         """
 
-        low_reynolds = 2000
-        high_reynolds = 4000
-
         re = self.m_dot_to_re(flow_rate, temperature)
-
-        if re < low_reynolds:
-            nu = self.laminar_nusselt()
-        elif low_reynolds <= re < high_reynolds:
-            nu_low = self.laminar_nusselt()
-            nu_high = self.turbulent_nusselt(re, temperature)
-            sigma = smoothing_function(re, a=3000, b=150)
-            nu = (1 - sigma) * nu_low + sigma * nu_high
-        else:
-            nu = self.turbulent_nusselt(re, temperature)
-        self.resist_conv = 1 / (nu * pi * self.fluid.get_k(temperature))
+        nu = self.smooth_nusselt(re, self.fluid.get_pr(temperature))
+        self.resist_conv = float(1 / (nu * pi * self.fluid.get_k(temperature)))
         return self.resist_conv
 
     def calc_resist(self, flow_rate: float, temperature: float):
@@ -343,9 +299,7 @@ class Pipe(PropertiesBase, SimulationEntryPoint):
         :return: Nusselt number
         """
 
-        f = self.calc_friction_factor(re)
-        pr = self.fluid.get_pr(temperature)
-        return (f / 8) * (re - 1000) * pr / (1 + 12.7 * (f / 8) ** 0.5 * (pr ** (2 / 3) - 1))
+        return self.gnielinski_nusselt(re, self.calc_friction_factor(re), self.fluid.get_pr(temperature))
 
     @staticmethod
     def laminar_friction_factor(re: float):
@@ -371,4 +325,156 @@ class Pipe(PropertiesBase, SimulationEntryPoint):
         :return: friction factor
         """
 
-        return (0.79 * log(re) - 1.64) ** (-2.0)
+        return (0.79 * np.log(re) - 1.64) ** (-2.0)
+
+    # the static methods below also take arrays, and are shared with the vectorized field engine
+
+    @staticmethod
+    def calc_reynolds_number(flow_rate: float, viscosity, inner_diameter):
+        """
+        Reynolds number of the flow in a pipe
+
+        :param flow_rate: mass flow rate, kg/s
+        :param viscosity: dynamic viscosity, Pa-s
+        :param inner_diameter: pipe inner diameter, m
+        :return: Reynolds number
+        """
+
+        return 4 * flow_rate / (viscosity * pi * inner_diameter)
+
+    @staticmethod
+    def smooth_friction_factor(re):
+        """
+        Friction factor in smooth tubes, blended between the laminar and turbulent friction factors
+
+        :param re: Reynolds number
+        :return: friction factor
+        """
+
+        # limits picked be within about 1% of actual values
+        low_reynolds = 1500
+        high_reynolds = 5000
+
+        # all branches are evaluated, and the ones which don't apply are discarded
+        re = np.asarray(re, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            f_low = Pipe.laminar_friction_factor(re)
+
+            # pure turbulent flow
+            f_high = Pipe.turbulent_friction_factor(re)
+            sigma = smoothing_function(re, a=3000, b=450)
+            f_mid = (1 - sigma) * f_low + sigma * f_high
+
+        return np.where(re < low_reynolds, f_low, np.where(re < high_reynolds, f_mid, f_high))
+
+    @staticmethod
+    def gnielinski_nusselt(re, friction_factor, pr):
+        """
+        Turbulent Nusselt number for smooth pipes
+
+        Gnielinski, V. 1976. 'New equations for heat and mass transfer in turbulent pipe and channel flow.'
+        International Chemical Engineering 16(1976), pp. 359-368.
+
+        :param re: Reynolds number
+        :param friction_factor: friction factor
+        :param pr: Prandtl number
+        :return: Nusselt number
+        """
+
+        f = friction_factor
+        return (f / 8) * (re - 1000) * pr / (1 + 12.7 * (f / 8) ** 0.5 * (pr ** (2 / 3) - 1))
+
+    @staticmethod
+    def smooth_nusselt(re, pr):
+        """
+        Nusselt number for smooth pipes, blended between the laminar and turbulent Nusselt numbers
+
+        :param re: Reynolds number
+        :param pr: Prandtl number
+        :return: Nusselt number
+        """
+
+        low_reynolds = 2000
+        high_reynolds = 4000
+
+        re = np.asarray(re, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            nu_low = Pipe.laminar_nusselt()
+            nu_high = Pipe.gnielinski_nusselt(re, Pipe.smooth_friction_factor(re), pr)
+            sigma = smoothing_function(re, a=3000, b=150)
+            nu_mid = (1 - sigma) * nu_low + sigma * nu_high
+
+        return np.where(re < low_reynolds, nu_low, np.where(re < high_reynolds, nu_mid, nu_high))
+
+    @staticmethod
+    def calc_mixing_transit_times(tau, re, inner_radius, length, num_cells: int) -> tuple:
+        """
+        Transit times of the ideal-mixed cells and the plug-flow cell
+
+        Rees, S.J. 2015. 'An extended two-dimensional borehole heat exchanger model for
+        simulation of short and medium timescale thermal response.' Renewable Energy. 83: 518-526.
+
+        :param tau: total transit time, s
+        :param re: Reynolds number
+        :param inner_radius: pipe inner radius, m
+        :param length: pipe length, m
+        :param num_cells: number of ideal-mixed cells
+        :return: tuple of the transit time of each ideal-mixed cell and of the plug-flow cell, s
+        """
+
+        # Rees Eq. 18
+        # Peclet number
+        peclet = 1 / (2 * inner_radius / length * (3.e7 * re ** -2.1 + 1.35 * re ** -0.125))
+
+        # Rees Eq. 17
+        # transit time for ideal-mixed cells
+        tau_n = tau * np.sqrt(2 / (num_cells * peclet))
+
+        # transit time for plug-flow cell
+        tau_0 = tau - num_cells * tau_n
+
+        return tau_n, tau_0
+
+    @staticmethod
+    def calc_num_sub_steps(time_step, tau):
+        """
+        Number of sub-steps, which limit the maximum step to 10% of the transit time
+
+        :param time_step: time step, s
+        :param tau: total transit time, s
+        :return: number of sub-steps
+        """
+
+        return np.where(time_step / tau > 0.10, np.ceil(time_step / tau), 1).astype(int)
+
+    @staticmethod
+    def solve_mixed_cells(cell_temps: np.ndarray, inlet_temp, v_dot, v_n_dt) -> np.ndarray:
+        """
+        Advance the ideal-mixed cell temperatures one sub-step.
+
+        The first cell takes the inlet temperature, and each other cell is mixed with the cell upstream,
+        so the equations are lower bi-diagonal and are solved by forward elimination. The cells are along the
+        last axis, so several pipes can be solved at once.
+
+        :param cell_temps: cell temperatures, C
+        :param inlet_temp: inlet temperature of the first cell, C
+        :param v_dot: volume flow rate, m3/s
+        :param v_n_dt: volume of each ideal-mixed cell divided by the sub-step, m3/s
+        :return: new cell temperatures, C
+        """
+
+        v_dot = np.asarray(v_dot, dtype=float)
+        v_n_dt = np.asarray(v_n_dt, dtype=float)
+
+        d = v_n_dt[..., np.newaxis] * cell_temps
+        d[..., 0] = inlet_temp
+
+        a = -v_dot
+        b = v_n_dt + v_dot
+        mc = a
+        for i in range(1, d.shape[-1]):
+            d[..., i] -= mc * d[..., i - 1]
+            mc = a / b
+
+        d[..., 1:] /= b[..., np.newaxis]
+        return d
@@ -1,9 +1,10 @@
 import numpy as np
-from math import log, sqrt
+from math import ceil, exp, log, sqrt
 from math import pi
+from scipy.linalg.lapack import dgttrf, dgttrs
+from scipy.optimize import brentq
 
 from glhe.utilities.constants import SEC_IN_DAY
-from glhe.utilities.functions import tdma_2
 
 
 class RadialCellType(object):
@@ -14,18 +15,40 @@ class RadialCellType(object):
     SOIL = 5
 
 
+def _cell_property(array_name: str):
+    """
+    Property which reads and writes one cell's entry in a mesh array
+
+    :param array_name: name of the mesh array
+    """
+
+    def getter(self):
+        return getattr(self.mesh, array_name)[self.idx].item()
+
+    def setter(self, value):
+        getattr(self.mesh, array_name)[self.idx] = value
+
+    return property(getter, setter)
+
+
 class RadialCell(object):
-    def __init__(self, inputs):
-        self.type = inputs['type']
-        self.inner_radius = inputs['inner-radius']
-        self.center_radius = inputs['center-radius']
-        self.outer_radius = inputs['outer-radius']
-        self.thickness = inputs['thickness']
-        self.temperature = inputs['initial-temperature']
-        self.prev_temperature = inputs['initial-temperature']
-        self.conductivity = inputs['conductivity']
-        self.rho_cp = inputs['heat-capacity']
-        self.volume = pi * (self.outer_radius ** 2 - self.inner_radius ** 2)
+    """
+    View of one cell of the radial numerical borehole mesh. The cell data is held in the mesh arrays.
+    """
+
+    def __init__(self, mesh, idx: int):
+        self.mesh = mesh
+        self.idx = idx
+
+    type = _cell_property('cell_types')
+    inner_radius = _cell_property('inner_radius')
+    center_radius = _cell_property('center_radius')
+    outer_radius = _cell_property('outer_radius')
+    thickness = _cell_property('thickness')
+    conductivity = _cell_property('conductivity')
+    rho_cp = _cell_property('rho_cp')
+    volume = _cell_property('volume')
+    temperature = _cell_property('temperature')
 
 
 class RadialNumericalBH(object):
@@ -33,16 +56,35 @@ class RadialNumericalBH(object):
      X. Xu and Jeffrey D. Spitler. 2006. 'Modeling of Vertical Ground Loop Heat Exchangers
      with Variable Convective Resistance and Thermal Mass of the Fluid.' in Proceedings of
      the 10th International Conference on Thermal Energy Storage-EcoStock. Pomona, NJ, May 31-June 2.
+
+    The mesh is stored as contiguous arrays, with one entry per cell, ordered from the fluid outwards.
+
+    By default, the soil cells are uniformly spaced and the model is marched with a fixed time step. Optionally,
+    the soil cells can be geometrically stretched away from the borehole wall, and the time step can grow with the
+    simulation time, so the ln(t/ts) outputs are roughly evenly spaced, under a local error tolerance.
     """
 
     def __init__(self, inputs):
 
+        # set the soil mesh type. apply default if needed.
+        try:
+            self.soil_mesh = inputs['soil-mesh']
+        except KeyError:
+            self.soil_mesh = 'uniform'
+
+        if self.soil_mesh not in ['uniform', 'geometric']:
+            raise ValueError("Soil mesh '{}' is not valid.".format(self.soil_mesh))
+
         # cell numbers
         num_pipe_cells = 4
         num_conv_cells = 1
         num_fluid_cells = 3
         num_grout_cells = 27
-        num_soil_cells = 500
+
+        try:
+            num_soil_cells = inputs['number-soil-cells']
+        except KeyError:
+            num_soil_cells = 500 if self.soil_mesh == 'uniform' else 50
 
         # setup pipe, convection, and fluid geometries
         pipe_outer_dia_act = inputs['pipe-outer-diameter']
@@ -65,131 +107,65 @@ class RadialNumericalBH(object):
 
         # setup soil layer geometry
         soil_radius = 10
-        soil_cell_thickness = (soil_radius - grout_radius) / num_soil_cells
+        if self.soil_mesh == 'uniform':
+            soil_thickness = np.full(num_soil_cells, (soil_radius - grout_radius) / num_soil_cells)
+        else:
+            soil_thickness = self.calc_geometric_thickness(soil_radius - grout_radius, grout_cell_thickness,
+                                                           num_soil_cells)
 
         # other
-        init_temp = 20
+        self.init_temp = 20
+        self.heat_flux = 40
         bh_resist = inputs['borehole-resistance']
         conv_resist = inputs['convection-resistance']
         bh_equiv_tube_grout_resist = bh_resist - conv_resist / 2.0
         bh_equiv_conv_resist = bh_resist - bh_equiv_tube_grout_resist
 
-        self.cells = []
-
-        # initialize fluid cells
-        for idx in range(num_fluid_cells):
-
-            cell_type = RadialCellType.FLUID
-            thickness = pcf_cell_thickness
-            center_radius = fluid_radius + idx * thickness
-
-            if idx == 0:
-                inner_radius = center_radius
+        # fluid cells. the first cell is a half thickness boundary cell.
+        rho_cp_1 = 2.0 * inputs['fluid-specific-heat'] * inputs['fluid-density']
+        rho_cp_2 = (pipe_inner_radius_act ** 2) / ((conv_radius ** 2) - (fluid_radius ** 2))
+        fluid_center = fluid_radius + np.arange(num_fluid_cells) * pcf_cell_thickness
+        fluid_inner = fluid_center - pcf_cell_thickness / 2.0
+        fluid_inner[0] = fluid_center[0]
+        fluid_outer = fluid_center + pcf_cell_thickness / 2.0
+
+        layers = [(RadialCellType.FLUID, fluid_inner, fluid_center, fluid_outer,
+                   np.full(num_fluid_cells, pcf_cell_thickness), 200, rho_cp_1 * rho_cp_2)]
+
+        # convection, pipe, grout, and soil cells
+        tube_grout_conductivity = log(grout_radius / pipe_inner_radius) / (2 * pi * bh_equiv_tube_grout_resist)
+        outer_layers = [(RadialCellType.CONVECTION, conv_radius, np.full(num_conv_cells, pcf_cell_thickness),
+                         log(pipe_inner_radius / conv_radius) / (2 * pi * bh_equiv_conv_resist), 1),
+                        (RadialCellType.PIPE, pipe_inner_radius, np.full(num_pipe_cells, pcf_cell_thickness),
+                         tube_grout_conductivity, inputs['pipe-density'] * inputs['pipe-specific-heat']),
+                        (RadialCellType.GROUT, pipe_outer_radius, np.full(num_grout_cells, grout_cell_thickness),
+                         tube_grout_conductivity, inputs['grout-density'] * inputs['grout-specific-heat']),
+                        (RadialCellType.SOIL, grout_radius, soil_thickness,
+                         inputs['soil-conductivity'], inputs['soil-density'] * inputs['soil-specific-heat'])]
+
+        for cell_type, start_radius, thickness, conductivity, rho_cp in outer_layers:
+            if np.all(thickness == thickness[0]):
+                inner = start_radius + np.arange(thickness.size) * thickness[0]
             else:
-                inner_radius = center_radius - thickness / 2.0
-
-            outer_radius = center_radius + thickness / 2.0
-
-            conductivity = 200
-
-            rho_cp_1 = 2.0 * inputs['fluid-specific-heat'] * inputs['fluid-density']
-            rho_cp_2 = (pipe_inner_radius_act ** 2) / ((conv_radius ** 2) - (fluid_radius ** 2))
-            rho_cp = rho_cp_1 * rho_cp_2
-
-            cell_inputs = {'type': cell_type,
-                           'inner-radius': inner_radius,
-                           'center-radius': center_radius,
-                           'outer-radius': outer_radius,
-                           'thickness': thickness,
-                           'conductivity': conductivity,
-                           'heat-capacity': rho_cp,
-                           'initial-temperature': init_temp}
-
-            self.cells.append(RadialCell(cell_inputs))
-
-        # initialize convection cells
-        for idx in range(num_conv_cells):
-            cell_type = RadialCellType.CONVECTION
-            thickness = pcf_cell_thickness
-            inner_radius = conv_radius + idx * thickness
-            center_radius = inner_radius + thickness / 2.0
-            outer_radius = inner_radius + thickness
-            conductivity = log(pipe_inner_radius / conv_radius) / (2 * pi * bh_equiv_conv_resist)
-            rho_cp = 1
-
-            cell_inputs = {'type': cell_type,
-                           'inner-radius': inner_radius,
-                           'center-radius': center_radius,
-                           'outer-radius': outer_radius,
-                           'thickness': thickness,
-                           'conductivity': conductivity,
-                           'heat-capacity': rho_cp,
-                           'initial-temperature': init_temp}
-
-            self.cells.append(RadialCell(cell_inputs))
-
-        # initialize pipe cells
-        for idx in range(num_pipe_cells):
-            cell_type = RadialCellType.PIPE
-            thickness = pcf_cell_thickness
-            inner_radius = pipe_inner_radius + idx * thickness
-            center_radius = inner_radius + thickness / 2.0
-            outer_radius = inner_radius + thickness
-            conductivity = log(grout_radius / pipe_inner_radius) / (2 * pi * bh_equiv_tube_grout_resist)
-            rho_cp = inputs['pipe-density'] * inputs['pipe-specific-heat']
-
-            cell_inputs = {'type': cell_type,
-                           'inner-radius': inner_radius,
-                           'center-radius': center_radius,
-                           'outer-radius': outer_radius,
-                           'thickness': thickness,
-                           'conductivity': conductivity,
-                           'heat-capacity': rho_cp,
-                           'initial-temperature': init_temp}
-
-            self.cells.append(RadialCell(cell_inputs))
-
-        # initialize grout cells
-        for idx in range(num_grout_cells):
-            cell_type = RadialCellType.GROUT
-            thickness = grout_cell_thickness
-            inner_radius = pipe_outer_radius + idx * thickness
-            center_radius = inner_radius + thickness / 2.0
-            outer_radius = inner_radius + thickness
-            conductivity = log(grout_radius / pipe_inner_radius) / (2 * pi * bh_equiv_tube_grout_resist)
-            rho_cp = inputs['grout-density'] * inputs['grout-specific-heat']
-
-            cell_inputs = {'type': cell_type,
-                           'inner-radius': inner_radius,
-                           'center-radius': center_radius,
-                           'outer-radius': outer_radius,
-                           'thickness': thickness,
-                           'conductivity': conductivity,
-                           'heat-capacity': rho_cp,
-                           'initial-temperature': init_temp}
-
-            self.cells.append(RadialCell(cell_inputs))
-
-        # initialize soil cells
-        for idx in range(num_soil_cells):
-            cell_type = RadialCellType.SOIL
-            thickness = soil_cell_thickness
-            inner_radius = grout_radius + idx * thickness
-            center_radius = inner_radius + thickness / 2.0
-            outer_radius = inner_radius + thickness
-            conductivity = inputs['soil-conductivity']
-            rho_cp = inputs['soil-density'] * inputs['soil-specific-heat']
-
-            cell_inputs = {'type': cell_type,
-                           'inner-radius': inner_radius,
-                           'center-radius': center_radius,
-                           'outer-radius': outer_radius,
-                           'thickness': thickness,
-                           'conductivity': conductivity,
-                           'heat-capacity': rho_cp,
-                           'initial-temperature': init_temp}
-
-            self.cells.append(RadialCell(cell_inputs))
+                inner = start_radius + np.concatenate(([0], np.cumsum(thickness[:-1])))
+            layers.append((cell_type, inner, inner + thickness / 2.0, inner + thickness, thickness,
+                           conductivity, rho_cp))
+
+        # cell data arrays
+        sizes = [layer[1].size for layer in layers]
+        self.num_cells = sum(sizes)
+        self.cell_types = np.repeat([layer[0] for layer in layers], sizes)
+        self.inner_radius = np.concatenate([layer[1] for layer in layers])
+        self.center_radius = np.concatenate([layer[2] for layer in layers])
+        self.outer_radius = np.concatenate([layer[3] for layer in layers])
+        self.thickness = np.concatenate([layer[4] for layer in layers])
+        self.conductivity = np.repeat(np.array([layer[5] for layer in layers], dtype=float), sizes)
+        self.rho_cp = np.repeat(np.array([layer[6] for layer in layers], dtype=float), sizes)
+        self.volume = pi * (self.outer_radius ** 2 - self.inner_radius ** 2)
+        self.temperature = np.full(self.num_cells, self.init_temp, dtype=float)
+
+        # cell views, built on first use
+        self._cells = None
 
         # other
         self.g = np.array([], dtype=float)
@@ -199,112 +175,566 @@ class RadialNumericalBH(object):
         soil_diffusivity = inputs['soil-conductivity'] / (inputs['soil-density'] * inputs['soil-specific-heat'])
         self.t_s = inputs['length'] ** 2 / (9 * soil_diffusivity)
 
-    def calc_sts_g_functions(self, final_time=SEC_IN_DAY, calculate_at_bh_wall=False) -> tuple:
+        # geometric conductances and heat capacities. these don't change with time, so are only computed once.
+        self.conductances = None
+        self.capacitances = None
+        self.assemble()
+
+        # grout/soil interface, and the weights of the cells on each side of it for the borehole wall temperature
+        self.idx_bh_wall, self.w_bh_wall_west, self.w_bh_wall_east = self.calc_bh_wall_weights()
+
+        # factorized system matrix, for the time step it was factorized for
+        self.factorization = None
+        self.factorization_time_step = None
+
+        # set the time stepping method. apply defaults if needed.
+        try:
+            self.time_stepping = inputs['time-stepping']
+        except KeyError:
+            self.time_stepping = 'fixed'
+
+        if self.time_stepping not in ['fixed', 'adaptive']:
+            raise ValueError("Time stepping method '{}' is not valid.".format(self.time_stepping))
+
+        # shortest time step, and the first time step, in seconds
+        try:
+            self.min_time_step = inputs['min-time-step']
+        except KeyError:
+            self.min_time_step = 120
+
+        # largest local error allowed for each adaptive time step, in terms of the g-function
+        try:
+            self.time_step_tolerance = inputs['time-step-tolerance']
+        except KeyError:
+            self.time_step_tolerance = 1e-3
+
+        # largest ln(t/ts) increment for each adaptive time step
+        try:
+            self.max_lntts_step = inputs['max-lntts-step']
+        except KeyError:
+            self.max_lntts_step = 0.1
+
+    @staticmethod
+    def calc_geometric_thickness(length: float, first_thickness: float, num_cells: int) -> np.ndarray:
+        """
+        Compute the thickness of cells which grow by a constant ratio, to fill a layer
+
+        :param length: thickness of the layer
+        :param first_thickness: thickness of the first cell
+        :param num_cells: number of cells
+        :return: array of cell thicknesses
+        """
+
+        # fall back to uniform cells if the layer can't be filled by growing cells
+        if num_cells < 2 or num_cells * first_thickness >= length:
+            return np.full(num_cells, length / num_cells)
+
+        def residual(ratio):
+            return first_thickness * (ratio ** num_cells - 1) / (ratio - 1) - length
+
+        # the last cell alone fills the layer at the upper ratio
+        upper = (length / first_thickness) ** (1 / (num_cells - 1))
+        ratio = brentq(residual, 1 + 1e-12, upper)
+
+        thickness = first_thickness * ratio ** np.arange(num_cells)
+
+        # close the last cell on the layer boundary
+        thickness *= length / np.sum(thickness)
+        return thickness
+
+    @property
+    def cells(self) -> list:
+        """
+        Views of each cell in the mesh
+        """
+
+        if self._cells is None:
+            self._cells = [RadialCell(self, idx) for idx in range(self.num_cells)]
+        return self._cells
+
+    def assemble(self):
+        """
+        Compute the conductance between each pair of adjacent cells, and the heat capacity of each cell
+        """
+
+        # resistance from each cell center to its outer face, and from its inner face to its center
+        resist_outer = np.log(self.outer_radius / self.center_radius) / (2 * pi * self.conductivity)
+        resist_inner = np.log(self.center_radius / self.inner_radius) / (2 * pi * self.conductivity)
+
+        # conductance between cell 'i' and cell 'i + 1'
+        self.conductances = 1 / (resist_outer[:-1] + resist_inner[1:])
+        self.capacitances = self.rho_cp * self.volume
+
+    @staticmethod
+    def calc_system_coefficients(capacitances: np.ndarray, conductances: np.ndarray, time_step) -> tuple:
+        """
+        Compute the diagonals of the tri-diagonal system matrix for the time step.
+
+        The first cell receives the heat flux, and the last cell is held at its previous temperature.
+        The arrays can also hold a batch of meshes, with one mesh in each row.
+
+        :param capacitances: heat capacity of each cell
+        :param conductances: conductance between each pair of adjacent cells
+        :param time_step: time step, in seconds. for a batch, a column of time steps with one for each mesh.
+        :return: tuple of the lower, main, and upper diagonals, each with the same shape as the capacitances
+        """
+
+        ad = capacitances / time_step
+        ae = conductances / ad[..., :-1]
+        aw = conductances / ad[..., 1:]
+
+        a = np.zeros(ad.shape)
+        b = np.zeros(ad.shape)
+        c = np.zeros(ad.shape)
+
+        a[..., 1:-1] = aw[..., :-1]
+        b[..., :-1] = -ae - 1
+        b[..., 1:-1] -= aw[..., :-1]
+        b[..., -1] = 1
+        c[..., :-1] = ae
+        c[..., -1] = 0
+
+        return a, b, c
+
+    def factorize(self, time_step: float):
+        """
+        Assemble and factorize the tri-diagonal system matrix for the time step.
+
+        :param time_step: time step, in seconds
+        """
+
+        if self.factorization_time_step == time_step:
+            return
+
+        a, b, c = self.calc_system_coefficients(self.capacitances, self.conductances, time_step)
+
+        dl, d, du, du2, ipiv, info = dgttrf(a[1:], b, c[:-1])
+        if info != 0:
+            raise ValueError('Radial numerical borehole system matrix is singular.')  # pragma: no cover
+
+        self.factorization = (dl, d, du, du2, ipiv)
+        self.factorization_time_step = time_step
+
+    def calc_bh_wall_weights(self) -> tuple:
+        """
+        Find the grout/soil interface, and the weights of the cells on each side of it for the borehole wall
+        temperature
+
+        :return: tuple of the west cell index, west weight, and east weight
+        """
+
+        is_interface = (self.cell_types[:-1] == RadialCellType.GROUT) & (self.cell_types[1:] == RadialCellType.SOIL)
+        interface = np.flatnonzero(is_interface)
+
+        if interface.size == 0:
+            return None, 0, 0
+
+        west = int(interface[0])
+        east = west + 1
+
+        west_conductance_num = 2 * pi * self.conductivity[west]
+        west_conductance_den = log(self.outer_radius[west] / self.inner_radius[west])
+        west_conductance = west_conductance_num / west_conductance_den
+
+        east_conductance_num = 2 * pi * self.conductivity[east]
+        east_conductance_den = log(self.center_radius[east] / self.inner_radius[west])
+        east_conductance = east_conductance_num / east_conductance_den
+
+        total_conductance = west_conductance + east_conductance
+        return west, west_conductance / total_conductance, east_conductance / total_conductance
+
+    def calc_g_temperature(self, temps: np.ndarray, calculate_at_bh_wall: bool) -> float:
+        """
+        Temperature used for the g-function
+
+        :param temps: cell temperatures
+        :param calculate_at_bh_wall: if true, the borehole wall temperature is used, otherwise the fluid temperature
+        :return: temperature
+        """
+
+        if not calculate_at_bh_wall:
+            return temps[0]
+        elif self.idx_bh_wall is not None:
+            return self.w_bh_wall_west * temps[self.idx_bh_wall] + self.w_bh_wall_east * temps[self.idx_bh_wall + 1]
+        else:
+            return self.init_temp
+
+    def step(self, temps: np.ndarray, time_step: float) -> np.ndarray:
+        """
+        March the cell temperatures forward by one time step
+
+        :param temps: cell temperatures at the start of the time step
+        :param time_step: time step, in seconds
+        :return: cell temperatures at the end of the time step
+        """
+
+        self.factorize(time_step)
+        dl, d, du, du2, ipiv = self.factorization
+
+        rhs = -temps
+        rhs[0] -= self.heat_flux * time_step / self.capacitances[0]
+        rhs[-1] = temps[-1]
+
+        temps, _ = dgttrs(dl, d, du, du2, ipiv, rhs)
+        return temps
+
+    def march_fixed(self, final_time: float, calculate_at_bh_wall: bool) -> tuple:
+        """
+        March the model with a fixed time step
+
+        :param final_time: final simulation time, in seconds
+        :param calculate_at_bh_wall: if true, the borehole wall temperature is used, otherwise the fluid temperature
+        :return: tuple of the simulation time and g-function temperature at the end of each time step
+        """
+
+        time_step = self.min_time_step
+
+        # number of time steps. stops once the time is within one time step of the final time.
+        num_steps = max(int(ceil((final_time - time_step) / time_step)), 1)
+
+        self.factorize(time_step)
+        dl, d, du, du2, ipiv = self.factorization
+
+        # heat flux applied to the first cell
+        flux_term = self.heat_flux * time_step / self.capacitances[0]
+
+        temps = self.temperature
+        rhs = np.empty_like(temps)
+
+        # temperature used for the g-function at each time step
+        temps_g = np.empty(num_steps)
+
+        for step in range(num_steps):
+            rhs[:-1] = -temps[:-1]
+            rhs[0] -= flux_term
+            rhs[-1] = temps[-1]
+
+            temps, _ = dgttrs(dl, d, du, du2, ipiv, rhs)
+            temps_g[step] = self.calc_g_temperature(temps, calculate_at_bh_wall)
 
-        g = []
-        lntts = []
+        self.temperature[:] = temps
 
-        a = np.zeros(len(self.cells))
-        b = np.zeros(len(self.cells))
-        c = np.zeros(len(self.cells))
-        d = np.zeros(len(self.cells))
+        times = np.arange(1, num_steps + 1) * time_step
+        return times, temps_g
 
-        heat_flux = 40
-        init_temp = 20
+    def march_adaptive(self, final_time: float, calculate_at_bh_wall: bool) -> tuple:
+        """
+        March the model with a time step which grows with the simulation time.
+
+        Each time step is taken once as a full step, and once as two half steps. The difference between the two
+        g-function values estimates the local error, which is held under the tolerance. The two half step solution is
+        kept. The time step is also limited so the ln(t/ts) increment of each step is no larger than the maximum,
+        so the outputs are roughly evenly spaced in ln(t/ts).
+
+        :param final_time: final simulation time, in seconds
+        :param calculate_at_bh_wall: if true, the borehole wall temperature is used, otherwise the fluid temperature
+        :return: tuple of the simulation time and g-function temperature at the end of each time step
+        """
+
+        min_time_step = self.min_time_step
+        tol = self.time_step_tolerance * self.heat_flux / self.c_0
+        max_growth = exp(self.max_lntts_step) - 1
+
+        # stops once the time is within one minimum time step of the final time
+        end_time = max(final_time - min_time_step, min_time_step)
 
         time = 0
-        time_step = 120
-        num_cells = len(self.cells)
+        time_step = min_time_step
+        temps = self.temperature.copy()
+
+        times = []
+        temps_g = []
 
         while True:
+            temps_full = self.step(temps, time_step)
+            temps_half = self.step(self.step(temps, time_step / 2), time_step / 2)
+
+            t_g = self.calc_g_temperature(temps_half, calculate_at_bh_wall)
+            err = abs(t_g - self.calc_g_temperature(temps_full, calculate_at_bh_wall))
+
+            if err > tol and time_step > min_time_step:
+                # reject, and retry with a shorter time step
+                time_step = max(time_step * max(0.9 * sqrt(tol / err), 0.2), min_time_step)
+                continue
 
             time += time_step
+            temps = temps_half
+            times.append(time)
+            temps_g.append(t_g)
+
+            if time >= end_time:
+                break
+
+            # grow the time step, limited by the error estimate and the ln(t/ts) increment
+            factor = 0.9 * sqrt(tol / err) if err > 0 else 2
+            time_step = min(time_step * min(max(factor, 0.2), 2), time * max_growth)
+            time_step = max(time_step, min_time_step)
 
-            # TDMA setup
-            for idx, this_cell in enumerate(self.cells):
+            # don't step past the end, or leave a sliver of a step before it
+            if time + time_step > end_time - min_time_step:
+                time_step = end_time - time
 
-                if idx == 0:
+        self.temperature[:] = temps
 
-                    east_cell = self.cells[idx + 1]
+        return np.array(times), np.array(temps_g)
+
+    def calc_sts_g_functions(self, final_time=SEC_IN_DAY, calculate_at_bh_wall=False) -> tuple:
 
-                    fe_1 = log(this_cell.outer_radius / this_cell.center_radius) / (2 * pi * this_cell.conductivity)
-                    fe_2 = log(east_cell.center_radius / east_cell.inner_radius) / (2 * pi * east_cell.conductivity)
-                    ae = 1 / (fe_1 + fe_2)
+        if self.time_stepping == 'fixed':
+            times, temps_g = self.march_fixed(final_time, calculate_at_bh_wall)
+        else:
+            times, temps_g = self.march_adaptive(final_time, calculate_at_bh_wall)
 
-                    ad = this_cell.rho_cp * this_cell.volume / time_step
+        if calculate_at_bh_wall:
+            g = self.c_0 * ((temps_g - self.init_temp) / self.heat_flux)
+        else:
+            g = self.c_0 * ((temps_g - self.init_temp) / self.heat_flux - self.bh_resist)
 
-                    a[idx] = 0
-                    b[idx] = -ae / ad - 1
-                    c[idx] = ae / ad
-                    d[idx] = -this_cell.prev_temperature - heat_flux / ad
+        lntts = np.log(times / self.t_s)
 
-                elif idx == num_cells - 1:
+        self.g = np.insert(self.g, 0, g, axis=0)
+        self.lntts = np.insert(self.lntts, 0, lntts, axis=0)
 
-                    a[idx] = 0
-                    b[idx] = 1
-                    c[idx] = 0
-                    d[idx] = this_cell.prev_temperature
+        return self.lntts, self.g
 
-                else:
 
-                    west_cell = self.cells[idx - 1]
-                    east_cell = self.cells[idx + 1]
+class RadialNumericalBHBatch(object):
+    """
+    Batch of radial numerical borehole models, e.g. for parameter studies, which are all advanced together.
 
-                    fe_1 = log(this_cell.outer_radius / this_cell.center_radius) / (2 * pi * this_cell.conductivity)
-                    fe_2 = log(east_cell.center_radius / east_cell.inner_radius) / (2 * pi * east_cell.conductivity)
-                    ae = 1 / (fe_1 + fe_2)
+    The mesh data of each model is held in one row of 2-D arrays. Each model takes the same time step in terms of
+    t/ts, so all models share the same ln(t/ts) outputs. The system matrix of each model has no coupling to the
+    cells outside of it, so the system matrices are stacked into one block tri-diagonal system, which is factorized
+    and solved with a single call for all models.
 
-                    fw_1 = log(west_cell.outer_radius / west_cell.center_radius) / (2 * pi * west_cell.conductivity)
-                    fw_2 = log(this_cell.center_radius / this_cell.inner_radius) / (2 * pi * this_cell.conductivity)
-                    aw = -1 / (fw_1 + fw_2)
+    All models must have the same number of cells. The time stepping method is set by the first model. With fixed
+    time steps, the step is set so no model exceeds its minimum time step. With adaptive time steps, the local error
+    of every model is held under its tolerance.
+    """
 
-                    ad = this_cell.rho_cp * this_cell.volume / time_step
+    def __init__(self, inputs: list):
+        """
+        :param inputs: list of input dicts, one for each model, as used by RadialNumericalBH
+        """
 
-                    a[idx] = -aw / ad
-                    b[idx] = aw / ad - ae / ad - 1
-                    c[idx] = ae / ad
-                    d[idx] = -this_cell.prev_temperature
+        if len(inputs) == 0:
+            raise ValueError('At least one set of radial numerical borehole inputs is required.')
 
-            temps = tdma_2(a, b, c, d)
+        models = [RadialNumericalBH(d) for d in inputs]
 
-            for idx, this_cell in enumerate(self.cells):
-                this_cell.prev_temperature = temps[idx]
-                this_cell.temperature = temps[idx]
+        if len({m.num_cells for m in models}) != 1:
+            raise ValueError('All radial numerical borehole models in a batch must have the same number of cells.')
 
-            if calculate_at_bh_wall:
-                bh_wall_temp = 0
+        self.num_models = len(models)
+        self.num_cells = models[0].num_cells
+        self.init_temp = models[0].init_temp
+        self.heat_flux = models[0].heat_flux
+        self.time_stepping = models[0].time_stepping
 
-                # calculate bh wall temp
-                for idx, this_cell in enumerate(self.cells):
-                    west_cell = self.cells[idx]
-                    east_cell = self.cells[idx + 1]
+        # mesh data, with one row for each model
+        self.capacitances = np.stack([m.capacitances for m in models])
+        self.conductances = np.stack([m.conductances for m in models])
+        self.temperature = np.stack([m.temperature for m in models])
 
-                    if west_cell.type == RadialCellType.GROUT and east_cell.type == RadialCellType.SOIL:
-                        west_conductance_num = 2 * pi * west_cell.conductivity
-                        west_conductance_den = log(west_cell.outer_radius / west_cell.inner_radius)
-                        west_conductance = west_conductance_num / west_conductance_den
+        self.t_s = np.array([m.t_s for m in models])
+        self.c_0 = np.array([m.c_0 for m in models])
+        self.bh_resist = np.array([m.bh_resist for m in models])
 
-                        east_conductance_num = 2 * pi * east_cell.conductivity
-                        east_conductance_den = log(east_cell.center_radius / west_cell.inner_radius)
-                        east_conductance = east_conductance_num / east_conductance_den
+        # borehole wall weights. models without a grout/soil interface use the initial temperature.
+        has_wall = np.array([m.idx_bh_wall is not None for m in models])
+        self.idx_bh_wall = np.array([m.idx_bh_wall if m.idx_bh_wall is not None else 0 for m in models])
+        self.w_bh_wall_west = np.array([m.w_bh_wall_west for m in models], dtype=float)
+        self.w_bh_wall_east = np.array([m.w_bh_wall_east for m in models], dtype=float)
+        self.w_bh_wall_init = np.where(has_wall, 0.0, 1.0) * self.init_temp
 
-                        bh_wall_temp_num_1 = west_conductance * west_cell.temperature
-                        bh_wall_temp_num_2 = east_conductance * east_cell.temperature
-                        bh_wall_temp_num = bh_wall_temp_num_1 + bh_wall_temp_num_2
-                        bh_wall_temp_den = west_conductance + east_conductance
-                        bh_wall_temp = bh_wall_temp_num / bh_wall_temp_den
+        # time stepping, in terms of t/ts
+        self.min_time_step = np.array([m.min_time_step for m in models], dtype=float)
+        self.min_time_step_ts = np.min(self.min_time_step / self.t_s)
+        self.time_step_tolerance = np.array([m.time_step_tolerance for m in models])
+        self.max_lntts_step = min(m.max_lntts_step for m in models)
 
-                        break
+        # factorized system matrix, for the time step it was factorized for
+        self.factorization = None
+        self.factorization_time_step_ts = None
 
-                g.append(self.c_0 * ((bh_wall_temp - init_temp) / heat_flux))
-            else:
-                g.append(self.c_0 * ((self.cells[0].temperature - init_temp) / heat_flux - self.bh_resist))
+        self.lntts = np.array([], dtype=float)
+        self.g = np.empty((self.num_models, 0), dtype=float)
+
+    def factorize(self, time_step_ts: float):
+        """
+        Assemble and factorize the block tri-diagonal system matrix for all models
+
+        :param time_step_ts: time step, in terms of t/ts
+        """
+
+        if self.factorization_time_step_ts == time_step_ts:
+            return
+
+        time_steps = time_step_ts * self.t_s[:, np.newaxis]
+        a, b, c = RadialNumericalBH.calc_system_coefficients(self.capacitances, self.conductances, time_steps)
+
+        # the first lower and last upper diagonal entries of each model are zero, so the models stay uncoupled
+        dl, d, du, du2, ipiv, info = dgttrf(a.ravel()[1:], b.ravel(), c.ravel()[:-1])
+        if info != 0:
+            raise ValueError('Radial numerical borehole system matrix is singular.')  # pragma: no cover
+
+        self.factorization = (dl, d, du, du2, ipiv)
+        self.factorization_time_step_ts = time_step_ts
+
+    def calc_g_temperature(self, temps: np.ndarray, calculate_at_bh_wall: bool) -> np.ndarray:
+        """
+        Temperature used for the g-function, for each model
+
+        :param temps: cell temperatures, with one row for each model
+        :param calculate_at_bh_wall: if true, the borehole wall temperature is used, otherwise the fluid temperature
+        :return: array of temperatures
+        """
+
+        if not calculate_at_bh_wall:
+            return temps[:, 0]
+
+        rows = np.arange(self.num_models)
+        temps_west = self.w_bh_wall_west * temps[rows, self.idx_bh_wall]
+        temps_east = self.w_bh_wall_east * temps[rows, self.idx_bh_wall + 1]
+        return temps_west + temps_east + self.w_bh_wall_init
+
+    def step(self, temps: np.ndarray, time_step_ts: float) -> np.ndarray:
+        """
+        March the cell temperatures of all models forward by one time step
+
+        :param temps: cell temperatures at the start of the time step, with one row for each model
+        :param time_step_ts: time step, in terms of t/ts
+        :return: cell temperatures at the end of the time step
+        """
+
+        self.factorize(time_step_ts)
+        dl, d, du, du2, ipiv = self.factorization
+
+        rhs = -temps
+        rhs[:, 0] -= self.heat_flux * time_step_ts * self.t_s / self.capacitances[:, 0]
+        rhs[:, -1] = temps[:, -1]
 
-            lntts.append(log(time / self.t_s))
+        temps, _ = dgttrs(dl, d, du, du2, ipiv, rhs.ravel())
+        return temps.reshape(rhs.shape)
 
-            if time >= final_time - time_step:
-                self.g = np.insert(self.g, 0, g, axis=0)
-                self.lntts = np.insert(self.lntts, 0, lntts, axis=0)
+    def march_fixed(self, final_time: float, calculate_at_bh_wall: bool) -> tuple:
+        """
+        March all models with a fixed time step
+
+        :param final_time: final simulation time, in seconds. all models are run at least this long.
+        :param calculate_at_bh_wall: if true, the borehole wall temperature is used, otherwise the fluid temperature
+        :return: tuple of the time, in terms of t/ts, and the g-function temperatures at the end of each time step
+        """
+
+        time_step_ts = self.min_time_step_ts
+        time_steps = time_step_ts * self.t_s
+
+        # number of time steps. stops once the time of every model is within one time step of the final time.
+        num_steps = max(int(np.max(np.ceil((final_time - time_steps) / time_steps))), 1)
+
+        self.factorize(time_step_ts)
+        dl, d, du, du2, ipiv = self.factorization
+
+        # heat flux applied to the first cell
+        flux_term = self.heat_flux * time_steps / self.capacitances[:, 0]
+
+        temps = self.temperature
+        rhs = np.empty_like(temps)
+
+        # temperature used for the g-function at each time step
+        temps_g = np.empty((self.num_models, num_steps))
+
+        for step in range(num_steps):
+            rhs[:, :-1] = -temps[:, :-1]
+            rhs[:, 0] -= flux_term
+            rhs[:, -1] = temps[:, -1]
+
+            temps, _ = dgttrs(dl, d, du, du2, ipiv, rhs.ravel())
+            temps = temps.reshape(rhs.shape)
+            temps_g[:, step] = self.calc_g_temperature(temps, calculate_at_bh_wall)
+
+        self.temperature[:] = temps
+
+        times_ts = np.arange(1, num_steps + 1) * time_step_ts
+        return times_ts, temps_g
+
+    def march_adaptive(self, final_time: float, calculate_at_bh_wall: bool) -> tuple:
+        """
+        March all models with a time step which grows with the simulation time, as in RadialNumericalBH.
+        The time step is limited by the model with the largest local error, relative to its tolerance.
+
+        :param final_time: final simulation time, in seconds. all models are run at least this long.
+        :param calculate_at_bh_wall: if true, the borehole wall temperature is used, otherwise the fluid temperature
+        :return: tuple of the time, in terms of t/ts, and the g-function temperatures at the end of each time step
+        """
+
+        min_time_step = self.min_time_step_ts
+        tol = self.time_step_tolerance * self.heat_flux / self.c_0
+        max_growth = exp(self.max_lntts_step) - 1
+
+        # stops once the time of every model is within one minimum time step of the final time
+        end_time = np.max(np.maximum((final_time - self.min_time_step) / self.t_s, self.min_time_step / self.t_s))
+
+        time = 0
+        time_step = min_time_step
+        temps = self.temperature.copy()
+
+        times = []
+        temps_g = []
+
+        while True:
+            temps_full = self.step(temps, time_step)
+            temps_half = self.step(self.step(temps, time_step / 2), time_step / 2)
+
+            t_g = self.calc_g_temperature(temps_half, calculate_at_bh_wall)
+            err = np.max(np.abs(t_g - self.calc_g_temperature(temps_full, calculate_at_bh_wall)) / tol)
+
+            if err > 1 and time_step > min_time_step:
+                # reject, and retry with a shorter time step
+                time_step = max(time_step * max(0.9 * sqrt(1 / err), 0.2), min_time_step)
+                continue
+
+            time += time_step
+            temps = temps_half
+            times.append(time)
+            temps_g.append(t_g)
+
+            if time >= end_time:
                 break
 
+            # grow the time step, limited by the error estimate and the ln(t/ts) increment
+            factor = 0.9 * sqrt(1 / err) if err > 0 else 2
+            time_step = min(time_step * min(max(factor, 0.2), 2), time * max_growth)
+            time_step = max(time_step, min_time_step)
+
+            # don't step past the end, or leave a sliver of a step before it
+            if time + time_step > end_time - min_time_step:
+                time_step = end_time - time
+
+        self.temperature[:] = temps
+
+        return np.array(times), np.transpose(temps_g)
+
+    def calc_sts_g_functions(self, final_time=SEC_IN_DAY, calculate_at_bh_wall=False) -> tuple:
+        """
+        Compute the short time step g-functions of all models
+
+        :param final_time: final simulation time, in seconds. all models are run at least this long.
+        :param calculate_at_bh_wall: if true, the borehole wall temperature is used, otherwise the fluid temperature
+        :return: tuple of the ln(t/ts) values, and the g-function values with one row for each model
+        """
+
+        if self.time_stepping == 'fixed':
+            times_ts, temps_g = self.march_fixed(final_time, calculate_at_bh_wall)
+        else:
+            times_ts, temps_g = self.march_adaptive(final_time, calculate_at_bh_wall)
+
+        c_0 = self.c_0[:, np.newaxis]
+        if calculate_at_bh_wall:
+            self.g = c_0 * ((temps_g - self.init_temp) / self.heat_flux)
+        else:
+            self.g = c_0 * ((temps_g - self.init_temp) / self.heat_flux - self.bh_resist[:, np.newaxis])
+
+        self.lntts = np.log(times_ts)
+
         return self.lntts, self.g
@@ -1,14 +1,17 @@
-from math import log, pi
+from math import pi
+
+import numpy as np
+from scipy.linalg import solve_banded
 
 from glhe.input_processor.component_types import ComponentTypes
 from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 from glhe.properties.base_properties import PropertiesBase
 from glhe.topology.pipe import Pipe
 from glhe.topology.single_u_tube_grouted_segment import SingleUTubeGroutedSegment
 from glhe.topology.single_u_tube_pass_through_segment import SingleUTubePassThroughSegment
-from glhe.utilities.functions import merge_dicts
 
 
 class Location(object):
@@ -84,6 +87,17 @@ class SingleUTubeGroutedBorehole(SimulationEntryPoint):
         else:
             self.num_iterations = 2
 
+        # set the segment solution method. apply default if needed.
+        # 'iterative' sweeps over the segments, using the neighboring segment outlet temperatures from the previous
+        # sweep. 'coupled' solves all segments together, implicitly.
+        if 'solution-method' in bh_def_inputs:
+            self.solution_method = bh_def_inputs['solution-method']
+        else:
+            self.solution_method = 'iterative'
+
+        if self.solution_method not in ['iterative', 'coupled']:
+            raise ValueError("Solution method '{}' is not valid.".format(self.solution_method))
+
         # init segments
         self.segments = []
 
@@ -110,6 +124,9 @@ class SingleUTubeGroutedBorehole(SimulationEntryPoint):
         else:
             seg_inputs['grout-fraction'] = 0.5
 
+        if 'integration-method' in bh_def_inputs:
+            seg_inputs['integration-method'] = bh_def_inputs['integration-method']
+
         for idx in range(self.num_segments):
             seg_inputs['segment-name'] = 'BH:{}:Seg:{}'.format(inputs['name'], idx + 1)
             self.segments.append(SingleUTubeGroutedSegment(seg_inputs, ip, op))
@@ -118,6 +135,12 @@ class SingleUTubeGroutedBorehole(SimulationEntryPoint):
         seg_inputs['segment-name'] = 'BH:{}:Seg:{}'.format(inputs['name'], self.num_segments + 1)
         self.segments.append(SingleUTubePassThroughSegment(seg_inputs, ip, op))
 
+        # band storage locations of the node equation blocks of the coupled system
+        num_eq = self.segments[0].num_equations
+        rows, cols = np.divmod(np.arange(num_eq ** 2), num_eq)
+        self.band_rows = np.tile(num_eq + rows - cols, self.num_segments)
+        self.band_cols = (num_eq * np.arange(self.num_segments)[:, np.newaxis] + cols).ravel()
+
         # multipole method parameters
         self.resist_bh_ave = None
         self.resist_bh_total_internal = None
@@ -138,6 +161,16 @@ class SingleUTubeGroutedBorehole(SimulationEntryPoint):
         self.inlet_temperature = ip.init_temp()
         self.outlet_temperature = ip.init_temp()
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.HeatRate, 'heat_rate'),
+                                            (ReportTypes.HeatRateBH, 'heat_rate_bh'),
+                                            (ReportTypes.InletTemp, 'inlet_temperature'),
+                                            (ReportTypes.OutletTemp, 'outlet_temperature'),
+                                            (ReportTypes.BHResist, 'resist_bh_ave'),
+                                            (ReportTypes.BHIntResist, 'resist_bh_total_internal'),
+                                            (ReportTypes.BHDCResist, 'resist_bh_direct_coupling')],
+                                           children=[seg.report_vars for seg in self.segments] + [self.pipe_1.report_vars])
+
     def calc_bh_average_resistance(self, temperature: float,
                                    flow_rate: float = None,
                                    pipe_resist: float = None) -> float:
@@ -158,16 +191,9 @@ class SingleUTubeGroutedBorehole(SimulationEntryPoint):
 
         self.update_beta(temperature, flow_rate, pipe_resist)
 
-        final_term_1 = log(self.theta_2 / (2 * self.theta_1 * (1 - self.theta_1 ** 4) ** self.sigma))
-
-        term_2_num = self.theta_3 ** 2 * (1 - (4 * self.sigma * self.theta_1 ** 4) / (1 - self.theta_1 ** 4)) ** 2
-        term_2_den_pt_1 = (1 + self.beta) / (1 - self.beta)
-        term_2_den_pt_2 = self.theta_3 ** 2 * (1 + (16 * self.sigma * self.theta_1 ** 4) / (1 - self.theta_1 ** 4) ** 2)
-        term_2_den = term_2_den_pt_1 + term_2_den_pt_2
-        final_term_2 = term_2_num / term_2_den
-
-        self.resist_bh_ave = (1 / (4 * pi * self.grout.conductivity)) * (self.beta + final_term_1 - final_term_2)
-
+        self.resist_bh_ave = float(self.multipole_average_resistance(self.beta, self.theta_1, self.theta_2,
+                                                                     self.theta_3, self.sigma,
+                                                                     self.grout.conductivity))
         return self.resist_bh_ave
 
     def calc_bh_total_internal_resistance(self, temperature: float,
@@ -188,19 +214,9 @@ class SingleUTubeGroutedBorehole(SimulationEntryPoint):
 
         self.update_beta(temperature, flow_rate, pipe_resist)
 
-        term_1_num = (1 + self.theta_1 ** 2) ** self.sigma
-        term_1_den = self.theta_3 * (1 - self.theta_1 ** 2) ** self.sigma
-        final_term_1 = log(term_1_num / term_1_den)
-
-        term_2_num = self.theta_3 ** 2 * (1 - self.theta_1 ** 4 + 4 * self.sigma * self.theta_1 ** 2) ** 2
-        term_2_den_pt_1 = (1 + self.beta) / (1 - self.beta) * (1 - self.theta_1 ** 4) ** 2
-        term_2_den_pt_2 = self.theta_3 ** 2 * (1 - self.theta_1 ** 4) ** 2
-        term_2_den_pt_3 = 8 * self.sigma * self.theta_1 ** 2 * self.theta_3 ** 2 * (1 + self.theta_1 ** 4)
-        term_2_den = term_2_den_pt_1 - term_2_den_pt_2 + term_2_den_pt_3
-        final_term_2 = term_2_num / term_2_den
-
-        self.resist_bh_total_internal = 1 / (pi * self.grout.conductivity) * (self.beta + final_term_1 - final_term_2)
-
+        self.resist_bh_total_internal = float(self.multipole_total_internal_resistance(self.beta, self.theta_1,
+                                                                                       self.theta_3, self.sigma,
+                                                                                       self.grout.conductivity))
         return self.resist_bh_total_internal
 
     def calc_bh_grout_resistance(self, temperature: float,
@@ -260,14 +276,87 @@ class SingleUTubeGroutedBorehole(SimulationEntryPoint):
         r_a = self.calc_bh_total_internal_resistance(temperature, flow_rate, pipe_resist)
         r_b = self.calc_bh_average_resistance(temperature, flow_rate, pipe_resist)
 
+        self.resist_bh_direct_coupling = float(self.direct_coupling_resistance(r_a, r_b))
+        return self.resist_bh_direct_coupling, r_b
+
+    # the static methods below also take arrays, and are shared with the vectorized field engine
+
+    @staticmethod
+    def multipole_average_resistance(beta, theta_1, theta_2, theta_3, sigma, grout_k):
+        """
+        Average thermal resistance of the borehole with the first-order multipole method
+
+        Javed, S. & Spitler, J.D. 2017. 'Accuracy of Borehole Thermal Resistance Calculation Methods
+        for Grouted Single U-tube Ground Heat Exchangers.' Applied Energy.187:790-806.
+
+        Equation 13
+
+        :param beta: dimensionless pipe resistance
+        :param theta_1: dimensionless shank spacing
+        :param theta_2: dimensionless borehole radius
+        :param theta_3: dimensionless pipe radius
+        :param sigma: dimensionless conductivity ratio
+        :param grout_k: grout conductivity, W/m-K
+        :return: average borehole resistance, m-K/W
+        """
+
+        final_term_1 = np.log(theta_2 / (2 * theta_1 * (1 - theta_1 ** 4) ** sigma))
+
+        term_2_num = theta_3 ** 2 * (1 - (4 * sigma * theta_1 ** 4) / (1 - theta_1 ** 4)) ** 2
+        term_2_den_pt_1 = (1 + beta) / (1 - beta)
+        term_2_den_pt_2 = theta_3 ** 2 * (1 + (16 * sigma * theta_1 ** 4) / (1 - theta_1 ** 4) ** 2)
+        term_2_den = term_2_den_pt_1 + term_2_den_pt_2
+        final_term_2 = term_2_num / term_2_den
+
+        return (1 / (4 * pi * grout_k)) * (beta + final_term_1 - final_term_2)
+
+    @staticmethod
+    def multipole_total_internal_resistance(beta, theta_1, theta_3, sigma, grout_k):
+        """
+        Total internal thermal resistance of the borehole with the first-order multipole method
+
+        Javed, S. & Spitler, J.D. 2017. 'Accuracy of Borehole Thermal Resistance Calculation Methods
+        for Grouted Single U-tube Ground Heat Exchangers.' Applied Energy.187:790-806.
+
+        Equation 26
+
+        :param beta: dimensionless pipe resistance
+        :param theta_1: dimensionless shank spacing
+        :param theta_3: dimensionless pipe radius
+        :param sigma: dimensionless conductivity ratio
+        :param grout_k: grout conductivity, W/m-K
+        :return: total internal borehole resistance, m-K/W
+        """
+
+        term_1_num = (1 + theta_1 ** 2) ** sigma
+        term_1_den = theta_3 * (1 - theta_1 ** 2) ** sigma
+        final_term_1 = np.log(term_1_num / term_1_den)
+
+        term_2_num = theta_3 ** 2 * (1 - theta_1 ** 4 + 4 * sigma * theta_1 ** 2) ** 2
+        term_2_den_pt_1 = (1 + beta) / (1 - beta) * (1 - theta_1 ** 4) ** 2
+        term_2_den_pt_2 = theta_3 ** 2 * (1 - theta_1 ** 4) ** 2
+        term_2_den_pt_3 = 8 * sigma * theta_1 ** 2 * theta_3 ** 2 * (1 + theta_1 ** 4)
+        term_2_den = term_2_den_pt_1 - term_2_den_pt_2 + term_2_den_pt_3
+        final_term_2 = term_2_num / term_2_den
+
+        return 1 / (pi * grout_k) * (beta + final_term_1 - final_term_2)
+
+    @staticmethod
+    def direct_coupling_resistance(resist_total_internal, resist_ave):
+        """
+        Direct-coupling resistance between the two legs
+
+        :param resist_total_internal: total internal borehole resistance, m-K/W
+        :param resist_ave: average borehole resistance, m-K/W
+        :return: direct-coupling resistance, m-K/W
+        """
+
+        r_a = resist_total_internal
+        r_b = resist_ave
         r_12 = (4 * r_a * r_b) / (4 * r_b - r_a)
 
         # reset if negative
-        if r_12 < 0:
-            r_12 = 70
-
-        self.resist_bh_direct_coupling = r_12
-        return self.resist_bh_direct_coupling, r_b
+        return np.where(r_12 < 0, 70, r_12)
 
     def update_beta(self, temperature: float, flow_rate: float = None, pipe_resist: float = None) -> float:
         """
@@ -320,7 +409,13 @@ class SingleUTubeGroutedBorehole(SimulationEntryPoint):
 
         self.pipe_1.simulate_time_step(SimulationResponse(time, time_step, flow_rate, inlet_temp))
 
-        for _ in range(self.num_iterations):
+        if self.solution_method == 'coupled':
+            self.simulate_segments_coupled(time_step, seg_inputs)
+            num_iterations = 0
+        else:
+            num_iterations = self.num_iterations
+
+        for _ in range(num_iterations):
 
             for idx, seg in enumerate(self.segments):
 
@@ -346,6 +441,66 @@ class SingleUTubeGroutedBorehole(SimulationEntryPoint):
 
         return SimulationResponse(time, time_step, flow_rate, self.get_outlet_temp())
 
+    def simulate_segments_coupled(self, time_step: int, seg_inputs: dict):
+        """
+        Solve the node equations of all segments together, with an implicit time step.
+
+        The leg 1 fluid of each segment flows into the next segment down, the leg 2 fluid flows into the next segment
+        up, and the leg 1 fluid of the last segment turns into its leg 2 inlet. The node temperatures are ordered by
+        segment, so the flow between segments only couples nodes 5 rows apart, and the whole borehole is one banded
+        system with 5 sub- and super-diagonals, which is solved directly once per time step.
+
+        :param time_step: time step, in seconds
+        :param seg_inputs: segment inputs, without the inlet temperatures
+        """
+
+        num_segs = self.num_segments
+        segments = self.segments[:num_segs]
+        num_eq = segments[0].num_equations
+        inlet_temp = self.pipe_1.outlet_temperature
+
+        # fluid properties are evaluated once, at the borehole inlet
+        cp = self.fluid.get_cp(inlet_temp)
+        seg_inputs = dict(seg_inputs, **{'inlet-1-temp': inlet_temp,
+                                         'inlet-2-temp': inlet_temp,
+                                         'fluid-cp': cp,
+                                         'fluid-heat-capacity': self.fluid.get_rho(inlet_temp) * cp})
+
+        for seg in segments:
+            seg.set_inputs(seg_inputs)
+
+        # all segments are the same, so they share the same node equations
+        k, g, c = segments[0].calc_conductance_matrices()
+        g_f = g[0, 0]
+
+        # block diagonal part, C / dt - K, in band storage
+        ab = np.zeros((2 * num_eq + 1, num_eq * num_segs))
+        ab[self.band_rows, self.band_cols] = np.tile((np.diag(c / time_step) - k).ravel(), num_segs)
+
+        # leg 1 inlets, from the segment above
+        ab[2 * num_eq, 0:num_eq * (num_segs - 1):num_eq] = -g_f
+
+        # leg 2 inlets, from the segment below
+        ab[0, num_eq + 1::num_eq] = -g_f
+
+        # leg 2 inlet of the last segment, from its leg 1 outlet
+        ab[num_eq + 1, num_eq * (num_segs - 1)] -= g_f
+
+        y_prev = np.array([seg.y for seg in segments])
+        rhs = y_prev * (c / time_step) + g[:, 2] * seg_inputs['boundary-temperature']
+        rhs[0, 0] += g_f * inlet_temp
+
+        y = solve_banded((num_eq, num_eq), ab, rhs.ravel()).reshape(num_segs, num_eq)
+
+        # update the segment states and report variables
+        for idx, seg in enumerate(segments):
+            seg.y = y[idx]
+            seg.inlet_temp_1 = y[idx - 1, 0] if idx > 0 else inlet_temp
+            seg.inlet_temp_2 = y[idx + 1, 1] if idx < num_segs - 1 else y[idx, 0]
+            seg.update_report_vars()
+
+        self.segments[num_segs].temperature = y[-1, 0]
+
     def get_outlet_temp(self):
         return self.segments[0].get_outlet_2_temp()
 
@@ -357,18 +512,4 @@ class SingleUTubeGroutedBorehole(SimulationEntryPoint):
         return bh_ht_rate
 
     def report_outputs(self) -> dict:
-        d = {}
-        for seg in self.segments:
-            d = merge_dicts(d, seg.report_outputs())
-
-        d = merge_dicts(d, self.pipe_1.report_outputs())
-
-        d_self = {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRate): self.heat_rate,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRateBH): self.heat_rate_bh,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.InletTemp): self.inlet_temperature,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): self.outlet_temperature,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.BHResist): self.resist_bh_ave,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.BHIntResist): self.resist_bh_total_internal,
-                  '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.BHDCResist): self.resist_bh_direct_coupling}
-
-        return merge_dicts(d, d_self)
+        return self.report_vars.to_dict(self.op)
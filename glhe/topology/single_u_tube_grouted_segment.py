@@ -4,13 +4,36 @@ from scipy.integrate import solve_ivp
 
 from glhe.input_processor.component_types import ComponentTypes
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 from glhe.properties.base_properties import PropertiesBase
 from glhe.topology.pipe import Pipe
+from glhe.utilities.functions import round_relative
 
 
 class SingleUTubeGroutedSegment(object):
+    """
+    Four-node, five-equation grouted U-tube segment model.
+
+    The node equations are linear, with constant inlet and boundary temperatures over a time step. By default, they
+    are integrated with solve_ivp. With the 'expm' integration method, each time step is instead advanced exactly with
+    the matrix exponential of the system matrix. The system matrix is a symmetric conductance matrix scaled by the
+    node heat capacities, so the matrix exponential is found from a symmetric eigendecomposition.
+
+    The fluid properties, and so the resistances, change with the inlet temperature every time step. So the
+    propagators are cached for each time step and set of coefficients rounded to a relative resolution. Each
+    propagator is found from the exact coefficients of the time step which first needs it, and is reused while the
+    coefficients stay within the same resolution. This is an accuracy trade-off: the reused propagators are exact for
+    coefficients that differ by less than the resolution, so the node temperatures are off by a similarly small
+    fraction of the temperature differences driving the time step.
+    """
+
     Type = ComponentTypes.SegmentSingleUTubeGrouted
 
+    max_cache_size = 64
+
+    # relative resolution of the coefficients used to look up cached propagators
+    propagator_resolution = 1e-4
+
     def __init__(self, inputs, ip, op):
         self.name = inputs['segment-name']
         self.ip = ip
@@ -45,6 +68,18 @@ class SingleUTubeGroutedSegment(object):
         self.diameter = inputs['diameter']
         self.grout_vol = self.calc_grout_volume()
 
+        # set the integration method. apply default if needed.
+        try:
+            self.integration_method = inputs['integration-method']
+        except KeyError:
+            self.integration_method = 'solve-ivp'
+
+        if self.integration_method not in ['expm', 'solve-ivp']:
+            raise ValueError("Integration method '{}' is not valid.".format(self.integration_method))
+
+        # propagators for each time step and set of bucketed coefficients
+        self.propagator_cache = {}
+
         # four-node model
         self.num_equations = 5
 
@@ -68,6 +103,13 @@ class SingleUTubeGroutedSegment(object):
         self.outlet_temp_2 = ip.init_temp()
         self.heat_rate_bh = 0
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.InletTemp_Leg1, 'inlet_temp_1'),
+                                            (ReportTypes.OutletTemp_Leg1, 'outlet_temp_1'),
+                                            (ReportTypes.InletTemp_Leg2, 'inlet_temp_2'),
+                                            (ReportTypes.OutletTemp_Leg2, 'outlet_temp_2'),
+                                            (ReportTypes.HeatRateBH, 'heat_rate_bh')])
+
     def calc_grout_volume(self):
         return self.calc_seg_volume() - self.calc_tot_pipe_volume()
 
@@ -123,6 +165,132 @@ class SingleUTubeGroutedSegment(object):
 
         return r
 
+    def calc_heat_capacities(self) -> tuple:
+        """
+        Compute the heat capacity of each node
+
+        :return: tuple of the fluid, direct-coupling grout, and leg-to-wall grout node heat capacities
+        """
+
+        c_f = self.fluid_heat_capacity * self.pipe.fluid_vol
+
+        # direct-coupling grout node
+        f = self.grout_frac
+        c_g_1 = f * self.grout.specific_heat * self.grout.density * self.grout_vol
+        c_g_1 += self.pipe.specific_heat * self.pipe.density * self.pipe.pipe_wall_vol
+
+        # nodes between each leg and the wall
+        c_g_2 = (1 - f) * self.grout.specific_heat * self.grout.density * self.grout_vol
+        c_g_2 += self.pipe.specific_heat * self.pipe.density * self.pipe.pipe_wall_vol
+        c_g_2 /= 2
+
+        return c_f, c_g_1, c_g_2
+
+    def get_coefficients(self) -> tuple:
+        """
+        Coefficients of the node equations which change between time steps
+
+        :return: tuple of the fluid heat capacity rate, fluid volumetric heat capacity, borehole resistance, and
+        direct-coupling resistance
+        """
+
+        return self.flow_rate * self.fluid_cp, self.fluid_heat_capacity, self.bh_resist, self.dc_resist
+
+    def calc_conductance_matrices(self, coefficients: tuple = None) -> tuple:
+        """
+        Compute the conductance matrices of the node energy balances, C dy/dt = K y + G u, where u holds the
+        leg 1 and leg 2 inlet temperatures and the boundary temperature
+
+        :param coefficients: coefficients of the node equations, as returned by 'get_coefficients'.
+        the current coefficients are used if not given.
+        :return: tuple of the symmetric K matrix, the G matrix, and the node heat capacities
+        """
+
+        if coefficients is None:
+            coefficients = self.get_coefficients()
+
+        g_f, fluid_heat_capacity, bh_resist, dc_resist = coefficients
+
+        dz = self.length
+        g_b = dz / bh_resist
+        g_12 = dz / (dc_resist / 2.0)
+
+        k = np.array([[-(g_f + g_12 + g_b), 0, g_12, g_b, 0],
+                      [0, -(g_f + g_12 + g_b), g_12, 0, g_b],
+                      [g_12, g_12, -2 * g_12, 0, 0],
+                      [g_b, 0, 0, -2 * g_b, 0],
+                      [0, g_b, 0, 0, -2 * g_b]])
+
+        g = np.array([[g_f, 0, 0],
+                      [0, g_f, 0],
+                      [0, 0, 0],
+                      [0, 0, g_b],
+                      [0, 0, g_b]])
+
+        _, c_g_1, c_g_2 = self.calc_heat_capacities()
+        c_f = fluid_heat_capacity * self.pipe.fluid_vol
+        c = np.array([c_f, c_f, c_g_1, c_g_2, c_g_2])
+
+        return k, g, c
+
+    def calc_system_matrices(self) -> tuple:
+        """
+        Compute the matrices of the node equations, dy/dt = A y + B u, where u holds the leg 1 and leg 2 inlet
+        temperatures and the boundary temperature
+
+        :return: tuple of the A and B matrices
+        """
+
+        k, g, c = self.calc_conductance_matrices()
+        return k / c[:, np.newaxis], g / c[:, np.newaxis]
+
+    def get_propagators(self, time_step: float, coefficients: tuple = None) -> tuple:
+        """
+        Get the propagators for the time step, such that y_new = phi y + gamma u, with
+        phi = exp(A dt) and gamma = A^-1 (exp(A dt) - I) B. They're exact for the coefficients they were found
+        from, and are reused while the coefficients stay within the propagator resolution.
+
+        The vectorized field engine also advances its segments with these propagators, so both engines share
+        the same cache and keys.
+
+        :param time_step: time step, in seconds
+        :param coefficients: coefficients of the node equations, as returned by 'get_coefficients'.
+        the current coefficients are used if not given.
+        :return: tuple of the phi and gamma matrices
+        """
+
+        # the coefficients change slightly every time step, so they are rounded for the cache key
+        if coefficients is None:
+            coefficients = self.get_coefficients()
+
+        res = self.propagator_resolution
+        key = (time_step,) + tuple(round_relative(x, res) for x in coefficients)
+
+        try:
+            return self.propagator_cache[key]
+        except KeyError:
+            pass
+
+        # bound the cache when the inputs keep changing
+        if len(self.propagator_cache) >= self.max_cache_size:
+            self.propagator_cache.clear()
+
+        # A = C^-1 K is similar to the symmetric matrix S = C^-1/2 K C^-1/2 = V diag(lambda) V^T,
+        # so exp(A dt) = C^-1/2 V diag(exp(lambda dt)) V^T C^1/2
+        k, g, c = self.calc_conductance_matrices(coefficients)
+        c_sqrt = np.sqrt(c)
+        lam, v = np.linalg.eigh(k / np.outer(c_sqrt, c_sqrt))
+
+        # the nodes are all coupled to the inlet or boundary temperatures, so the eigenvalues are negative
+        v_left = v / c_sqrt[:, np.newaxis]
+        v_right = np.transpose(v) / c_sqrt
+        phi = (v_left * np.exp(lam * time_step)).dot(np.transpose(v) * c_sqrt)
+        gamma = (v_left * (np.expm1(lam * time_step) / lam)).dot(v_right.dot(g))
+
+        propagators = (phi, gamma)
+        self.propagator_cache[key] = propagators
+        return propagators
+
     def get_heat_rate_bh(self):
         q_tot = (self.y[3] - self.boundary_temp) / self.bh_resist * self.length
         q_tot += (self.y[4] - self.boundary_temp) / self.bh_resist * self.length
@@ -134,28 +302,46 @@ class SingleUTubeGroutedSegment(object):
     def get_outlet_2_temp(self):
         return self.y[1]
 
-    def simulate_time_step(self, time_step: int, inputs: dict) -> np.ndarray:
+    def set_inputs(self, inputs: dict):
+        """
+        Set the flow rate, resistances, inlet and boundary temperatures, and fluid properties for the time step
+
+        :param inputs: dict of inputs. the fluid properties are evaluated at the leg 1 inlet temperature, unless
+        'fluid-cp' and 'fluid-heat-capacity' are given.
+        """
+
         self.flow_rate = inputs['flow-rate']
         self.inlet_temp_1 = inputs['inlet-1-temp']
         self.inlet_temp_2 = inputs['inlet-2-temp']
         self.boundary_temp = inputs['boundary-temperature']
         self.bh_resist = inputs['rb']
         self.dc_resist = inputs['dc-resist']
-        self.fluid_cp = self.fluid.get_cp(inputs['inlet-1-temp'])
-        self.fluid_heat_capacity = self.fluid.get_rho(inputs['inlet-1-temp']) * self.fluid_cp
 
-        ret = solve_ivp(self.right_hand_side, [0, time_step], self.y)
-        self.y = ret.y[:, -1]
+        try:
+            self.fluid_cp = inputs['fluid-cp']
+            self.fluid_heat_capacity = inputs['fluid-heat-capacity']
+        except KeyError:
+            self.fluid_cp = self.fluid.get_cp(inputs['inlet-1-temp'])
+            self.fluid_heat_capacity = self.fluid.get_rho(inputs['inlet-1-temp']) * self.fluid_cp
 
-        # update report vars
+    def update_report_vars(self):
         self.heat_rate_bh = self.get_heat_rate_bh()
         self.outlet_temp_1 = self.get_outlet_1_temp()
         self.outlet_temp_2 = self.get_outlet_2_temp()
+
+    def simulate_time_step(self, time_step: int, inputs: dict) -> np.ndarray:
+        self.set_inputs(inputs)
+
+        if self.integration_method == 'expm':
+            phi, gamma = self.get_propagators(time_step)
+            u = np.array([self.inlet_temp_1, self.inlet_temp_2, self.boundary_temp])
+            self.y = phi.dot(self.y) + gamma.dot(u)
+        else:
+            ret = solve_ivp(self.right_hand_side, [0, time_step], self.y)
+            self.y = ret.y[:, -1]
+
+        self.update_report_vars()
         return self.y
 
     def report_outputs(self) -> dict:
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.InletTemp_Leg1): self.inlet_temp_1,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp_Leg1): self.outlet_temp_1,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.InletTemp_Leg2): self.inlet_temp_2,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp_Leg2): self.outlet_temp_2,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRateBH): self.heat_rate_bh}
+        return self.report_vars.to_dict(self.op)
@@ -1,5 +1,6 @@
 from glhe.input_processor.component_types import ComponentTypes
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 
 
 class SingleUTubePassThroughSegment(object):
@@ -13,6 +14,9 @@ class SingleUTubePassThroughSegment(object):
         # report variables
         self.temperature = ip.init_temp()
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.OutletTemp, 'temperature')])
+
     def get_outlet_2_temp(self):
         return self.temperature
 
@@ -20,4 +24,4 @@ class SingleUTubePassThroughSegment(object):
         self.temperature = inputs['inlet-1-temp']
 
     def report_outputs(self) -> dict:
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): self.temperature}
+        return self.report_vars.to_dict(self.op)
@@ -4,6 +4,7 @@ from glhe.input_processor.component_types import ComponentTypes
 from glhe.interface.entry import SimulationEntryPoint
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.report_types import ReportTypes
+from glhe.output_processor.report_variables import ReportVariables
 from glhe.profiles.external_base import ExternalBase
 from glhe.properties.base_properties import PropertiesBase
 from glhe.utilities.functions import kw_to_w
@@ -75,6 +76,27 @@ class SwedishHP(PropertiesBase, SimulationEntryPoint):
         self.hp_rtf = None  # total heat pump runtime fraction (-)
         self.heat_extraction = None  # total heat extracted from borehole (W)
 
+        self.report_vars = ReportVariables(self, self.Type, self.name,
+                                           [(ReportTypes.FlowRate, 'flow_rate'),
+                                            (ReportTypes.InletTemp, 'inlet_temperature'),
+                                            (ReportTypes.OutletTemp, 'outlet_temperature'),
+                                            (ReportTypes.HeatRateSrc, 'heat_extraction'),
+                                            (ReportTypes.HeatRateLoad, 'htg_tot'),
+                                            (ReportTypes.ImmElect, 'imm_elec_tot'),
+                                            (ReportTypes.HtgLoad, 'htg_load'),
+                                            (ReportTypes.WtrHtgLoad, 'wtr_htg_load'),
+                                            (ReportTypes.RTF, 'hp_rtf'),
+                                            (ReportTypes.HtgRTF, 'htg_rtf'),
+                                            (ReportTypes.WtrHtgRTF, 'wtr_htg_rtf'),
+                                            (ReportTypes.HtgElect, 'htg_elec'),
+                                            (ReportTypes.WtrHtgElect, 'wtr_htg_elec'),
+                                            (ReportTypes.HtgImmElect, 'htg_imm_elec'),
+                                            (ReportTypes.WtrHtgImmElect, 'wtr_htg_imm_elec'),
+                                            (ReportTypes.HtgUnmet, 'htg_unmet'),
+                                            (ReportTypes.WtrHtgUnmet, 'wtr_htg_unmet'),
+                                            (ReportTypes.ODT, 'odt'),
+                                            (ReportTypes.COP, 'cop')])
+
     def x7_cop(self, src_side_eft, load_side_exft):
         """
         Gives COP the "X7" heat pump;
@@ -298,22 +320,4 @@ class SwedishHP(PropertiesBase, SimulationEntryPoint):
         return response
 
     def report_outputs(self) -> dict:
-        return {'{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.FlowRate): self.flow_rate,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.InletTemp): self.inlet_temperature,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.OutletTemp): self.outlet_temperature,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRateSrc): self.heat_extraction,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HeatRateLoad): self.htg_tot,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.ImmElect): self.imm_elec_tot,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HtgLoad): self.htg_load,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.WtrHtgLoad): self.wtr_htg_load,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.RTF): self.hp_rtf,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HtgRTF): self.htg_rtf,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.WtrHtgRTF): self.wtr_htg_rtf,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HtgElect): self.htg_elec,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.WtrHtgElect): self.wtr_htg_elec,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HtgImmElect): self.htg_imm_elec,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.WtrHtgImmElect): self.wtr_htg_imm_elec,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.HtgUnmet): self.htg_unmet,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.WtrHtgUnmet): self.wtr_htg_unmet,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.ODT): self.odt,
-                '{:s}:{:s}:{:s}'.format(self.Type, self.name, ReportTypes.COP): self.cop}
+        return self.report_vars.to_dict(self.op)
@@ -0,0 +1,506 @@
+import numpy as np
+from math import pi
+
+from glhe.input_processor.component_types import ComponentTypes
+from glhe.interface.response import SimulationResponse
+from glhe.topology.pipe import Pipe
+from glhe.topology.single_u_tube_grouted_borehole import SingleUTubeGroutedBorehole
+from glhe.utilities.functions import lin_interp
+
+
+class VectorizedPipes(object):
+    """
+    A set of pipes with the same number of cells, advanced together.
+
+    The cell temperatures, inlet temperature histories, and report variables of all pipes are stored in 2-D arrays,
+    with one row for each pipe. The equations are the same as for the Pipe model, and are solved for a subset of the
+    rows at a time.
+    """
+
+    def __init__(self, pipes: list):
+        """
+        :param pipes: list of Pipe instances. their current state is the initial state.
+        """
+
+        self.fluid = pipes[0].fluid
+
+        self.num_cells = pipes[0].num_pipe_cells
+        self.apply_transit_delay = pipes[0].apply_transit_delay
+
+        for pipe in pipes:
+            if pipe.num_pipe_cells != self.num_cells or pipe.apply_transit_delay != self.apply_transit_delay:
+                raise ValueError('Pipes must have the same number of cells and transit delay settings.')
+
+        self.inner_diameter = np.array([pipe.inner_diameter for pipe in pipes])
+        self.inner_radius = np.array([pipe.inner_radius for pipe in pipes])
+        self.length = np.array([pipe.length for pipe in pipes])
+        self.fluid_vol = np.array([pipe.fluid_vol for pipe in pipes])
+        self.resist_cond = np.array([pipe.calc_cond_resist() for pipe in pipes])
+
+        self.cell_temps = np.array([pipe.cell_temps for pipe in pipes], dtype=float)
+        self.outlet_temperature = np.array([pipe.outlet_temperature for pipe in pipes], dtype=float)
+
+        # inlet temperature histories, left aligned, padded with infinite times
+        hist_size = max(len(pipe.inlet_temps) for pipe in pipes) + 8
+        self.hist_len = np.array([len(pipe.inlet_temps) for pipe in pipes])
+        self.hist_times = np.full((len(pipes), hist_size), np.inf)
+        self.hist_temps = np.zeros((len(pipes), hist_size))
+        for idx, pipe in enumerate(pipes):
+            self.hist_times[idx, :self.hist_len[idx]] = pipe.inlet_temps_times
+            self.hist_temps[idx, :self.hist_len[idx]] = pipe.inlet_temps
+
+        # report variables
+        self.re = np.array([pipe.re for pipe in pipes], dtype=float)
+        self.resist_pipe = np.array([pipe.resist_pipe for pipe in pipes], dtype=float)
+
+    def m_dot_to_re(self, rows: np.ndarray, flow_rate: float, temps: np.ndarray) -> np.ndarray:
+        """
+        Convert mass flow rate to Reynolds number
+
+        :param rows: pipe indices
+        :param flow_rate: mass flow rate, kg/s
+        :param temps: temperatures, C
+        :return: Reynolds numbers
+        """
+
+        self.re[rows] = Pipe.calc_reynolds_number(flow_rate, self.fluid.mu_interp(temps), self.inner_diameter[rows])
+        return self.re[rows]
+
+    def calc_resist(self, rows: np.ndarray, flow_rate: float, temps: np.ndarray) -> np.ndarray:
+        """
+        Calculates the combined conduction and convection pipe resistance, as in Pipe.calc_resist
+
+        :param rows: pipe indices
+        :param flow_rate: mass flow rate, kg/s
+        :param temps: temperatures, C
+        :return: pipe resistances, m-K/W
+        """
+
+        re = self.m_dot_to_re(rows, flow_rate, temps)
+
+        nu = Pipe.smooth_nusselt(re, self.fluid.pr_interp(temps))
+        resist_conv = 1 / (nu * pi * self.fluid.k_interp(temps))
+        self.resist_pipe[rows] = resist_conv + self.resist_cond[rows]
+        return self.resist_pipe[rows]
+
+    def log_inlet_temps(self, rows: np.ndarray, temps: np.ndarray, times: np.ndarray):
+        """
+        Save inlet temp histories for later use.
+
+        :param rows: pipe indices
+        :param temps: current inlet temperatures
+        :param times: current simulation times
+        """
+
+        pos = self.hist_len[rows]
+        if pos.max() >= self.hist_times.shape[1]:
+            num_pipes, hist_size = self.hist_times.shape
+            self.hist_times = np.hstack((self.hist_times, np.full((num_pipes, hist_size), np.inf)))
+            self.hist_temps = np.hstack((self.hist_temps, np.zeros((num_pipes, hist_size))))
+
+        self.hist_times[rows, pos] = times
+        self.hist_temps[rows, pos] = temps
+        self.hist_len[rows] += 1
+
+    def plug_flow_outlet_temp(self, rows: np.ndarray, times: np.ndarray) -> np.ndarray:
+        """
+        Tracks the plug-flow outlet temperatures, as in Pipe.plug_flow_outlet_temp
+
+        :param rows: pipe indices
+        :param times: simulation times
+        :return: outlet temperatures
+        """
+
+        temps = self.hist_temps[rows, 0]
+
+        started = times > 0
+        if not started.any():
+            return temps
+
+        rows = rows[started]
+        times = times[started]
+        hist_len = self.hist_len[rows]
+        hist_times = self.hist_times[rows]
+        hist_temps = self.hist_temps[rows]
+
+        # first logged time after the query time. the padding is never before it.
+        idx_h = np.argmax(hist_times > times[:, np.newaxis], axis=1)
+        num_old = idx_h - 1
+
+        # the last entry is taken as the lower bound when the query time is before the history
+        idx_l = np.where(num_old < 0, hist_len - 1, num_old)
+
+        pos = np.arange(rows.size)
+        t_l = hist_times[pos, idx_l]
+        t_h = hist_times[pos, idx_h]
+        temp_l = hist_temps[pos, idx_l]
+        temp_h = hist_temps[pos, idx_h]
+        temps[started] = lin_interp(times, t_l, t_h, temp_l, temp_h)
+
+        # eliminate old history
+        num_old = np.maximum(num_old, 0)
+        if num_old.any():
+            cols = np.arange(hist_times.shape[1]) + num_old[:, np.newaxis]
+            is_pad = cols >= hist_len[:, np.newaxis]
+            cols = np.minimum(cols, hist_times.shape[1] - 1)
+            self.hist_times[rows] = np.where(is_pad, np.inf, np.take_along_axis(hist_times, cols, axis=1))
+            self.hist_temps[rows] = np.where(is_pad, 0, np.take_along_axis(hist_temps, cols, axis=1))
+            self.hist_len[rows] = hist_len - num_old
+
+        return temps
+
+    def simulate_time_step(self, rows: np.ndarray, time: int, time_step: int, flow_rate: float,
+                           inlet_temps: np.ndarray) -> np.ndarray:
+        """
+        Simulate the temperature response of the pipes, as in Pipe.simulate_time_step.
+
+        The number of sub-steps depends on the transit time of each pipe, so pipes which need fewer sub-steps are
+        masked out of the later sub-steps.
+
+        :param rows: pipe indices
+        :param time: simulation time, in seconds
+        :param time_step: time step, in seconds
+        :param flow_rate: mass flow rate, kg/s
+        :param inlet_temps: inlet temperatures, C
+        :return: outlet temperatures
+        """
+
+        if time_step <= 0:
+            return self.outlet_temperature[rows]
+
+        re = self.m_dot_to_re(rows, flow_rate, inlet_temps)
+
+        # volume flow rate and total transit time
+        v_dot = flow_rate / self.fluid.rho_interp(inlet_temps)
+        tau = self.fluid_vol[rows] / v_dot
+
+        tau_n, tau_0 = Pipe.calc_mixing_transit_times(tau, re, self.inner_radius[rows], self.length[rows],
+                                                      self.num_cells)
+        v_n = tau_n * v_dot
+
+        num_sub_steps = Pipe.calc_num_sub_steps(time_step, tau)
+        dt = time_step / num_sub_steps
+        v_n_dt = v_n / dt
+
+        cell_temps = self.cell_temps[rows]
+        t_sub = np.full(rows.size, float(time))
+
+        for step in range(num_sub_steps.max()):
+            active = np.nonzero(step < num_sub_steps)[0]
+            if active.size == rows.size:
+                active = slice(None)
+
+            if self.apply_transit_delay:
+                times = t_sub[active] + dt[active]
+                self.log_inlet_temps(rows[active], inlet_temps[active], times)
+                cell_inlet_temps = self.plug_flow_outlet_temp(rows[active], times - tau_0[active])
+            else:
+                cell_inlet_temps = inlet_temps[active]
+
+            cell_temps[active] = Pipe.solve_mixed_cells(cell_temps[active], cell_inlet_temps, v_dot[active],
+                                                        v_n_dt[active])
+
+            t_sub[active] += dt[active]
+
+        self.cell_temps[rows] = cell_temps
+        self.outlet_temperature[rows] = cell_temps[:, -1]
+        return self.outlet_temperature[rows]
+
+
+class VectorizedBoreholeField(object):
+    """
+    Field-level model which advances the grouted single U-tube boreholes of all flow paths together.
+
+    Each path holds one borehole. The segment node temperatures, pipe cell temperatures, and resistances of the
+    boreholes are stored in arrays with one row for each borehole, and each model equation is evaluated for all rows
+    at once. The equations and their order of evaluation are the same as for the SingleUTubeGroutedBorehole, Pipe, and
+    SingleUTubeGroutedSegment models, so the outlet temperatures are the same to round-off.
+
+    The report variables of the path, borehole, segment, and pipe instances are updated after each time step, but only
+    for the instances which have report variables selected for output.
+    """
+
+    def __init__(self, paths: list, op, also_reported: set = None):
+        """
+        :param paths: list of Path instances. the current state of their boreholes is the initial state.
+        :param op: output processor instance
+        :param also_reported: set of path, borehole, segment, and pipe instances which are updated even when
+        they are not reported, e.g. when other instances copy their report variables
+        """
+
+        self.paths = paths
+        self.num_paths = len(paths)
+
+        for path in paths:
+            if len(path.components) != 1 or path.components[0].Type != ComponentTypes.BoreholeSingleUTubeGrouted:
+                raise ValueError('Flow paths must hold one grouted single U-tube borehole for the vectorized field '
+                                 'engine.')
+
+        self.boreholes = [path.components[0] for path in paths]
+        self.num_bh = len(self.boreholes)
+        self.rows = np.arange(self.num_bh)
+
+        bh_0 = self.boreholes[0]
+        self.fluid = bh_0.fluid
+        self.num_segments = bh_0.num_segments
+        self.num_iterations = bh_0.num_iterations
+
+        for bh in self.boreholes:
+            if bh.num_segments != self.num_segments or bh.num_iterations != self.num_iterations:
+                raise ValueError('All boreholes must have the same number of segments and iterations.')
+            if bh.solution_method != 'iterative':
+                raise ValueError("Solution method '{}' is not supported by the vectorized field "
+                                 "engine.".format(bh.solution_method))
+            if bh.segments[0].integration_method != 'expm':
+                raise ValueError("Integration method '{}' is not supported by the vectorized field engine. "
+                                 "Use 'expm'.".format(bh.segments[0].integration_method))
+
+        # multipole method parameters
+        self.grout_k = np.array([bh.grout.conductivity for bh in self.boreholes])
+        self.theta_1 = np.array([bh.theta_1 for bh in self.boreholes])
+        self.theta_2 = np.array([bh.theta_2 for bh in self.boreholes])
+        self.theta_3 = np.array([bh.theta_3 for bh in self.boreholes])
+        self.sigma = np.array([bh.sigma for bh in self.boreholes])
+
+        # segments, which hold the propagator caches. all segments of a borehole are the same length.
+        num_segs = self.num_segments
+        self.segments = [bh.segments[:num_segs] for bh in self.boreholes]
+        self.seg_length = np.array([bh.segments[0].length for bh in self.boreholes])
+
+        # segment node temperatures, and the pass-through segment temperatures
+        self.y = np.array([[seg.y for seg in bh.segments[:num_segs]] for bh in self.boreholes], dtype=float)
+        self.pass_through_temp = np.array([bh.segments[num_segs].temperature for bh in self.boreholes], dtype=float)
+
+        # pipes
+        self.pipes_1 = VectorizedPipes([bh.pipe_1 for bh in self.boreholes])
+        self.pipes_2 = VectorizedPipes([bh.pipe_2 for bh in self.boreholes])
+
+        # segment report variables
+        self.seg_inlet_temp_1 = np.array([[seg.inlet_temp_1 for seg in bh.segments[:num_segs]]
+                                          for bh in self.boreholes], dtype=float)
+        self.seg_inlet_temp_2 = np.array([[seg.inlet_temp_2 for seg in bh.segments[:num_segs]]
+                                          for bh in self.boreholes], dtype=float)
+        self.seg_heat_rate_bh = np.array([[seg.heat_rate_bh for seg in bh.segments[:num_segs]]
+                                          for bh in self.boreholes], dtype=float)
+
+        # borehole report variables
+        self.heat_rate = np.array([bh.heat_rate for bh in self.boreholes], dtype=float)
+        self.heat_rate_bh = np.array([bh.heat_rate_bh for bh in self.boreholes], dtype=float)
+        self.inlet_temperature = np.array([bh.inlet_temperature for bh in self.boreholes], dtype=float)
+        self.outlet_temperature = np.array([bh.outlet_temperature for bh in self.boreholes], dtype=float)
+        self.resist_bh_ave = np.zeros(self.num_bh)
+        self.resist_bh_total_internal = np.zeros(self.num_bh)
+        self.resist_bh_direct_coupling = np.zeros(self.num_bh)
+
+        # path report variables
+        self.path_outlet_temperature = np.zeros(self.num_paths)
+
+        # instances with report variables selected for output
+        if also_reported is None:
+            also_reported = set()
+
+        def is_reported(obj):
+            rv = obj.report_vars
+            return obj in also_reported or op.report_component(rv.comp_type, rv.name or '')
+
+        self.reported_paths = [idx for idx, path in enumerate(paths) if is_reported(path)]
+        self.reported_bhs = [idx for idx, bh in enumerate(self.boreholes) if is_reported(bh)]
+        self.reported_pipes = [idx for idx, bh in enumerate(self.boreholes) if is_reported(bh.pipe_1)]
+        self.reported_segs = [(idx, seg_idx) for idx, bh in enumerate(self.boreholes)
+                              for seg_idx, seg in enumerate(bh.segments[:num_segs]) if is_reported(seg)]
+        self.reported_pass_through = [idx for idx, bh in enumerate(self.boreholes)
+                                      if is_reported(bh.segments[num_segs])]
+
+    def calc_direct_coupling_resistance(self, rows: np.ndarray, flow_rate: float, temps: np.ndarray) -> tuple:
+        """
+        Calculates the direct-coupling and average borehole resistances with the first-order multipole method
+        of SingleUTubeGroutedBorehole
+
+        :param rows: borehole indices
+        :param flow_rate: mass flow rate, kg/s
+        :param temps: temperatures, C
+        :return: tuple of direct-coupling and average borehole resistances, m-K/W
+        """
+
+        theta_1 = self.theta_1[rows]
+        theta_3 = self.theta_3[rows]
+        sigma = self.sigma[rows]
+        grout_k = self.grout_k[rows]
+
+        beta = 2 * pi * grout_k * self.pipes_1.calc_resist(rows, flow_rate, temps)
+
+        r_a = SingleUTubeGroutedBorehole.multipole_total_internal_resistance(beta, theta_1, theta_3, sigma, grout_k)
+        r_b = SingleUTubeGroutedBorehole.multipole_average_resistance(beta, theta_1, self.theta_2[rows], theta_3,
+                                                                      sigma, grout_k)
+        r_12 = SingleUTubeGroutedBorehole.direct_coupling_resistance(r_a, r_b)
+
+        self.resist_bh_total_internal[rows] = r_a
+        self.resist_bh_ave[rows] = r_b
+        self.resist_bh_direct_coupling[rows] = r_12
+        return r_12, r_b
+
+    def simulate_segment(self, rows: np.ndarray, seg_idx: int, time_step: int, flow_rate: float,
+                         inlet_temps_1: np.ndarray, inlet_temps_2: np.ndarray, boundary_temp: float,
+                         r_b: np.ndarray, r_12: np.ndarray):
+        """
+        Advance one segment of each borehole with the propagators of SingleUTubeGroutedSegment
+
+        :param rows: borehole indices
+        :param seg_idx: segment index
+        :param time_step: time step, in seconds
+        :param flow_rate: mass flow rate, kg/s
+        :param inlet_temps_1: leg 1 inlet temperatures, C
+        :param inlet_temps_2: leg 2 inlet temperatures, C
+        :param boundary_temp: borehole wall temperature, C
+        :param r_b: average borehole resistances, m-K/W
+        :param r_12: direct-coupling resistances, m-K/W
+        """
+
+        dz = self.seg_length[rows]
+
+        # fluid properties are evaluated at the leg 1 inlet temperatures
+        cp = self.fluid.cp_interp(inlet_temps_1)
+        coefficients = zip((flow_rate * cp).tolist(), (self.fluid.rho_interp(inlet_temps_1) * cp).tolist(),
+                           r_b.tolist(), r_12.tolist())
+
+        # propagators from each segment's own cache, so the engines step with the same propagators
+        propagators = [self.segments[row][seg_idx].get_propagators(time_step, coeffs)
+                       for row, coeffs in zip(rows.tolist(), coefficients)]
+        phi = np.array([p[0] for p in propagators])
+        gamma = np.array([p[1] for p in propagators])
+
+        u = np.column_stack((inlet_temps_1, inlet_temps_2, np.full(rows.size, float(boundary_temp))))
+        y = np.einsum('nij,nj->ni', phi, self.y[rows, seg_idx]) + np.einsum('nij,nj->ni', gamma, u)
+        self.y[rows, seg_idx] = y
+
+        # report variables
+        self.seg_inlet_temp_1[rows, seg_idx] = inlet_temps_1
+        self.seg_inlet_temp_2[rows, seg_idx] = inlet_temps_2
+        q_tot = (y[:, 3] - boundary_temp) / r_b * dz
+        q_tot += (y[:, 4] - boundary_temp) / r_b * dz
+        self.seg_heat_rate_bh[rows, seg_idx] = q_tot
+
+    def simulate_boreholes(self, rows: np.ndarray, inputs: SimulationResponse, inlet_temps: np.ndarray) -> np.ndarray:
+        """
+        Simulate the boreholes, as in SingleUTubeGroutedBorehole.simulate_time_step
+
+        :param rows: borehole indices
+        :param inputs: inlet conditions, with the borehole wall temperature
+        :param inlet_temps: inlet temperatures, C
+        :return: outlet temperatures
+        """
+
+        time = inputs.time
+        time_step = inputs.time_step
+        flow_rate = inputs.flow_rate
+        bh_wall_temp = inputs.bh_wall_temp
+        num_segs = self.num_segments
+
+        r_12, r_b = self.calc_direct_coupling_resistance(rows, flow_rate, inlet_temps)
+
+        pipe_1_outlet_temps = self.pipes_1.simulate_time_step(rows, time, time_step, flow_rate, inlet_temps)
+
+        # sweep down leg 1, with the leg 2 inlet temperatures from the previous sweep
+        for _ in range(self.num_iterations):
+            for idx in range(num_segs):
+                if idx == 0:
+                    inlet_temps_1 = pipe_1_outlet_temps
+                else:
+                    inlet_temps_1 = self.y[rows, idx - 1, 0]
+
+                if idx == num_segs - 1:
+                    inlet_temps_2 = self.pass_through_temp[rows]
+                else:
+                    inlet_temps_2 = self.y[rows, idx + 1, 1]
+
+                self.simulate_segment(rows, idx, time_step, flow_rate, inlet_temps_1, inlet_temps_2, bh_wall_temp,
+                                      r_b, r_12)
+
+            self.pass_through_temp[rows] = self.y[rows, num_segs - 1, 0]
+
+        outlet_temps = self.y[rows, 0, 1]
+        self.pipes_2.simulate_time_step(rows, time, time_step, flow_rate, outlet_temps)
+
+        # update report variables
+        self.inlet_temperature[rows] = inlet_temps
+        self.outlet_temperature[rows] = self.pipes_2.outlet_temperature[rows]
+        cp = self.fluid.cp_interp(inlet_temps)
+        self.heat_rate[rows] = flow_rate * cp * (inlet_temps - self.outlet_temperature[rows])
+        self.heat_rate_bh[rows] = np.sum(self.seg_heat_rate_bh[rows], axis=1)
+
+        return outlet_temps
+
+    def simulate_time_step(self, inputs: SimulationResponse) -> np.ndarray:
+        """
+        Simulate all flow paths, which share the same inlet conditions
+
+        :param inputs: path inlet conditions, with the borehole wall temperature
+        :return: outlet temperature of each path
+        """
+
+        inlet_temps = np.full(self.num_bh, float(inputs.temperature))
+        self.path_outlet_temperature = self.simulate_boreholes(self.rows, inputs, inlet_temps)
+        self.update_components(inputs)
+        return self.path_outlet_temperature
+
+    def get_heat_rate_bh(self, multiplicity: np.ndarray = None) -> float:
+        """
+        Total borehole wall heat transfer rate
+
+        :param multiplicity: number of boreholes represented by each borehole. defaults to one each.
+        :return: heat transfer rate, W
+        """
+
+        if multiplicity is None:
+            return float(np.sum(self.heat_rate_bh))
+        return float(np.dot(multiplicity, self.heat_rate_bh))
+
+    def update_components(self, inputs: SimulationResponse):
+        """
+        Update the report variables of the path, borehole, segment, and pipe instances which are reported
+
+        :param inputs: path inlet conditions
+        """
+
+        if self.reported_paths:
+            path_outlet_temps = self.path_outlet_temperature.tolist()
+            for idx in self.reported_paths:
+                path = self.paths[idx]
+                path.flow_rate = inputs.flow_rate
+                path.inlet_temperature = inputs.temperature
+                path.outlet_temperature = path_outlet_temps[idx]
+
+        if self.reported_bhs:
+            bh_vars = list(zip(self.inlet_temperature.tolist(), self.outlet_temperature.tolist(),
+                               self.heat_rate.tolist(), self.heat_rate_bh.tolist(), self.resist_bh_ave.tolist(),
+                               self.resist_bh_total_internal.tolist(), self.resist_bh_direct_coupling.tolist()))
+            for idx in self.reported_bhs:
+                bh = self.boreholes[idx]
+                (bh.inlet_temperature, bh.outlet_temperature, bh.heat_rate, bh.heat_rate_bh, bh.resist_bh_ave,
+                 bh.resist_bh_total_internal, bh.resist_bh_direct_coupling) = bh_vars[idx]
+
+        if self.reported_pipes:
+            pipe_vars = list(zip(self.pipes_1.outlet_temperature.tolist(), self.pipes_1.resist_pipe.tolist(),
+                                 self.pipes_1.re.tolist()))
+            for idx in self.reported_pipes:
+                pipe = self.boreholes[idx].pipe_1
+                pipe.outlet_temperature, pipe.resist_pipe, pipe.re = pipe_vars[idx]
+
+        if self.reported_segs:
+            inlet_temps_1 = self.seg_inlet_temp_1.tolist()
+            inlet_temps_2 = self.seg_inlet_temp_2.tolist()
+            outlet_temps_1 = self.y[:, :, 0].tolist()
+            outlet_temps_2 = self.y[:, :, 1].tolist()
+            heat_rates_bh = self.seg_heat_rate_bh.tolist()
+            for idx, seg_idx in self.reported_segs:
+                seg = self.boreholes[idx].segments[seg_idx]
+                seg.inlet_temp_1 = inlet_temps_1[idx][seg_idx]
+                seg.inlet_temp_2 = inlet_temps_2[idx][seg_idx]
+                seg.outlet_temp_1 = outlet_temps_1[idx][seg_idx]
+                seg.outlet_temp_2 = outlet_temps_2[idx][seg_idx]
+                seg.heat_rate_bh = heat_rates_bh[idx][seg_idx]
+
+        if self.reported_pass_through:
+            pass_through_temps = self.pass_through_temp.tolist()
+            for idx in self.reported_pass_through:
+                self.boreholes[idx].segments[self.num_segments].temperature = pass_through_temps[idx]
@@ -3,14 +3,14 @@ from typing import Union
 
 import numpy as np
 import pandas as pd
-from math import ceil, exp, factorial, floor
+from math import ceil, exp, factorial, floor, log10
 from scipy.interpolate.interpolate import interp1d
 from scipy.interpolate.interpolate import interp2d
 
 from glhe.utilities.constants import SEC_IN_HOUR
 
 
-def smoothing_function(x: float, a: float, b: float) -> float:
+def smoothing_function(x: Union[float, np.ndarray], a: float, b: float) -> Union[float, np.ndarray]:
     """
     Sigmoid smoothing function
 
@@ -22,7 +22,7 @@ def smoothing_function(x: float, a: float, b: float) -> float:
     :return: float between 0-1
     """
 
-    return 1 / (1 + exp(-(x - a) / b))
+    return 1 / (1 + np.exp(-(x - a) / b))
 
 
 def k_to_c(x: Union[int, float, np.ndarray]) -> Union[int, float, np.ndarray]:
@@ -353,6 +353,22 @@ def lin_interp(x: float, x_l: float, x_h: float, y_l: float, y_h: float) -> floa
     return (x - x_l) / (x_h - x_l) * (y_h - y_l) + y_l
 
 
+def round_relative(x: float, resolution: float) -> float:
+    """
+    Round a value to a resolution relative to its order of magnitude.
+
+    :param x: value to round
+    :param resolution: relative resolution, e.g. 1e-4 keeps about four significant digits
+    :return: rounded value
+    """
+
+    if x == 0:
+        return 0.0
+
+    step = resolution * 10 ** floor(log10(abs(x)))
+    return round(x / step) * step
+
+
 def un_reverse_idx(length: int, reversed_idx: int) -> int:
     """
     For a reversed list-like object, this will return the index for the entry within the original un-reversed list
@@ -5,13 +5,13 @@ import sys
 from typing import Union
 import datetime as dt
 
-from glhe.utilities.functions import merge_dicts
 from glhe.utilities.functions import num_ts_per_hour_to_sec_per_ts
 from glhe.input_processor.plant_loop_component_factory import make_plant_loop_component
 from glhe.input_processor.component_types import ComponentTypes
 from glhe.input_processor.input_processor import InputProcessor
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
+from glhe.output_processor.report_variables import ReportVariables
 
 
 class PlantLoop(object):
@@ -29,13 +29,34 @@ class PlantLoop(object):
         # process inputs
         self.ip = InputProcessor(json_file_path)
 
+        # stream output to file in fixed-size chunks, if requested
+        try:
+            chunk_size = self.ip.input_dict['simulation']['output-chunk-size']
+        except KeyError:
+            chunk_size = None
+
+        # output file format. inferred from the output file extension if not set.
+        try:
+            output_format = self.ip.input_dict['simulation']['output-format']
+        except KeyError:
+            output_format = None
+
+        # report variable selection and reporting interval. all variables reported every time step if not set.
+        op_kwargs = {'chunk_size': chunk_size, 'output_format': output_format}
+        for key, arg in [('output-variables', 'output_variables'),
+                         ('output-report-interval', 'report_interval'),
+                         ('output-report-aggregation', 'report_aggregation')]:
+            if key in self.ip.input_dict['simulation']:
+                op_kwargs[arg] = self.ip.input_dict['simulation'][key]
+
         try:
             # setup output processor
             self.op = OutputProcessor(self.ip.input_dict['simulation']['output-path'],
-                                      self.ip.input_dict['simulation']['output-csv-name'])
+                                      self.ip.input_dict['simulation']['output-csv-name'],
+                                      **op_kwargs)
         except KeyError:
             # paths were not provided. apply default paths.
-            self.op = OutputProcessor(os.getcwd(), 'out.csv')
+            self.op = OutputProcessor(os.getcwd(), 'out.csv', **op_kwargs)
 
         # init plant-level variables
         self.demand_inlet_temp = self.ip.input_dict['simulation']['initial-temperature']
@@ -60,6 +81,17 @@ class PlantLoop(object):
         # initialize plant loop components
         self.initialize_plant_loop_topology()
 
+        # register report variables with the output processor
+        self.report_vars = ReportVariables(self, self.Type,
+                                           variables=[('Demand Inlet Temp. [C]', 'demand_inlet_temp'),
+                                                      ('Demand Outlet Temp. [C]', 'demand_outlet_temp'),
+                                                      ('Supply Inlet Temp. [C]', 'supply_inlet_temp'),
+                                                      ('Supply Outlet Temp. [C]', 'supply_outlet_temp')])
+
+        self.op.register_report_variables(self.report_vars)
+        for comp in self.demand_comps + self.supply_comps:
+            self.op.register_report_variables(comp.report_vars)
+
     def initialize_plant_loop_topology(self) -> None:
 
         for comp in self.ip.input_dict['topology']['demand-side']:
@@ -87,7 +119,7 @@ class PlantLoop(object):
 
         print('Simulation time: {}'.format(dt.datetime.now() - self.start_time))
 
-        with open('{}.txt'.format(os.path.join(self.op.output_dir, self.op.output_file[:-4])), 'w+') as f:
+        with open('{}.txt'.format(os.path.join(self.op.output_dir, os.path.splitext(self.op.output_file)[0])), 'w+') as f:
             f.write('Simulation time: {}\n'.format(dt.datetime.now() - self.start_time))
 
         return True
@@ -117,32 +149,12 @@ class PlantLoop(object):
         self.supply_outlet_temp = response.temperature
 
     def report_outputs(self):
-
-        d = {'{:s}:{:s}'.format(self.Type, 'Demand Inlet Temp. [C]'): self.demand_inlet_temp,
-             '{:s}:{:s}'.format(self.Type, 'Demand Outlet Temp. [C]'): self.demand_outlet_temp,
-             '{:s}:{:s}'.format(self.Type, 'Supply Inlet Temp. [C]'): self.supply_inlet_temp,
-             '{:s}:{:s}'.format(self.Type, 'Supply Outlet Temp. [C]'): self.supply_outlet_temp}
-
-        return d
+        return self.report_vars.to_dict(self.op)
 
     def collect_outputs(self, sim_time):
 
-        # record current time
-        d = {'Elapsed Time [s]': sim_time}
-
-        # report outputs from the PlantLoop object
-        d = merge_dicts(d, self.report_outputs())
-
-        # collect reports from demand components
-        for comp in self.demand_comps:
-            d = merge_dicts(d, comp.report_outputs())
-
-        # collect outputs from the supply components
-        for comp in self.supply_comps:
-            d = merge_dicts(d, comp.report_outputs())
-
-        # finalize collection by the OutputProcessor
-        self.op.collect_output(d)
+        # copy the current values of all registered report variables to the output processor
+        self.op.collect_report_row(sim_time)
 
 
 if __name__ == "__main__":
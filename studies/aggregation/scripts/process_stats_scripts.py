@@ -7,6 +7,7 @@ import pandas as pd
 
 sys.path.insert(0, os.path.abspath('../../..'))
 
+from glhe.output_processor.output_processor import load_output  # noqa
 from glhe.utilities.constants import SEC_IN_HOUR  # noqa
 from glhe.utilities.constants import SEC_IN_MIN  # noqa
 from glhe.utilities.constants import SEC_IN_DAY  # noqa
@@ -43,11 +44,31 @@ def os_path_split_asunder(path, debug=False):
         raise FileNotFoundError
 
 
-def calc_rmse(file_1, file_2):
-    df1 = pd.read_csv(file_1, usecols=["Average Fluid Temp [C]"], dtype=np.float64)
+def get_output_file(path):
+    # output file name and format of a run, from its input file. the runs write to their run directory.
+    d = load_json(join(path, 'in.json'))['simulation']
+
+    try:
+        name = d['output-csv-name']
+    except KeyError:
+        name = 'out.csv'
+
+    try:
+        output_format = d['output-format']
+    except KeyError:
+        output_format = None
+
+    return join(path, name), output_format
+
+
+def calc_rmse(base_path, path):
+    # only load the one column needed. binary output formats skip parsing the rest of the file.
+    file_1, format_1 = get_output_file(base_path)
+    df1 = load_output(file_1, columns=["Average Fluid Temp [C]"], output_format=format_1).astype(np.float64)
     df1.rename(index=str, columns={"Average Fluid Temp [C]": "Base"}, inplace=True)
 
-    df2 = pd.read_csv(file_2, usecols=["Average Fluid Temp [C]"], dtype=np.float64)
+    file_2, format_2 = get_output_file(path)
+    df2 = load_output(file_2, columns=["Average Fluid Temp [C]"], output_format=format_2).astype(np.float64)
     df2.rename(index=str, columns={"Average Fluid Temp [C]": "Test"}, inplace=True)
 
     df = pd.concat([df1, df2], axis=1)
@@ -129,7 +150,7 @@ def compute_run_stats(path, base_path=None):
         load = 'balanced'
         sim_time = 1
 
-    rmse = calc_rmse(join(base_path, 'out.csv'), join(path, 'out.csv'))
+    rmse = calc_rmse(base_path, path)
     run_time, run_time_stdev, sample_count = get_run_time(path)
     base_run_time, _, _ = get_run_time(base_path)
 
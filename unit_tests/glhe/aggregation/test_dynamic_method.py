@@ -134,3 +134,120 @@ class TestDynamic(unittest.TestCase):
         hist_g, hist_gb = tst.calc_temporal_superposition(dt)
         self.assertAlmostEqual(hist_g, 19.3806, delta=tol)
         self.assertAlmostEqual(hist_gb, 19.3806, delta=tol)
+
+    def test_calc_temporal_superposition_flow_rates(self):
+        tol = 0.001
+
+        temp_dir = tempfile.mkdtemp()
+        temp_csv = os.path.join(temp_dir, 'temp.csv')
+        temp_csv_2 = os.path.join(temp_dir, 'temp_2.csv')
+
+        with open(temp_csv, 'w') as f:
+            f.write('-16, 0\n'
+                    '-14, 1\n'
+                    '-12, 2\n'
+                    '-10, 3\n'
+                    '-8, 4\n')
+
+        with open(temp_csv_2, 'w') as f:
+            f.write('-16, 0, 0\n'
+                    '-14, 1, 2\n'
+                    '-12, 2, 4\n'
+                    '-10, 3, 6\n'
+                    '-8, 4, 8\n')
+
+        d = {'method': 'dynamic',
+             'expansion-rate': 2,
+             'number-bins-per-level': 2,
+             'runtime': 36000,
+             'time-scale': 5e9,
+             'g-function-path': temp_csv,
+             'g_b-function-path': temp_csv_2,
+             'g_b-flow-rates': [0.1, 0.3]}
+
+        tst = Dynamic(d)
+
+        dt = 900
+        t = 0
+
+        t += dt
+        tst.aggregate(t, 30000)
+        t += dt
+        tst.aggregate(t, 60000)
+        hist_g, hist_gb = tst.calc_temporal_superposition(dt, 0.2)
+        self.assertAlmostEqual(hist_gb, 1.5 * hist_g, delta=tol)
+
+        hist_g, hist_gb = tst.calc_temporal_superposition(dt, 0.3)
+        self.assertAlmostEqual(hist_gb, 2 * hist_g, delta=tol)
+
+        self.assertAlmostEqual(tst.get_g_b_value(dt, 0.2), 1.5 * tst.get_g_value(dt), delta=tol)
+
+    def test_calc_temporal_superposition_cached(self):
+        tst = self.add_instance_g_b()
+
+        dt = 900
+        t = 0
+        for idx in range(40):
+            t += dt
+            tst.aggregate(t, 1000 * (idx % 5))
+            hist_g, hist_g_b = tst.calc_temporal_superposition(dt)
+
+        # one layout for each step of the first hour, then the sub-hourly layout stays fixed
+        self.assertEqual(len(tst.g_cache), 4)
+
+        tst.g_cache.clear()
+        hist_g_new, hist_g_b_new = tst.calc_temporal_superposition(dt)
+        self.assertEqual(hist_g, hist_g_new)
+        self.assertEqual(hist_g_b, hist_g_b_new)
+
+    def test_get_flow_bucket(self):
+        tst = self.add_instance()
+        self.assertIsNone(tst.get_flow_bucket(None))
+        self.assertIsNone(tst.get_flow_bucket(0))
+        self.assertAlmostEqual(tst.get_flow_bucket(0.3000004), 0.3, delta=1e-12)
+
+        tst.flow_rate_resolution = 0
+        self.assertEqual(tst.get_flow_bucket(0.3000004), 0.3000004)
+
+    def test_g_value_cache(self):
+        temp_dir = tempfile.mkdtemp()
+        temp_csv = os.path.join(temp_dir, 'temp.csv')
+        temp_csv_2 = os.path.join(temp_dir, 'temp_2.csv')
+
+        with open(temp_csv, 'w') as f:
+            f.write('-16, 0\n'
+                    '-14, 1\n'
+                    '-12, 2\n'
+                    '-10, 3\n'
+                    '-8, 4\n')
+
+        with open(temp_csv_2, 'w') as f:
+            f.write('-16, 0, 0\n'
+                    '-14, 1, 2\n'
+                    '-12, 2, 4\n'
+                    '-10, 3, 6\n'
+                    '-8, 4, 8\n')
+
+        d = {'method': 'dynamic',
+             'expansion-rate': 2,
+             'number-bins-per-level': 2,
+             'runtime': 36000,
+             'time-scale': 5e9,
+             'g-function-path': temp_csv,
+             'g_b-function-path': temp_csv_2,
+             'g_b-flow-rates': [0.1, 2]}
+
+        tst = Dynamic(d)
+
+        dt = 900
+        g = tst.get_g_value(dt)
+        g_b = tst.get_g_b_value(dt, 0.3)
+        self.assertEqual(set(tst.g_value_cache.keys()), {('g', dt, None), ('g_b', dt, tst.get_flow_bucket(0.3))})
+
+        # varying flow rates don't grow the cache without bound
+        for idx in range(1000):
+            tst.get_g_b_value(dt, 0.1 + idx * 1e-3)
+            self.assertLessEqual(len(tst.g_value_cache), tst.max_cache_size)
+
+        self.assertEqual(tst.get_g_value(dt), g)
+        self.assertEqual(tst.get_g_b_value(dt, 0.3), g_b)
@@ -0,0 +1,176 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from scipy.interpolate import interp1d
+
+from glhe.aggregation.g_function_table import GFunctionFlowTable
+from glhe.aggregation.g_function_table import GFunctionTable
+
+
+class TestGFunctionTable(unittest.TestCase):
+
+    def test_init(self):
+        tst = GFunctionTable([-16, -14, -12, -10, -8], [0, 1, 2, 3, 4])
+        self.assertEqual(tst.cell_idx.tolist(), [0, 1, 2, 3, 3])
+        self.assertTrue(tst.is_single_step)
+
+        # unsorted data
+        tst = GFunctionTable([-12, -16, -8], [2, 0, 4])
+        self.assertEqual(tst.lntts.tolist(), [-16, -12, -8])
+        self.assertEqual(tst.g.tolist(), [0, 2, 4])
+
+        self.assertRaises(ValueError, lambda: GFunctionTable([-16, -14], [0, 1, 2]))
+        self.assertRaises(ValueError, lambda: GFunctionTable([-16], [0]))
+
+    def test_from_csv(self):
+        temp_dir = tempfile.mkdtemp()
+        temp_csv = os.path.join(temp_dir, 'temp.csv')
+
+        with open(temp_csv, 'w') as f:
+            f.write('-16, 0\n'
+                    '-14, 1\n'
+                    '-12, 2\n')
+
+        tst = GFunctionTable.from_csv(temp_csv)
+        self.assertAlmostEqual(tst(-13), 1.5, delta=1e-12)
+
+        with open(temp_csv, 'w') as f:
+            f.write('-16, 0, 1\n'
+                    '-14, 1, 2\n')
+
+        self.assertRaises(ValueError, lambda: GFunctionTable.from_csv(temp_csv))
+
+    def test_call_uniform(self):
+        tst = GFunctionTable([-16, -14, -12, -10, -8], [0, 1, 2, 3, 5])
+
+        # scalar
+        self.assertIsInstance(tst(-11), float)
+        self.assertAlmostEqual(tst(-11), 2.5, delta=1e-12)
+        self.assertAlmostEqual(tst(np.float64(-9)), 4, delta=1e-12)
+        self.assertAlmostEqual(tst(-8), 5, delta=1e-12)
+
+        # extrapolation
+        self.assertAlmostEqual(tst(-18), -1, delta=1e-12)
+        self.assertAlmostEqual(tst(-6), 7, delta=1e-12)
+
+        # vector
+        vals = tst(np.array([-18, -16, -11, -9, -6]))
+        np.testing.assert_allclose(vals, [-1, 0, 2.5, 4, 7], atol=1e-12)
+
+    def test_call_non_uniform(self):
+        lntts = np.array([-15.3, -14.6, -12.1, -12.05, -9.8, -3.0, 2.0, 2.001])
+        g = np.array([0.0, 0.1, 1.2, 1.25, 3.0, 6.0, 6.5, 6.51])
+
+        tst = GFunctionTable(lntts, g)
+        ref = interp1d(lntts, g, fill_value='extrapolate')
+
+        x = np.concatenate((np.linspace(-20, 6, 5001), lntts))
+        np.testing.assert_allclose(tst(x), ref(x), atol=1e-12)
+
+        for val in x[::50]:
+            self.assertAlmostEqual(tst(val), float(ref(val)), delta=1e-12)
+
+    def test_call_limited_grid(self):
+        lntts = np.array([-15.3, -14.6, -12.1, -12.05, -9.8, -3.0, 2.0, 2.001])
+        g = np.array([0.0, 0.1, 1.2, 1.25, 3.0, 6.0, 6.5, 6.51])
+
+        GFunctionTable.max_num_cells = 4
+        try:
+            tst = GFunctionTable(lntts, g)
+        finally:
+            GFunctionTable.max_num_cells = 1000000
+
+        self.assertFalse(tst.is_single_step)
+
+        ref = interp1d(lntts, g, fill_value='extrapolate')
+        x = np.concatenate((np.linspace(-20, 6, 501), lntts))
+        np.testing.assert_allclose(tst(x), ref(x), atol=1e-12)
+
+        for val in x[::10]:
+            self.assertAlmostEqual(tst(val), float(ref(val)), delta=1e-12)
+
+
+class TestGFunctionFlowTable(unittest.TestCase):
+
+    @staticmethod
+    def add_instance():
+        lntts = [-16, -14, -12, -10, -8]
+        g_b = [[0, 0],
+               [1, 2],
+               [2, 4],
+               [3, 6],
+               [4, 8]]
+        return GFunctionFlowTable(lntts, [0.1, 0.3], g_b)
+
+    def test_init(self):
+        tst = self.add_instance()
+        self.assertEqual(tst.flow_rates.tolist(), [0.1, 0.3])
+        self.assertEqual(tst.flow_slopes.shape, (2, 4))
+
+        # unsorted flow rates
+        tst = GFunctionFlowTable([-16, -14], [0.3, 0.1], [[0, 0], [2, 1]])
+        self.assertEqual(tst.flow_rates.tolist(), [0.1, 0.3])
+        self.assertAlmostEqual(tst(-14, 0.1), 1, delta=1e-12)
+
+        self.assertRaises(ValueError, lambda: GFunctionFlowTable([-16, -14], [0.1, 0.3], [[0, 0], [1, 2], [2, 4]]))
+        self.assertRaises(ValueError, lambda: GFunctionFlowTable([-16, -14], [0.1], [[0, 0], [1, 2]]))
+
+    def test_from_csv(self):
+        temp_dir = tempfile.mkdtemp()
+        temp_csv = os.path.join(temp_dir, 'temp.csv')
+
+        with open(temp_csv, 'w') as f:
+            f.write('-16, 0, 0\n'
+                    '-14, 1, 2\n'
+                    '-12, 2, 4\n')
+
+        tst = GFunctionFlowTable.from_csv(temp_csv, [0.1, 0.3])
+        self.assertAlmostEqual(tst(-13, 0.2), 2.25, delta=1e-12)
+
+        self.assertRaises(ValueError, lambda: GFunctionFlowTable.from_csv(temp_csv, [0.1]))
+
+    def test_get_flow_weights(self):
+        tst = self.add_instance()
+        self.assertEqual(tst.get_flow_weights(0.1), (0, 1, 0))
+        self.assertEqual(tst.get_flow_weights(0.3), (0, 1, 1))
+        self.assertEqual(tst.get_flow_weights(0.5), (0, 1, 1))
+        self.assertEqual(tst.get_flow_weights(0.01), (0, 1, 0))
+
+        idx_lo, idx_hi, w = tst.get_flow_weights(0.25)
+        self.assertEqual((idx_lo, idx_hi), (0, 1))
+        self.assertAlmostEqual(w, 0.75, delta=1e-12)
+
+    def test_call(self):
+        tst = self.add_instance()
+
+        # scalar
+        self.assertIsInstance(tst(-11, 0.2), float)
+        self.assertAlmostEqual(tst(-11, 0.2), 3.75, delta=1e-12)
+        self.assertAlmostEqual(tst(-11, 0.1), 2.5, delta=1e-12)
+        self.assertAlmostEqual(tst(-11), 2.5, delta=1e-12)
+
+        # clamped outside of the data
+        self.assertAlmostEqual(tst(-11, 1.0), 5, delta=1e-12)
+        self.assertAlmostEqual(tst(-6, 0.2), 6, delta=1e-12)
+        self.assertAlmostEqual(tst(-18, 0.2), 0, delta=1e-12)
+
+        # vector, in the same order as the input
+        vals = tst(np.array([-6, -11, -15, -18]), 0.2)
+        np.testing.assert_allclose(vals, [6, 3.75, 0.75, 0], atol=1e-12)
+
+    def test_get_flow_coefficients(self):
+        tst = self.add_instance()
+
+        intercepts, slopes = tst.get_flow_coefficients(0.2)
+        np.testing.assert_allclose(slopes, [0.75, 0.75, 0.75, 0.75], atol=1e-12)
+        self.assertEqual(len(tst.flow_cache), 1)
+
+        tst(np.array([-11, -9]), 0.2)
+        tst(-11, 0.25)
+        self.assertEqual(len(tst.flow_cache), 2)
+
+        tst.max_cache_size = 2
+        tst(-11, 0.3)
+        self.assertEqual(len(tst.flow_cache), 1)
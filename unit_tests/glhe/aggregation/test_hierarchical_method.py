@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from glhe.aggregation.agg_types import AggregationTypes
+from glhe.aggregation.hierarchical import Hierarchical
+from glhe.aggregation.static import Static
+
+
+class TestHierarchical(unittest.TestCase):
+
+    @staticmethod
+    def add_instance(inputs=None, method=Hierarchical):
+        temp_dir = tempfile.mkdtemp()
+        temp_csv = os.path.join(temp_dir, 'temp.csv')
+
+        with open(temp_csv, 'w') as f:
+            f.write('-16, 0\n'
+                    '-14, 1\n'
+                    '-12, 2\n'
+                    '-10, 3\n'
+                    '-8, 4\n')
+
+        d = {'method': 'hierarchical',
+             'time-scale': 5e9,
+             'g-function-path': temp_csv}
+
+        if inputs:
+            d.update(inputs)
+
+        return method(d)
+
+    def test_init(self):
+        tst = self.add_instance()
+        self.assertEqual(tst.Type, AggregationTypes.HIERARCHICAL)
+        self.assertEqual(tst.bins_per_merge, [24, 5, 73])
+        self.assertEqual(tst.min_num_bins, [12, 3, 40, 3])
+        self.assertEqual([x.size for x in tst.level_energy], [36, 8, 113, 64])
+
+    def test_aggregate(self):
+        tst = self.add_instance({'block-durations-in-hours': [1, 2, 4],
+                                 'waiting-periods': [2, 2, 2]})
+
+        dt = 3600
+        t = 0
+        for _ in range(11):
+            t += dt
+            tst.aggregate(t, 4)
+
+        self.assertEqual(tst.level_counts, [2, 2, 1])
+        self.assertEqual(tst.closed_energy.tolist(), [16, 8, 8, 4, 4])
+        self.assertEqual(tst.closed_dts.tolist(), [14400, 7200, 7200, 3600, 3600])
+
+        # last level grows beyond its initial capacity
+        for _ in range(300):
+            t += dt
+            tst.aggregate(t, 4)
+
+        self.assertGreater(tst.level_energy[-1].size, 64)
+        self.assertEqual(np.sum(tst.energy) + np.sum(tst.sub_hr.energy), 4 * 311)
+        self.assertEqual(np.sum(tst.dts) + np.sum(tst.sub_hr.dts), t)
+
+    def test_calc_temporal_superposition(self):
+        inputs = {'block-durations-in-hours': [1, 24, 120],
+                  'waiting-periods': [12, 3, 4],
+                  'bin-durations-in-hours': [1, 24, 120],
+                  'minimum-num-bins-for-each-level': [12, 3, 4]}
+
+        tst = self.add_instance(inputs)
+        tst_static = self.add_instance(inputs, method=Static)
+
+        dt = 900
+        t = 0
+        for idx in range(2000):
+            t += dt
+            energy = (1000 + 500 * np.sin(idx / 20)) * dt
+            tst.aggregate(t, energy)
+            tst_static.aggregate(t, energy)
+
+        # same blocks as the static method with the same layout
+        np.testing.assert_array_equal(tst.closed_dts, tst_static.closed_dts)
+        np.testing.assert_allclose(tst.closed_energy, tst_static.closed_energy, rtol=1e-12)
+        self.assertAlmostEqual(tst.calc_temporal_superposition(dt), tst_static.calc_temporal_superposition(dt),
+                               delta=1e-9)
+
+    def test_calc_temporal_superposition_cached(self):
+        tst = self.add_instance({'block-durations-in-hours': [1, 4, 8],
+                                 'waiting-periods': [3, 2, 2],
+                                 'runtime': 2000 * 900})
+
+        sizes = [x.size for x in tst.level_energy]
+        buffers = list(tst.level_energy)
+
+        # count the g-function evaluations of the closed blocks
+        closed_evals = []
+        interp_g = tst.interp_g
+
+        def interp_g_closed(lntts):
+            if np.ndim(lntts) == 2:
+                closed_evals.append(lntts.shape[0])
+            return interp_g(lntts)
+
+        tst.interp_g = interp_g_closed
+
+        dt = 900
+        t = 0
+        num_closes = 0
+        for idx in range(2000):
+            t += dt
+            closed_time = tst.closed_time
+            tst.aggregate(t, (1000 + 500 * np.sin(idx / 20)) * dt)
+            hist = tst.calc_temporal_superposition(dt)
+            if tst.closed_time != closed_time:
+                num_closes += 1
+
+        # the level arrays keep their size, and are updated in place
+        self.assertEqual([x.size for x in tst.level_energy], sizes)
+        self.assertTrue(all(x is y for x, y in zip(tst.level_energy, buffers)))
+
+        # g is only evaluated for the closed blocks once per block closed, for the four time steps until the next one.
+        # before the first block is closed, it's evaluated once for the open block.
+        self.assertEqual(num_closes, 499)
+        self.assertEqual(closed_evals, [3] + [4] * num_closes)
+
+        # same result as evaluating all blocks directly
+        tst.hist_cache.clear()
+        closed_evals.clear()
+        tst.dt_close = 0
+        self.assertAlmostEqual(tst.calc_temporal_superposition(dt), hist, delta=1e-12 * abs(hist))
+        self.assertEqual(closed_evals, [1])
@@ -0,0 +1,137 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from glhe.aggregation.agg_types import AggregationTypes
+from glhe.aggregation.mlaa import MLAA
+from glhe.aggregation.no_agg import NoAgg
+
+
+class TestMLAA(unittest.TestCase):
+
+    @staticmethod
+    def add_instance(inputs=None, method=MLAA):
+        temp_dir = tempfile.mkdtemp()
+        temp_csv = os.path.join(temp_dir, 'temp.csv')
+
+        with open(temp_csv, 'w') as f:
+            f.write('-16, 0\n'
+                    '-14, 1\n'
+                    '-12, 2\n'
+                    '-10, 3\n'
+                    '-8, 4\n')
+
+        d = {'method': 'mlaa',
+             'time-scale': 5e9,
+             'g-function-path': temp_csv}
+
+        if inputs:
+            d.update(inputs)
+
+        return method(d)
+
+    def test_init(self):
+        tst = self.add_instance()
+        self.assertEqual(tst.Type, AggregationTypes.MLAA)
+        self.assertEqual(tst.fixed_widths.tolist(), [1] * 12 + [24, 24, 168])
+
+        self.assertRaises(ValueError, lambda: self.add_instance({'block-durations-in-hours': [1, 24],
+                                                                 'number-blocks-per-level': [12, 2]}))
+
+    def test_aggregate(self):
+        tst = self.add_instance({'block-durations-in-hours': [1, 2, 4],
+                                 'number-blocks-per-level': [2, 1],
+                                 'runtime': 3600 * 4})
+
+        dt = 3600
+        t = 0
+        for idx in range(1, 4):
+            t += dt
+            tst.aggregate(t, idx)
+
+        # hours 1 and 2 are closed
+        self.assertEqual(tst.closed_energy.tolist(), [1, 2])
+        self.assertEqual(tst.closed_dts.tolist(), [3600, 3600])
+
+        # partly filled fixed block
+        t += dt
+        tst.aggregate(t, 4)
+        self.assertEqual(tst.closed_energy.tolist(), [1, 2, 3])
+        t += dt
+        tst.aggregate(t, 5)
+        self.assertEqual(tst.closed_energy.tolist(), [3, 3, 4])
+        self.assertEqual(tst.closed_dts.tolist(), [7200, 3600, 3600])
+
+        # last level, beyond the preallocated runtime
+        for idx in range(6, 12):
+            t += dt
+            tst.aggregate(t, idx)
+
+        self.assertEqual(tst.closed_energy.tolist(), [3, 18, 15, 9, 10])
+        self.assertEqual(tst.closed_dts.tolist(), [7200, 14400, 7200, 3600, 3600])
+        self.assertEqual(np.sum(tst.energy) + np.sum(tst.sub_hr.energy), np.sum(range(1, 12)))
+        self.assertEqual(np.sum(tst.dts) + np.sum(tst.sub_hr.dts), t)
+
+    def test_calc_temporal_superposition(self):
+        tol = 0.001
+
+        tst = self.add_instance()
+
+        dt = 900
+        t = 0
+
+        tst.aggregate(t, 0)
+        tst.aggregate(t, 0)
+        hist = tst.calc_temporal_superposition(dt)
+        self.assertAlmostEqual(hist, 0, delta=tol)
+
+        t += dt
+        tst.aggregate(t, 30000)
+        hist = tst.calc_temporal_superposition(dt)
+        self.assertAlmostEqual(hist, 19.3806, delta=tol)
+
+    def test_calc_temporal_superposition_no_agg(self):
+        tst = self.add_instance({'block-durations-in-hours': [1, 4, 16],
+                                 'number-blocks-per-level': [4, 4]})
+        tst_no_agg = self.add_instance(method=NoAgg)
+
+        dt = 900
+        t = 0
+        for idx in range(400):
+            t += dt
+            energy = (1000 + 500 * np.sin(idx / 20)) * dt
+            tst.aggregate(t, energy)
+            tst_no_agg.aggregate(t, energy)
+
+        hist = tst.calc_temporal_superposition(dt)
+        hist_no_agg = tst_no_agg.calc_temporal_superposition(dt)
+        self.assertAlmostEqual(hist, hist_no_agg, delta=0.01 * abs(hist_no_agg))
+
+    def test_calc_temporal_superposition_cached(self):
+        tst = self.add_instance({'block-durations-in-hours': [1, 4, 16],
+                                 'number-blocks-per-level': [4, 4]})
+
+        # count the g-function evaluations of the closed blocks
+        closed_evals = []
+        interp_g = tst.interp_g
+
+        def interp_g_closed(lntts):
+            if np.ndim(lntts) == 2:
+                closed_evals.append(lntts.shape[0])
+            return interp_g(lntts)
+
+        tst.interp_g = interp_g_closed
+
+        dt = 900
+        t = 0
+        for idx in range(400):
+            t += dt
+            tst.aggregate(t, (1000 + 500 * np.sin(idx / 20)) * dt)
+            tst.calc_temporal_superposition(dt)
+
+        # the closed blocks are evaluated once per hour, after the first hour is closed.
+        # before that, they're evaluated once for the open block.
+        self.assertEqual(tst.num_hours, 99)
+        self.assertEqual(closed_evals, [3] + [4] * 99)
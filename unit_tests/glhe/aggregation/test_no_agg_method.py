@@ -4,6 +4,7 @@ import unittest
 
 import numpy as np
 
+from glhe.aggregation.g_function_table import GFunctionTable
 from glhe.aggregation.no_agg import NoAgg
 
 
@@ -58,3 +59,72 @@ class TestNoAgg(unittest.TestCase):
         tst.aggregate(t, 30000)
         hist = tst.calc_temporal_superposition(dt)
         self.assertAlmostEqual(hist, 19.3806, delta=tol)
+
+    def test_calc_temporal_superposition_cached(self):
+        tst_uniform = self.add_instance()
+        tst_varied = self.add_instance()
+
+        dt = 900
+        t = 0
+        for idx in range(50):
+            t += dt
+            tst_uniform.aggregate(t, 1000 * (idx % 7))
+            tst_varied.aggregate(t, 1000 * (idx % 7))
+
+        # no cached g-values are used for a different time step
+        self.assertAlmostEqual(tst_uniform.calc_temporal_superposition(dt),
+                               tst_uniform.calc_temporal_superposition(dt + 1e-9), delta=1e-6)
+        self.assertEqual(tst_uniform.g_hist.size, 50)
+
+        # non-uniform time steps
+        tst_varied.aggregate(t + 600, 500)
+        tst_uniform.aggregate(t + 900, 500)
+        self.assertIsNone(tst_varied.uniform_dt)
+        self.assertEqual(tst_uniform.uniform_dt, dt)
+        self.assertNotAlmostEqual(tst_uniform.calc_temporal_superposition(dt),
+                                  tst_varied.calc_temporal_superposition(dt), delta=1e-6)
+
+    def test_grow(self):
+        tst = self.add_instance()
+        tst.capacity = 2
+        tst.energy_buf = tst.energy_buf[:2]
+        tst.dts_buf = tst.dts_buf[:2]
+        tst.dq_buf = tst.dq_buf[:2]
+
+        for idx in range(1, 6):
+            tst.aggregate(idx * 60, idx)
+
+        self.assertEqual(tst.capacity, 8)
+        self.assertEqual(tst.energy.tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(tst.dts.tolist(), [60, 60, 60, 60, 60])
+
+    def test_calc_temporal_superposition_batch(self):
+        tst = self.add_instance()
+        tst_batch = self.add_instance()
+
+        dt = 900
+        energy = np.sin(np.arange(200) / 10) * 30000
+
+        hist = []
+        for idx in range(energy.size):
+            tst.aggregate(idx * dt, energy[idx - 1])
+            hist.append(tst.calc_temporal_superposition(dt))
+
+        hist_batch = tst_batch.calc_temporal_superposition_batch(energy, dt)
+        self.assertEqual(hist_batch.size, energy.size)
+        np.testing.assert_allclose(hist_batch, hist, rtol=1e-9, atol=1e-9)
+
+        # with g_b-functions
+        tst = self.add_instance()
+        tst_batch = self.add_instance()
+        for agg in [tst, tst_batch]:
+            agg.interp_g_b = GFunctionTable([-16, -8], [0.5, 1])
+
+        hist = []
+        for idx in range(energy.size):
+            tst.aggregate(idx * dt, energy[idx - 1])
+            hist.append(tst.calc_temporal_superposition(dt))
+
+        hist_g, hist_g_b = tst_batch.calc_temporal_superposition_batch(energy, dt)
+        np.testing.assert_allclose(hist_g, [h[0] for h in hist], rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(hist_g_b, [h[1] for h in hist], rtol=1e-9, atol=1e-9)
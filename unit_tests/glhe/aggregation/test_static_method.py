@@ -1,40 +1,186 @@
-# import unittest
-#
-# from glhe.aggregation.static import Static
-#
-#
-# class TestStatic(unittest.TestCase):
-#
-#     @staticmethod
-#     def add_instance():
-#         d = {'minimum-num-bins-for-each-level': [2, 2, 2],
-#              'bin-durations-in-hours': [1, 2, 4]}
-#
-#         return Static(d)
-#
-#     def test_aggregate(self):
-#         tst = self.add_instance()
-#
-#         t = 0
-#         dt = 3600
-#
-#         t += dt
-#         tst.aggregate(t, 4)
-#
-#         t += dt
-#         tst.aggregate(t, 4)
-#
-#         t += dt
-#         tst.aggregate(t, 4)
-#
-#         t += dt
-#         tst.aggregate(t, 4)
-#
-#         t += dt
-#         tst.aggregate(t, 4)
-#
-#         t += dt
-#         tst.aggregate(t, 4)
-#
-#         t += dt
-#         tst.aggregate(t, 4)
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from glhe.aggregation.no_agg import NoAgg
+from glhe.aggregation.static import Static
+
+
+class TestStatic(unittest.TestCase):
+
+    @staticmethod
+    def add_instance(min_num_bins=None, bin_durations=None, method=Static):
+        temp_dir = tempfile.mkdtemp()
+        temp_csv = os.path.join(temp_dir, 'temp.csv')
+
+        with open(temp_csv, 'w') as f:
+            f.write('-16, 0\n'
+                    '-14, 1\n'
+                    '-12, 2\n'
+                    '-10, 3\n'
+                    '-8, 4\n')
+
+        d = {'method': 'static',
+             'runtime': 36000,
+             'time-scale': 5e9,
+             'g-function-path': temp_csv}
+
+        if min_num_bins:
+            d['minimum-num-bins-for-each-level'] = min_num_bins
+
+        if bin_durations:
+            d['bin-durations-in-hours'] = bin_durations
+
+        return method(d)
+
+    def test_init(self):
+        tst = self.add_instance([2, 2, 2], [1, 2, 4])
+        self.assertEqual(tst.bins_per_merge, [2, 2])
+        self.assertEqual([x.size for x in tst.level_energy], [4, 4, 4])
+
+        self.assertRaises(ValueError, lambda: self.add_instance([2, 2], [1, 2, 4]))
+        self.assertRaises(ValueError, lambda: self.add_instance([2, 2, 2], [1, 3, 4]))
+        self.assertRaises(ValueError, lambda: self.add_instance([2, 2, 2], [1, 1, 4]))
+
+    def test_aggregate(self):
+        tst = self.add_instance([2, 2, 2], [1, 2, 4])
+
+        dt = 3600
+        t = 0
+
+        # first hour is handled by the sub-hourly method
+        t += dt
+        tst.aggregate(t, 4)
+        self.assertEqual(np.sum(tst.energy), 0)
+
+        t += dt
+        tst.aggregate(t, 4)
+        self.assertEqual(tst.level_counts, [1, 0, 0])
+        self.assertEqual(np.sum(tst.energy), 4)
+
+        # merge into the second level
+        t += dt
+        tst.aggregate(t, 4)
+        t += dt
+        tst.aggregate(t, 4)
+        t += dt
+        tst.aggregate(t, 4)
+        self.assertEqual(tst.level_counts, [2, 1, 0])
+        self.assertEqual(tst.closed_energy.tolist(), [8, 4, 4])
+        self.assertEqual(tst.closed_dts.tolist(), [7200, 3600, 3600])
+
+        # merge into the third level
+        for _ in range(6):
+            t += dt
+            tst.aggregate(t, 4)
+        self.assertEqual(tst.level_counts, [2, 2, 1])
+        self.assertEqual(tst.closed_energy.tolist(), [16, 8, 8, 4, 4])
+
+        # all energy and time is accounted for
+        self.assertEqual(np.sum(tst.energy) + np.sum(tst.sub_hr.energy), 4 * 11)
+        self.assertEqual(np.sum(tst.dts) + np.sum(tst.sub_hr.dts), t)
+
+    def test_aggregate_sub_hourly(self):
+        tst = self.add_instance([2, 2], [1, 2])
+
+        dt = 900
+        t = 0
+        for _ in range(10):
+            t += dt
+            tst.aggregate(t, 1)
+
+        # partly filled open bin
+        self.assertEqual(tst.level_counts, [1, 0])
+        self.assertEqual(tst.open_dt, 1800)
+        self.assertEqual(tst.open_energy, 2)
+        self.assertEqual(np.sum(tst.dts) + np.sum(tst.sub_hr.dts), t)
+
+        for _ in range(2):
+            t += dt
+            tst.aggregate(t, 1)
+
+        self.assertEqual(tst.level_counts, [2, 0])
+        self.assertEqual(tst.open_dt, 0)
+        self.assertEqual(tst.closed_energy.tolist(), [4, 4])
+
+    def test_calc_temporal_superposition(self):
+        tol = 0.001
+
+        tst = self.add_instance()
+
+        dt = 900
+        t = 0
+
+        tst.aggregate(t, 0)
+        tst.aggregate(t, 0)
+        hist = tst.calc_temporal_superposition(dt)
+        self.assertAlmostEqual(hist, 0, delta=tol)
+
+        t += dt
+        tst.aggregate(t, 30000)
+        hist = tst.calc_temporal_superposition(dt)
+        self.assertAlmostEqual(hist, 19.3806, delta=tol)
+
+    def test_calc_temporal_superposition_no_agg(self):
+        tst = self.add_instance([4, 4, 4], [1, 4, 16])
+        tst_no_agg = self.add_instance(method=NoAgg)
+
+        dt = 900
+        t = 0
+        for idx in range(400):
+            t += dt
+            energy = (1000 + 500 * np.sin(idx / 20)) * dt
+            tst.aggregate(t, energy)
+            tst_no_agg.aggregate(t, energy)
+
+        hist = tst.calc_temporal_superposition(dt)
+        hist_no_agg = tst_no_agg.calc_temporal_superposition(dt)
+        self.assertAlmostEqual(hist, hist_no_agg, delta=0.01 * abs(hist_no_agg))
+
+    def test_calc_temporal_superposition_cached(self):
+        tst = self.add_instance([2, 2, 2], [1, 2, 4])
+        sizes = [x.size for x in tst.level_energy]
+
+        q_buf = tst.q_buf
+
+        # record the g-function evaluations of the closed bins, and of the sub-hourly bins
+        closed_evals = []
+        sub_hr_evals = []
+        interp_g = tst.interp_g
+
+        def interp_g_closed(lntts):
+            if np.ndim(lntts) == 2:
+                closed_evals.append(lntts.shape)
+            else:
+                sub_hr_evals.append(lntts.size)
+            return interp_g(lntts)
+
+        tst.interp_g = interp_g_closed
+
+        dt = 600
+        t = 0
+        num_closes = 0
+        for idx in range(200):
+            t += dt
+            closed_time = tst.closed_time
+            tst.aggregate(t, 1000 * (idx % 7))
+            tst.calc_temporal_superposition(dt)
+            if tst.closed_time != closed_time:
+                num_closes += 1
+
+            # the level arrays are not reallocated, except for the last level
+            self.assertEqual([x.size for x in tst.level_energy][:-1], sizes[:-1])
+
+        # the closed bins are only evaluated once per bin closed, for all six time steps until the next one closes.
+        # before the first bin is closed, they're evaluated once for the open bin.
+        self.assertEqual(num_closes, 32)
+        self.assertEqual(len(closed_evals), num_closes + 1)
+        self.assertTrue(all(shape[0] == 6 for shape in closed_evals[1:]))
+
+        # the sub-hourly bins are evaluated once for each layout, which stays the same after the first hour
+        self.assertEqual(sub_hr_evals, [2, 3, 4, 5, 6])
+
+        # the loads of the recent bins are held in the same buffer
+        self.assertIs(tst.q_buf, q_buf)
@@ -2,6 +2,8 @@ import os
 import tempfile
 import unittest
 
+import numpy as np
+
 from glhe.aggregation.sub_hourly import SubHour
 
 
@@ -77,3 +79,37 @@ class TestSubHourMethod(unittest.TestCase):
         t += dt_lrg
         val = tst.aggregate(t, 3.5)
         self.assertEqual(val, 3.5)
+
+    def test_aggregate_buffer(self):
+        tst = self.add_instance()
+
+        # one day of 1-minute steps. the buffers should only ever hold about an hour of bins.
+        dt = 60
+        total_shifted = 0
+        for idx in range(1, 24 * 60 + 1):
+            total_shifted += tst.aggregate(idx * dt, 1)
+
+        self.assertEqual(tst.capacity, 128)
+        self.assertEqual(len(tst.energy), 60)
+        self.assertEqual(np.sum(tst.dts), 3600)
+        self.assertEqual(tst.energy[-1], 1)
+        self.assertEqual(total_shifted + np.sum(tst.energy), 24 * 60)
+
+        # a long time step shifts everything except the current bin
+        val = tst.aggregate(24 * 3600 + 7200, 10)
+        self.assertEqual(val, 65)
+        self.assertEqual(tst.energy.tolist(), [5])
+        self.assertEqual(tst.dts.tolist(), [3600])
+
+    def test_aggregate_total_time(self):
+        tst = self.add_instance()
+
+        # irregular time steps which don't divide the hour evenly
+        time = 0
+        for idx in range(20000):
+            time += [7.3, 61.1, 13.7][idx % 3]
+            tst.aggregate(time, 1)
+
+            # the window never spans more than the first hour, and the running total matches it exactly
+            self.assertEqual(tst.total_time, 3600)
+            self.assertAlmostEqual(np.sum(tst.dts), 3600, delta=1e-9)
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from glhe.g_function.g_function_cache import GFunctionCache
+
+
+class TestGFunctionCache(unittest.TestCase):
+
+    @staticmethod
+    def add_instance(max_entries=None, max_size_mb=None):
+        d = {'path': os.path.join(tempfile.mkdtemp(), 'cache')}
+
+        if max_entries:
+            d['max-entries'] = max_entries
+
+        if max_size_mb:
+            d['max-size-mb'] = max_size_mb
+
+        return GFunctionCache(d)
+
+    def test_init(self):
+        tst = self.add_instance()
+        self.assertTrue(os.path.isdir(tst.cache_dir))
+        self.assertEqual(tst.max_entries, 100)
+        self.assertEqual(tst.max_size, 500e6)
+
+    def test_make_key(self):
+        d = {'boreholes': [[100.0, 2.0, 0.06, 0.0, 0.0]], 'soil-diffusivity': 1e-6, 'lntts': np.arange(-5, 0, 0.1)}
+        key = GFunctionCache.make_key('g', d)
+        self.assertEqual(len(key), 64)
+
+        # same content, different types and order
+        d_2 = {'lntts': list(np.arange(-5, 0, 0.1)), 'soil-diffusivity': np.float64(1e-6),
+               'boreholes': np.array([[100, 2, 0.06, 0, 0]])}
+        self.assertEqual(key, GFunctionCache.make_key('g', d_2))
+
+        # different content or kind
+        d['soil-diffusivity'] = 1.1e-6
+        self.assertNotEqual(key, GFunctionCache.make_key('g', d))
+        self.assertNotEqual(key, GFunctionCache.make_key('g_b', d_2))
+
+        self.assertRaises(TypeError, lambda: GFunctionCache.make_key('g', {'x': object()}))
+
+    def test_load_store(self):
+        tst = self.add_instance()
+        key = GFunctionCache.make_key('g', {'x': 1})
+        self.assertIsNone(tst.load(key))
+
+        lntts = np.arange(-5, 0, 0.1)
+        g = np.sin(lntts)
+        tst.store(key, lntts=lntts, g=g)
+
+        data = tst.load(key)
+        np.testing.assert_array_equal(data['lntts'], lntts)
+        np.testing.assert_array_equal(data['g'], g)
+
+        # corrupt entries are treated as missing
+        with open(tst.entry_path(key), 'w') as f:
+            f.write('PK not a zip file')
+        self.assertIsNone(tst.load(key))
+
+    def test_evict(self):
+        tst = self.add_instance(max_entries=2)
+        keys = [GFunctionCache.make_key('g', {'x': idx}) for idx in range(3)]
+
+        for idx, key in enumerate(keys):
+            tst.store(key, g=np.full(10, idx))
+            # make sure modification times are distinct
+            os.utime(tst.entry_path(key), (time.time() - 10 + idx, time.time() - 10 + idx))
+
+        # least recently used entry is removed
+        self.assertIsNone(tst.load(keys[0]))
+        self.assertIsNotNone(tst.load(keys[1]))
+        self.assertIsNotNone(tst.load(keys[2]))
+
+        # size limit
+        tst = self.add_instance(max_size_mb=1e-9)
+        tst.store(keys[0], g=np.zeros(10))
+        tst.store(keys[1], g=np.zeros(10))
+        self.assertIsNone(tst.load(keys[0]))
+        self.assertIsNotNone(tst.load(keys[1]))
@@ -1,10 +1,18 @@
+import importlib.util
 import os
 import tempfile
 import unittest
 
 import pandas as pd
 
+from glhe.output_processor.output_processor import OutputFormats
 from glhe.output_processor.output_processor import OutputProcessor
+from glhe.output_processor.output_processor import get_output_format
+from glhe.output_processor.output_processor import load_output
+from glhe.output_processor.report_variables import ReportVariables
+
+pyarrow_missing = importlib.util.find_spec('pyarrow') is None
+tables_missing = importlib.util.find_spec('tables') is None
 
 
 class TestOutputProcessor(unittest.TestCase):
@@ -54,3 +62,208 @@ class TestOutputProcessor(unittest.TestCase):
         tst.df = pd.DataFrame({'Elapsed Time [s]': [0, 60, 120], 'Variable': [1, 2, 3]})
         tst.convert_time_to_timestamp()
         self.assertTrue(tst.df.index.name == 'Date/Time')
+
+    def test_collect_output_grow(self):
+        tst = OutputProcessor(tempfile.mkdtemp(), 'temp.csv', initial_capacity=2)
+
+        for idx in range(5):
+            tst.collect_output({'foo': idx, 'bar': idx / 2})
+
+        self.assertEqual(tst.capacity, 8)
+        self.assertEqual(tst.df['foo'].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(tst.df['bar'].tolist(), [0, 0.5, 1, 1.5, 2])
+        self.assertEqual(tst.df['foo'].dtype, 'int64')
+
+    def test_register_output_grow(self):
+        tst = self.add_instance()
+
+        for idx in range(40):
+            self.assertEqual(tst.register_output('var {}'.format(idx)), idx)
+
+        self.assertEqual(tst.col_capacity, 64)
+        self.assertEqual(tst.data.shape[0], 64)
+
+        tst.collect_output({'var {}'.format(idx): idx for idx in range(40)})
+        self.assertEqual(tst.df['var 39'].tolist(), [39])
+        self.assertEqual(tst.df.shape, (1, 40))
+
+    def test_collect_output_new_variable(self):
+        tst = self.add_instance()
+
+        tst.collect_output({'foo': 1})
+        tst.collect_output({'foo': 2, 'bar': 3.5})
+
+        self.assertEqual(list(tst.df.columns), ['bar', 'foo'])
+        self.assertTrue(pd.isna(tst.df['bar'][0]))
+        self.assertEqual(tst.df['bar'][1], 3.5)
+
+    def test_register_output(self):
+        tst = self.add_instance()
+        self.assertEqual(tst.register_output('foo'), 0)
+        self.assertEqual(tst.register_output('bar'), 1)
+        self.assertEqual(tst.register_output('foo'), 0)
+
+    def test_write_to_file_streaming(self):
+        temp_dir = tempfile.mkdtemp()
+        tst_base = OutputProcessor(temp_dir, 'base.csv')
+        tst_stream = OutputProcessor(temp_dir, 'stream.csv', chunk_size=3)
+
+        for idx in range(10):
+            d = {'Elapsed Time [s]': idx * 60,
+                 'foo': idx / 3,
+                 'bar': idx}
+            tst_base.collect_output(d)
+            tst_stream.collect_output(d)
+
+        # only the rows not yet flushed are kept in memory
+        self.assertEqual(tst_stream.num_rows, 1)
+        self.assertTrue(os.path.exists(tst_stream.write_path))
+
+        tst_base.write_to_file()
+        tst_stream.write_to_file()
+
+        with open(tst_base.write_path, 'r') as f_base, open(tst_stream.write_path, 'r') as f_stream:
+            self.assertEqual(f_base.read(), f_stream.read())
+
+    def test_streaming_new_variable_error(self):
+        tst = OutputProcessor(tempfile.mkdtemp(), 'temp.csv', chunk_size=1)
+        tst.collect_output({'foo': 1})
+        self.assertRaises(ValueError, lambda: tst.collect_output({'foo': 2, 'bar': 3}))
+
+    def test_get_output_format(self):
+        self.assertEqual(get_output_format('out.csv'), OutputFormats.CSV)
+        self.assertEqual(get_output_format('out.parquet'), OutputFormats.PARQUET)
+        self.assertEqual(get_output_format('out.h5'), OutputFormats.HDF5)
+        self.assertEqual(get_output_format('out.npy'), OutputFormats.NPY)
+        self.assertEqual(get_output_format('out'), OutputFormats.CSV)
+        self.assertEqual(get_output_format('out.csv', 'parquet'), OutputFormats.PARQUET)
+        self.assertRaises(ValueError, lambda: get_output_format('out.csv', 'bob'))
+
+    def check_write_and_load(self, output_name, output_format=None):
+        tst = OutputProcessor(tempfile.mkdtemp(), output_name, output_format=output_format)
+
+        for idx in range(4):
+            tst.collect_output({'Elapsed Time [s]': idx * 60, 'foo': idx / 2, 'bar': idx})
+
+        tst.write_to_file()
+        self.assertTrue(os.path.exists(tst.write_path))
+
+        df = load_output(tst.write_path, columns=['foo'], output_format=output_format)
+        self.assertEqual(list(df.columns), ['foo'])
+        self.assertEqual(df['foo'].tolist(), [0, 0.5, 1, 1.5])
+
+    def test_write_csv(self):
+        self.check_write_and_load('out.csv')
+
+    def test_write_npy(self):
+        self.check_write_and_load('out.npy')
+        self.check_write_and_load('out.csv', output_format=OutputFormats.NPY)
+
+    @unittest.skipIf(pyarrow_missing, 'pyarrow not installed')
+    def test_write_parquet(self):
+        self.check_write_and_load('out.parquet')
+
+    @unittest.skipIf(tables_missing, 'tables not installed')
+    def test_write_hdf5(self):
+        self.check_write_and_load('out.h5')
+
+    @unittest.skipIf(tables_missing, 'tables not installed')
+    def test_write_hdf5_streaming(self):
+        tst = OutputProcessor(tempfile.mkdtemp(), 'out.h5', chunk_size=3)
+
+        for idx in range(10):
+            tst.collect_output({'Elapsed Time [s]': idx * 60, 'foo': idx / 2})
+
+        tst.write_to_file()
+        df = load_output(tst.write_path, columns=['foo'])
+        self.assertEqual(df['foo'].tolist(), [x / 2 for x in range(10)])
+
+    def test_streaming_format_error(self):
+        self.assertRaises(ValueError, lambda: OutputProcessor(tempfile.mkdtemp(), 'out.npy', chunk_size=3))
+
+    def test_output_variables(self):
+        tst = OutputProcessor(tempfile.mkdtemp(), 'temp.csv',
+                              output_variables=['pipe:*:outlet temp. [c]', 'Path:PATH 1:*', 'ConstantLoad:*:Heat Rate [W]'])
+
+        self.assertTrue(tst.report_component('Pipe', 'BH 1: PIPE 1'))
+        self.assertTrue(tst.report_component('Path', 'PATH 1'))
+        self.assertTrue(tst.report_component('ConstantLoad', 'LOAD'))
+        self.assertFalse(tst.report_component('Path', 'PATH 2'))
+
+        self.assertTrue(tst.is_reported('Pipe:BH 1: PIPE 1:Outlet Temp. [C]'))
+        self.assertFalse(tst.is_reported('Pipe:BH 1: PIPE 1:Reynolds No [-]'))
+        self.assertTrue(tst.is_reported('ConstantLoad:LOAD:Heat Rate [W]'))
+        self.assertFalse(tst.is_reported('ConstantLoad:LOAD:Outlet Temp. [C]'))
+
+        # patterns without type and name fields match the variable only
+        tst_var = OutputProcessor(tempfile.mkdtemp(), 'temp.csv', output_variables=['Heat Rate [W]'])
+        self.assertTrue(tst_var.report_component('Path', 'PATH 2'))
+        self.assertTrue(tst_var.is_reported('Path:PATH 2:Heat Rate [W]'))
+        self.assertFalse(tst_var.is_reported('Path:PATH 2:Outlet Temp. [C]'))
+
+        tst.collect_output({'Elapsed Time [s]': 60,
+                            'Pipe:BH 1: PIPE 1:Outlet Temp. [C]': 1,
+                            'Pipe:BH 1: PIPE 1:Reynolds No [-]': 2})
+
+        self.assertEqual(list(tst.df.columns), ['Elapsed Time [s]', 'Pipe:BH 1: PIPE 1:Outlet Temp. [C]'])
+
+    def test_report_interval(self):
+        aggs = {'mean': [1.5, 3.5, 5], 'min': [1, 3, 5], 'max': [2, 4, 5], 'last': [2, 4, 5]}
+
+        for agg, vals in aggs.items():
+            tst = OutputProcessor(tempfile.mkdtemp(), 'temp.csv', report_interval=120, report_aggregation=agg)
+
+            for idx in range(1, 6):
+                tst.collect_output({'Elapsed Time [s]': idx * 60, 'foo': idx})
+
+            tst.write_to_file()
+            df = pd.read_csv(tst.write_path)
+            self.assertEqual(df['Elapsed Time [s]'].tolist(), [120, 240, 300])
+            self.assertEqual(df['foo'].tolist(), vals)
+
+    def test_report_interval_streaming(self):
+        temp_dir = tempfile.mkdtemp()
+        tst_base = OutputProcessor(temp_dir, 'base.csv', report_interval=180)
+        tst_stream = OutputProcessor(temp_dir, 'stream.csv', report_interval=180, chunk_size=2)
+
+        for idx in range(1, 20):
+            d = {'Elapsed Time [s]': idx * 60, 'foo': idx / 3}
+            tst_base.collect_output(d)
+            tst_stream.collect_output(d)
+
+        tst_base.write_to_file()
+        tst_stream.write_to_file()
+
+        with open(tst_base.write_path, 'r') as f_base, open(tst_stream.write_path, 'r') as f_stream:
+            self.assertEqual(f_base.read(), f_stream.read())
+
+    def test_collect_report_row(self):
+        class Comp(object):
+            def __init__(self, name, children=None):
+                self.temp = 10.0
+                self.load = 5.0
+                self.report_vars = ReportVariables(self, 'Comp', name,
+                                                   [('Temp [C]', 'temp'), ('Load [W]', 'load')],
+                                                   children=children)
+
+        child = Comp('child')
+        parent = Comp('parent', children=[child.report_vars])
+
+        tst = OutputProcessor(tempfile.mkdtemp(), 'temp.csv', output_variables=['Comp:*:Temp [C]', 'Comp:child:*'])
+        tst.register_report_variables(parent.report_vars)
+
+        for idx in range(1, 4):
+            child.temp = idx
+            parent.temp = 2 * idx
+            tst.collect_report_row(idx * 60)
+
+        self.assertEqual(list(tst.df.columns), ['Comp:child:Load [W]', 'Comp:child:Temp [C]',
+                                                'Comp:parent:Temp [C]', 'Elapsed Time [s]'])
+        self.assertEqual(tst.df['Comp:child:Temp [C]'].tolist(), [1, 2, 3])
+        self.assertEqual(tst.df['Comp:parent:Temp [C]'].tolist(), [2, 4, 6])
+        self.assertEqual(tst.df['Comp:child:Load [W]'].tolist(), [5, 5, 5])
+        self.assertEqual(tst.df['Elapsed Time [s]'].tolist(), [60, 120, 180])
+        self.assertEqual(parent.report_vars.to_dict(tst), {'Comp:parent:Temp [C]': 6,
+                                                           'Comp:parent:Load [W]': 5,
+                                                           'Comp:child:Temp [C]': 3,
+                                                           'Comp:child:Load [W]': 5})
@@ -46,3 +46,8 @@ class TestConstantLoad(unittest.TestCase):
         d = tst.report_outputs()
         self.assertTrue('ConstantLoad:MY NAME:Outlet Temp. [C]' in d.keys())
         self.assertTrue('ConstantLoad:MY NAME:Heat Rate [W]' in d.keys())
+
+    def test_report_outputs_not_selected(self):
+        tst = self.add_instance()
+        tst.op = OutputProcessor(tempfile.mkdtemp(), 'out.csv', output_variables=['Pipe:*:*'])
+        self.assertEqual(tst.report_outputs(), {})
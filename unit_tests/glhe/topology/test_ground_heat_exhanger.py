@@ -2,8 +2,12 @@ import os
 import tempfile
 import unittest
 
+import numpy as np
+
 from glhe.input_processor.input_processor import InputProcessor
+from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
+from glhe.output_processor.report_types import ReportTypes
 from glhe.topology.ground_heat_exchanger import GroundHeatExchanger
 from glhe.utilities.functions import write_json
 
@@ -11,7 +15,7 @@ from glhe.utilities.functions import write_json
 class TestGroundHeatExchanger(unittest.TestCase):
 
     @staticmethod
-    def add_instance():
+    def add_instance(load_aggregation=None):
         f_path = os.path.dirname(os.path.abspath(__file__))
         d = {
             "borehole-definitions": [
@@ -131,6 +135,9 @@ class TestGroundHeatExchanger(unittest.TestCase):
                 "specific-heat": 880
             }
         }
+        if load_aggregation:
+            d['ground-heat-exchanger'][0]['load-aggregation'] = load_aggregation
+
         temp_dir = tempfile.mkdtemp()
         temp_file = os.path.join(temp_dir, 'temp.json')
         write_json(temp_file, d)
@@ -142,3 +149,62 @@ class TestGroundHeatExchanger(unittest.TestCase):
     def test_init(self):
         tst = self.add_instance()
         self.assertIsInstance(tst, GroundHeatExchanger)
+
+        # g_b-functions are generated at the flow rate of the constant flow profile
+        self.assertEqual(tst.get_flow_profile_rates(), [0.3])
+        self.assertFalse(tst.lts_ghe.g_b_flow_dependent)
+
+    def test_simulate_batch(self):
+        tst = self.add_instance().lts_ghe
+
+        dt = 600
+        flow_rate = 0.3
+        heat_rates = np.full(48, 4000.0)
+        heat_rates[24:] = -2000
+
+        d = tst.simulate_batch(heat_rates, dt, flow_rate)
+
+        # direct superposition of each time step
+        q = heat_rates / (tst.h * tst.num_bh)
+        dq = np.diff(q, prepend=0)
+        resist_b = tst.ave_bh.calc_bh_average_resistance(temperature=16.1, flow_rate=flow_rate)
+        outlet_temps = []
+        for n in range(heat_rates.size):
+            lntts = np.log((n + 1 - np.arange(n + 1)) * dt / tst.load_agg.ts)
+            sum_g = np.dot(dq[:n + 1], tst.load_agg.interp_g(lntts))
+            sum_g_b = np.dot(dq[:n + 1], tst.load_agg.interp_g_b(lntts))
+            outlet_temps.append(16.1 + tst.c_0 * sum_g + resist_b * sum_g_b)
+
+        np.testing.assert_allclose(d[ReportTypes.OutletTemp], outlet_temps, rtol=0, atol=1e-9)
+        self.assertTrue(np.all(d[ReportTypes.InletTemp][:24] > d[ReportTypes.OutletTemp][:24]))
+        self.assertAlmostEqual(tst.outlet_temperature, outlet_temps[-1], delta=1e-9)
+        self.assertAlmostEqual(d[ReportTypes.BHWallTemp][0], 16.1, delta=1e-9)
+
+    def test_simulate_batch_step_by_step(self):
+        dt = 600
+        flow_rate = 0.3
+        heat_rates = np.full(48, 4000.0)
+        heat_rates[24:] = -2000
+
+        tst_batch = self.add_instance({'method': 'none'}).lts_ghe
+        d = tst_batch.simulate_batch(heat_rates, dt, flow_rate)
+
+        def run_step_by_step(tst):
+            # drive the step-by-step model with the inlet temperatures found by the batch simulation
+            outlet_temps = []
+            for idx, inlet_temp in enumerate(d[ReportTypes.InletTemp]):
+                res = tst.simulate_time_step(SimulationResponse(idx * dt, dt, flow_rate, inlet_temp))
+                outlet_temps.append(res.temperature)
+            return outlet_temps
+
+        # borehole resistance and fluid specific heat evaluated at the inlet temperature of each time step
+        tst_step = self.add_instance({'method': 'none'}).lts_ghe
+        np.testing.assert_allclose(run_step_by_step(tst_step), d[ReportTypes.OutletTemp], rtol=0, atol=0.02)
+
+        # evaluated at the initial temperature, as the batch simulation does
+        tst_step = self.add_instance({'method': 'none'}).lts_ghe
+        resist_b = tst_step.ave_bh.calc_bh_average_resistance(temperature=16.1, flow_rate=flow_rate)
+        cp = tst_step.fluid.get_cp(16.1)
+        tst_step.ave_bh.calc_bh_average_resistance = lambda *args, **kwargs: resist_b
+        tst_step.fluid.get_cp = lambda temperature: cp
+        np.testing.assert_allclose(run_step_by_step(tst_step), d[ReportTypes.OutletTemp], rtol=0, atol=1e-9)
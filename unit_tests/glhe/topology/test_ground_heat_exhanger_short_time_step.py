@@ -2,7 +2,11 @@ import os
 import tempfile
 import unittest
 
+import numpy as np
+
+from glhe.aggregation.g_function_table import GFunctionFlowTable
 from glhe.input_processor.input_processor import InputProcessor
+from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
 from glhe.topology.ground_heat_exchanger_short_time_step import GroundHeatExchangerSTS
 from glhe.utilities.functions import write_json
@@ -11,7 +15,7 @@ from glhe.utilities.functions import write_json
 class TestGroundHeatExchangerShortTimeStep(unittest.TestCase):
 
     @staticmethod
-    def add_instance():
+    def add_instance(cache_dir=None, radial_options=None, num_paths=1, bh_options=None):
         f_path = os.path.dirname(os.path.abspath(__file__))
         d = {
             "borehole-definitions": [
@@ -133,16 +137,125 @@ class TestGroundHeatExchangerShortTimeStep(unittest.TestCase):
         }
         temp_dir = tempfile.mkdtemp()
         temp_file = os.path.join(temp_dir, 'temp.json')
+
+        out_dir = f_path
+        if cache_dir:
+            d['ground-heat-exchanger'][0]['g-function-cache'] = {'path': cache_dir}
+            out_dir = temp_dir
+
+        if radial_options:
+            d['ground-heat-exchanger'][0]['radial-numerical-model'] = radial_options
+
+        if bh_options:
+            d['borehole-definitions'][0].update(bh_options)
+
+        for idx in range(1, num_paths):
+            name = 'bh {}'.format(idx + 1)
+            d['borehole'].append({'name': name,
+                                  'borehole-def-name': 'borehole type 1',
+                                  'location': {'x': 5 * idx, 'y': 0, 'z': 0}})
+            d['ground-heat-exchanger'][0]['flow-paths'].append({'name': 'path {}'.format(idx + 1),
+                                                                'components': [{'comp-type': 'borehole',
+                                                                                'name': name}]})
+
         write_json(temp_file, d)
 
         ip = InputProcessor(temp_file)
-        op = OutputProcessor(f_path, 'out.csv')
+        op = OutputProcessor(out_dir, 'out.csv')
         return GroundHeatExchangerSTS(d['ground-heat-exchanger'][0], ip, op)
 
     def test_init(self):
         tst = self.add_instance()
         self.assertIsInstance(tst, GroundHeatExchangerSTS)
 
+    def test_unique_paths(self):
+        tst_1 = self.add_instance()
+        tst_4 = self.add_instance(num_paths=4)
+        self.assertEqual(len(tst_4.paths), 4)
+        self.assertEqual(len(tst_4.unique_paths), 1)
+        self.assertEqual(tst_4.path_multiplicity.tolist(), [4])
+
+        for idx in range(20):
+            inputs = SimulationResponse(idx * 30, 30, 0.3, 20 + idx * 0.1)
+            res_1 = tst_1.simulate_time_step(inputs)
+            res_4 = tst_4.simulate_time_step(inputs)
+            self.assertAlmostEqual(res_1.temperature, res_4.temperature, delta=1e-12)
+            self.assertAlmostEqual(4 * tst_1.get_heat_rate_bh(), tst_4.get_heat_rate_bh(), delta=1e-9)
+
+        # report variables of the other paths are copied
+        d = tst_4.report_outputs()
+        self.assertEqual(d['Path:PATH 1:Outlet Temp. [C]'], d['Path:PATH 4:Outlet Temp. [C]'])
+        self.assertEqual(d['SegmentUTubeBHGrouted:BH:bh 1:Seg:3:BH Heat Rate [W]'],
+                         d['SegmentUTubeBHGrouted:BH:bh 4:Seg:3:BH Heat Rate [W]'])
+        self.assertNotEqual(d['Path:PATH 4:Outlet Temp. [C]'], 16.1)
+
+    def test_generate_g_cached(self):
+        cache_dir = os.path.join(tempfile.mkdtemp(), 'cache')
+
+        tst = self.add_instance(cache_dir)
+        tst.generate_g()
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        self.assertTrue(os.path.exists(os.path.join(tst.op.output_dir, 'sts.csv')))
+
+        # second instance loads from the cache
+        tst_2 = self.add_instance(cache_dir)
+        tst_2.generate_g()
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        self.assertFalse(os.path.exists(os.path.join(tst_2.op.output_dir, 'sts.csv')))
+        self.assertTrue(os.path.exists(os.path.join(tst_2.op.output_dir, 'g.csv')))
+        np.testing.assert_array_equal(tst.lntts, tst_2.lntts)
+        np.testing.assert_array_equal(tst.g, tst_2.g)
+
+    def test_generate_g_radial_options(self):
+        cache_dir = os.path.join(tempfile.mkdtemp(), 'cache')
+
+        tst = self.add_instance(cache_dir)
+        tst.generate_g()
+
+        tst_2 = self.add_instance(cache_dir, {'soil-mesh': 'geometric', 'time-stepping': 'adaptive'})
+        tst_2.generate_g()
+
+        # the options are part of the cache key
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+        self.assertLess(tst_2.lntts.size, tst.lntts.size / 5)
+        np.testing.assert_allclose(np.interp(tst.lntts, tst_2.lntts, tst_2.g), tst.g, atol=0.03)
+
+    def test_generate_g_b_table(self):
+        cache_dir = os.path.join(tempfile.mkdtemp(), 'cache')
+
+        tst = self.add_instance(cache_dir, bh_options={'integration-method': 'expm'})
+        path = tst.generate_g_b_table([0.2, 0.4])
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+        data = np.genfromtxt(path, delimiter=',')
+        self.assertEqual(data.shape, (tst.lntts_b.size, 3))
+        np.testing.assert_allclose(data[:, 1:], tst.g_b)
+
+        # one column for each flow rate
+        self.assertFalse(np.allclose(tst.g_b[:, 0], tst.g_b[:, 1]))
+
+        table = GFunctionFlowTable.from_csv(path, [0.2, 0.4])
+        self.assertAlmostEqual(table(tst.lntts_b[-1], 0.4), tst.g_b[-1, 1], delta=1e-9)
+
+        # second instance loads from the cache
+        tst_2 = self.add_instance(cache_dir, bh_options={'integration-method': 'expm'})
+        tst_2.generate_g_b_table([0.4, 0.2])
+        np.testing.assert_array_equal(tst.lntts_b, tst_2.lntts_b)
+        np.testing.assert_array_equal(tst.g_b, np.fliplr(tst_2.g_b))
+
+    def test_generate_g_b_table_workers(self):
+        # small model, so the runs are quick
+        bh_options = {'segments': 1, 'integration-method': 'expm'}
+
+        tst = self.add_instance(os.path.join(tempfile.mkdtemp(), 'cache'), bh_options=bh_options)
+        tst.generate_g_b_table([0.2, 0.4])
+
+        # the same runs in worker processes give the same table
+        tst_2 = self.add_instance(os.path.join(tempfile.mkdtemp(), 'cache'), bh_options=bh_options)
+        tst_2.generate_g_b_table([0.2, 0.4], workers=2)
+        np.testing.assert_array_equal(tst.lntts_b, tst_2.lntts_b)
+        np.testing.assert_array_equal(tst.g_b, tst_2.g_b)
+
     # def test_trcm(self):
     #     tst = self.add_instance()
     #     tst.generate_sts_response()
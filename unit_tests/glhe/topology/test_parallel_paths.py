@@ -0,0 +1,173 @@
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from glhe.input_processor.input_processor import InputProcessor
+from glhe.interface.response import SimulationResponse
+from glhe.output_processor.output_processor import OutputProcessor
+from glhe.topology.ground_heat_exchanger_short_time_step import GroundHeatExchangerSTS
+from glhe.topology.parallel_paths import ParallelPaths
+from glhe.utilities.functions import write_json
+
+join = os.path.join
+norm = os.path.normpath
+
+shared_memory_missing = importlib.util.find_spec('multiprocessing.shared_memory') is None
+
+
+class TestParallelPaths(unittest.TestCase):
+
+    @staticmethod
+    def add_instance(ghe_options=None):
+        f_path = os.path.dirname(os.path.abspath(__file__))
+
+        bh_def_1 = {"borehole-type": "single-grouted",
+                    "length": 76.2,
+                    "diameter": 0.114,
+                    "grout-def-name": "standard grout",
+                    "name": "borehole type 1",
+                    "pipe-def-name": "26 mm SDR-11 HDPE",
+                    "segments": 4,
+                    "shank-spacing": 0.0469}
+
+        bh_def_2 = dict(bh_def_1, **{"name": "borehole type 2",
+                                     "length": 100,
+                                     "segments": 6})
+
+        bh_def_3 = dict(bh_def_1, **{"name": "borehole type 3",
+                                     "shank-spacing": 0.05})
+
+        boreholes = []
+        paths = []
+        for idx, bh_def in enumerate([bh_def_1, bh_def_2, bh_def_3, bh_def_1]):
+            name = "bh {}".format(idx + 1)
+            boreholes.append({"name": name,
+                              "borehole-def-name": bh_def["name"],
+                              "location": {"x": 5 * idx, "y": 0, "z": 0}})
+            paths.append({"name": "path {}".format(idx + 1),
+                          "components": [{"comp-type": "borehole", "name": name}]})
+
+        ghe = {"name": "GHE 1",
+               "simulation-mode": "direct",
+               "g-function-path": join(f_path, '..', '..', '..', 'validation', 'MFRTRT_EWT_g_functions',
+                                       'EWT_experimental_g_functions.csv'),
+               "flow-paths": paths,
+               "load-aggregation": {"method": "dynamic",
+                                    "expansion-rate": 1.5,
+                                    "number-bins-per-level": 9}}
+
+        if ghe_options:
+            ghe.update(ghe_options)
+
+        d = {"borehole-definitions": [bh_def_1, bh_def_2, bh_def_3],
+             "borehole": boreholes,
+             "fluid": {"fluid-type": "water"},
+             "ground-temperature-model": {"ground-temperature-model-type": "constant",
+                                          "temperature": 16.1},
+             "grout-definitions": [{"name": "standard grout",
+                                    "conductivity": 0.85,
+                                    "density": 2500,
+                                    "specific-heat": 1560}],
+             "ground-heat-exchanger": [ghe],
+             "pipe-definitions": [{"name": "26 mm SDR-11 HDPE",
+                                   "outer-diameter": 0.0267,
+                                   "inner-diameter": 0.0218,
+                                   "conductivity": 0.39,
+                                   "density": 950,
+                                   "specific-heat": 1900}],
+             "simulation": {"name": "Basic GLHE",
+                            "initial-temperature": 16.1,
+                            "time-step": 30,
+                            "runtime": 3600},
+             "soil": {"name": "dirt",
+                      "conductivity": 2.7,
+                      "density": 2500,
+                      "specific-heat": 880}}
+
+        temp_dir = tempfile.mkdtemp()
+        temp_file = join(temp_dir, 'temp.json')
+        write_json(temp_file, d)
+
+        ip = InputProcessor(temp_file)
+        op = OutputProcessor(temp_dir, 'out.csv')
+        return GroundHeatExchangerSTS(d['ground-heat-exchanger'][0], ip, op)
+
+    @unittest.skipIf(shared_memory_missing, 'shared memory requires Python 3.8')
+    def test_init(self):
+        tst = self.add_instance({'parallel-paths': {'workers': 2}})
+        try:
+            self.assertIsInstance(tst.field, ParallelPaths)
+            self.assertEqual(tst.field.workers, 2)
+
+            # paths 1 and 4 are the same. the longest path is assigned first.
+            self.assertEqual(tst.field.num_paths, 3)
+            self.assertEqual(tst.field.path_idxs, [[1], [0, 2]])
+        finally:
+            tst.field.close()
+
+        # serial
+        tst = self.add_instance({'parallel-paths': {'workers': 1}})
+        self.assertIsNone(tst.field)
+
+        # paths aren't simulated in enhanced mode, so no pool is started
+        tst = self.add_instance({'parallel-paths': {'workers': 2}, 'simulation-mode': 'enhanced'})
+        self.assertIsNone(tst.field)
+
+        self.assertRaises(ValueError, lambda: self.add_instance({'parallel-paths': {'workers': 2},
+                                                                 'field-engine': 'vectorized'}))
+
+    def test_init_no_shared_memory(self):
+        # as on Python versions before 3.8
+        with mock.patch.dict(sys.modules, {'multiprocessing.shared_memory': None}):
+            self.assertRaises(ImportError, lambda: self.add_instance({'parallel-paths': {'workers': 2}}))
+
+            # no workers are needed
+            tst = self.add_instance({'parallel-paths': {'workers': 1}})
+            self.assertIsNone(tst.field)
+
+    @unittest.skipIf(shared_memory_missing, 'shared memory requires Python 3.8')
+    def test_simulate_time_step(self):
+        tst_serial = self.add_instance()
+        tst = self.add_instance({'parallel-paths': {'workers': 2}})
+
+        try:
+            for idx in range(40):
+                inputs = SimulationResponse(idx * 30, 30, 0.3, 20 + 5 * np.sin(idx / 10))
+                res_serial = tst_serial.simulate_time_step(inputs)
+                res = tst.simulate_time_step(inputs)
+
+                # the same operations run in the workers, so the results are the same
+                self.assertEqual(res_serial.temperature, res.temperature)
+                self.assertEqual(tst_serial.heat_rate_bh, tst.heat_rate_bh)
+
+            self.assertEqual(tst_serial.report_outputs(), tst.report_outputs())
+        finally:
+            tst.field.close()
+
+    @unittest.skipIf(shared_memory_missing, 'shared memory requires Python 3.8')
+    def test_simulate_time_step_worker_stopped(self):
+        tst = self.add_instance({'parallel-paths': {'workers': 2}})
+        field = tst.field
+
+        try:
+            tst.simulate_time_step(SimulationResponse(0, 30, 0.3, 20))
+
+            # worker 0 holds path 2
+            field.procs[0].terminate()
+            field.procs[0].join()
+
+            with self.assertRaises(RuntimeError) as cm:
+                tst.simulate_time_step(SimulationResponse(30, 30, 0.3, 20))
+            self.assertIn('Path worker 0', str(cm.exception))
+            self.assertIn('PATH 2', str(cm.exception))
+
+            # the pool is shut down
+            self.assertFalse(any(proc.is_alive() for proc in field.procs))
+            self.assertFalse(field.finalizer.alive)
+        finally:
+            field.close()
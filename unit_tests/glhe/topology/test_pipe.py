@@ -1,7 +1,8 @@
 import os
 import tempfile
 import unittest
-from math import log
+
+import numpy as np
 
 from glhe.input_processor.input_processor import InputProcessor
 from glhe.interface.response import SimulationResponse
@@ -93,13 +94,13 @@ class TestPipe(unittest.TestCase):
 
         # turbulent tests
         re = 5000
-        self.assertEqual(tst.calc_friction_factor(re), (0.79 * log(re) - 1.64) ** (-2.0))
+        self.assertEqual(tst.calc_friction_factor(re), (0.79 * np.log(re) - 1.64) ** (-2.0))
 
         re = 15000
-        self.assertEqual(tst.calc_friction_factor(re), (0.79 * log(re) - 1.64) ** (-2.0))
+        self.assertEqual(tst.calc_friction_factor(re), (0.79 * np.log(re) - 1.64) ** (-2.0))
 
         re = 25000
-        self.assertEqual(tst.calc_friction_factor(re), (0.79 * log(re) - 1.64) ** (-2.0))
+        self.assertEqual(tst.calc_friction_factor(re), (0.79 * np.log(re) - 1.64) ** (-2.0))
 
     def test_calc_conduction_resistance(self):
         tst = self.add_instance()
@@ -138,6 +139,39 @@ class TestPipe(unittest.TestCase):
         self.assertAlmostEqual(tst.turbulent_nusselt(3000, 20), 18.39, delta=tol)
         self.assertAlmostEqual(tst.turbulent_nusselt(10000, 20), 79.52, delta=tol)
 
+    def test_smooth_nusselt_array(self):
+        tst = self.add_instance()
+        re = np.array([0, 100, 1800, 2500, 3500, 4500, 10000])
+        pr = tst.fluid.get_pr(20)
+
+        # arrays give the same values as the scalar methods, to round-off
+        f = Pipe.smooth_friction_factor(re[1:])
+        nu = Pipe.smooth_nusselt(re, pr)
+        np.testing.assert_allclose(f, [tst.calc_friction_factor(val) for val in re[1:]], rtol=1e-14)
+        np.testing.assert_allclose(nu, [Pipe.smooth_nusselt(val, pr) for val in re], rtol=1e-14)
+        self.assertEqual(nu[0], tst.laminar_nusselt())
+        self.assertAlmostEqual(nu[-1], tst.turbulent_nusselt(10000, 20), delta=1e-12)
+
+    def test_solve_mixed_cells(self):
+        cell_temps = np.array([[20.0, 21.0, 22.0, 23.0], [15.0, 16.0, 17.0, 18.0]])
+        v_dot = np.array([1e-4, 2e-4])
+        v_n_dt = np.array([5e-4, 1e-4])
+        inlet_temps = np.array([30.0, 10.0])
+
+        # several pipes at once give the same values as one at a time
+        res = Pipe.solve_mixed_cells(cell_temps, inlet_temps, v_dot, v_n_dt)
+        for idx in range(2):
+            res_1 = Pipe.solve_mixed_cells(cell_temps[idx], inlet_temps[idx], v_dot[idx], v_n_dt[idx])
+            np.testing.assert_array_equal(res[idx], res_1)
+
+            # cell energy balances
+            c = cell_temps[idx]
+            self.assertEqual(res_1[0], inlet_temps[idx])
+            np.testing.assert_allclose(v_n_dt[idx] * (res_1[1:] - c[1:]), v_dot[idx] * (res_1[:-1] - res_1[1:]),
+                                       atol=1e-15)
+
+        self.assertEqual(cell_temps[0, 0], 20)
+
     def test_log_inlet_temps(self):
         tst = self.add_instance()
         self.assertEqual(tst.inlet_temps[0], 20)
@@ -1,15 +1,20 @@
+import os
 import unittest
 
-from math import pi
+import numpy as np
+
+from math import log, pi
 
 from glhe.topology.radial_numerical_borehole import RadialCell
+from glhe.topology.radial_numerical_borehole import RadialCellType
 from glhe.topology.radial_numerical_borehole import RadialNumericalBH
+from glhe.topology.radial_numerical_borehole import RadialNumericalBHBatch
 
 
 class TestRadialNumericalBH(unittest.TestCase):
 
     @staticmethod
-    def add_instance():
+    def get_inputs(options=None):
         d = {'pipe-outer-diameter': 0.02670,
              'pipe-inner-diameter': 0.02184,
              'diameter': 0.109982,
@@ -26,7 +31,13 @@ class TestRadialNumericalBH(unittest.TestCase):
              'soil-density': 1500,
              'length': 100}
 
-        return RadialNumericalBH(d)
+        if options:
+            d.update(options)
+
+        return d
+
+    def add_instance(self, options=None):
+        return RadialNumericalBH(self.get_inputs(options))
 
     def test_init(self):
 
@@ -70,3 +81,211 @@ class TestRadialNumericalBH(unittest.TestCase):
 
         self.assertAlmostEqual(lntts_2[0], -16.00, delta=tol)
         self.assertAlmostEqual(lntts_2[-1], -9.42, delta=tol)
+
+    def test_assemble(self):
+        tst = self.add_instance()
+        num_cells = len(tst.cells)
+        self.assertEqual(tst.conductances.size, num_cells - 1)
+        self.assertEqual(tst.capacitances.size, num_cells)
+
+        # conductance between two soil cells
+        west = tst.cells[-2]
+        east = tst.cells[-1]
+        resist_1 = log(west.outer_radius / west.center_radius) / (2 * pi * west.conductivity)
+        resist_2 = log(east.center_radius / east.inner_radius) / (2 * pi * east.conductivity)
+        self.assertAlmostEqual(tst.conductances[-1], 1 / (resist_1 + resist_2), delta=1e-9)
+        self.assertAlmostEqual(tst.capacitances[-1], east.rho_cp * east.volume, delta=1e-9)
+
+    def test_factorize(self):
+        tst = self.add_instance()
+        tst.factorize(120)
+        factorization = tst.factorization
+
+        # reused for the same time step
+        tst.factorize(120)
+        self.assertIs(tst.factorization, factorization)
+
+        tst.factorize(60)
+        self.assertIsNot(tst.factorization, factorization)
+        self.assertEqual(tst.factorization_time_step, 60)
+
+    def test_mesh_arrays(self):
+        tst = self.add_instance()
+        self.assertEqual(tst.num_cells, 535)
+
+        for arr in [tst.inner_radius, tst.center_radius, tst.outer_radius, tst.thickness, tst.conductivity,
+                    tst.rho_cp, tst.volume, tst.temperature]:
+            self.assertEqual(arr.shape, (535,))
+            self.assertEqual(arr.dtype, float)
+            self.assertTrue(arr.flags['C_CONTIGUOUS'])
+
+        # cells are contiguous
+        np.testing.assert_allclose(tst.outer_radius[3:-1], tst.inner_radius[4:], atol=1e-12)
+
+        # interface index
+        self.assertEqual(tst.idx_bh_wall, 34)
+        self.assertEqual(tst.cell_types[tst.idx_bh_wall], RadialCellType.GROUT)
+        self.assertEqual(tst.cell_types[tst.idx_bh_wall + 1], RadialCellType.SOIL)
+
+        # cell views read and write the mesh arrays
+        cell = tst.cells[10]
+        self.assertEqual(cell.conductivity, tst.conductivity[10])
+        cell.temperature = 25
+        self.assertEqual(tst.temperature[10], 25)
+
+        # views are only built once
+        self.assertIs(tst.cells, tst.cells)
+        self.assertIs(tst.cells[10], cell)
+        self.assertFalse(hasattr(cell, 'prev_temperature'))
+
+    def test_calc_bh_wall_weights(self):
+        tst = self.add_instance()
+        idx, w_west, w_east = tst.calc_bh_wall_weights()
+        self.assertEqual(tst.cells[idx].type, RadialCellType.GROUT)
+        self.assertEqual(tst.cells[idx + 1].type, RadialCellType.SOIL)
+        self.assertAlmostEqual(w_west + w_east, 1, delta=1e-12)
+
+    def test_calc_geometric_thickness(self):
+        thickness = RadialNumericalBH.calc_geometric_thickness(10, 0.01, 40)
+        self.assertEqual(thickness.size, 40)
+        self.assertAlmostEqual(np.sum(thickness), 10, delta=1e-9)
+        self.assertAlmostEqual(thickness[0], 0.01, delta=1e-6)
+
+        # constant growth ratio
+        ratios = thickness[1:] / thickness[:-1]
+        np.testing.assert_allclose(ratios, ratios[0], rtol=1e-9)
+        self.assertGreater(ratios[0], 1)
+
+        # falls back to uniform cells
+        np.testing.assert_allclose(RadialNumericalBH.calc_geometric_thickness(1, 0.1, 20), 0.05, rtol=1e-12)
+
+    def test_geometric_mesh(self):
+        tst = self.add_instance({'soil-mesh': 'geometric', 'number-soil-cells': 50})
+        self.assertEqual(tst.num_cells, 85)
+
+        # cells are contiguous out to the far field boundary
+        np.testing.assert_allclose(tst.outer_radius[3:-1], tst.inner_radius[4:], atol=1e-12)
+        self.assertAlmostEqual(tst.outer_radius[-1], 10, delta=1e-9)
+
+        # first soil cell matches the grout cells
+        idx = tst.idx_bh_wall
+        self.assertAlmostEqual(tst.thickness[idx + 1], tst.thickness[idx], delta=1e-9)
+
+        self.assertRaises(ValueError, lambda: self.add_instance({'soil-mesh': 'random'}))
+        self.assertRaises(ValueError, lambda: self.add_instance({'time-stepping': 'random'}))
+
+    def test_calc_sts_g_functions_adaptive(self):
+        options = {'soil-mesh': 'geometric', 'time-stepping': 'adaptive'}
+
+        ref_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'validation',
+                                'Radial_Numerical_BH', 'GLHEPro_g-vals.csv')
+        ref = np.genfromtxt(ref_path, delimiter=',', skip_header=1)
+        ref = ref[~np.isnan(ref).any(axis=1)]
+
+        base = self.add_instance()
+        lntts_base, g_base = base.calc_sts_g_functions()
+
+        tst = self.add_instance(options)
+        lntts, g = tst.calc_sts_g_functions()
+
+        # far fewer cells and time steps
+        self.assertLess(tst.num_cells, base.num_cells / 5)
+        self.assertLess(lntts.size, lntts_base.size / 5)
+
+        # same range, with increasing ln(t/ts) values
+        self.assertAlmostEqual(lntts[0], lntts_base[0], delta=1e-9)
+        self.assertAlmostEqual(lntts[-1], lntts_base[-1], delta=0.01)
+        self.assertTrue(np.all(np.diff(lntts) > 0))
+
+        # ln(t/ts) values are no further apart than the maximum step, once past the minimum time step
+        time_steps = np.diff(np.exp(lntts) * tst.t_s)
+        self.assertLessEqual(np.max(np.diff(lntts)[time_steps > 120 + 1e-6]), 0.1 + 1e-9)
+
+        # close to the uniform mesh, fixed time step solution
+        np.testing.assert_allclose(np.interp(lntts_base, lntts, g), g_base, atol=0.03)
+
+        # within a set deviation of the GLHEPro reference
+        mask = (ref[:, 0] >= lntts[0]) & (ref[:, 0] <= lntts[-1])
+        deviation = np.abs(np.interp(ref[mask, 0], lntts, g) - ref[mask, 1])
+        self.assertLess(np.max(deviation), 0.21)
+
+        # at the borehole wall
+        tst = self.add_instance(options)
+        lntts, g = tst.calc_sts_g_functions(calculate_at_bh_wall=True)
+
+        base = self.add_instance()
+        lntts_base, g_base = base.calc_sts_g_functions(calculate_at_bh_wall=True)
+
+        self.assertLess(lntts.size, lntts_base.size / 5)
+        self.assertAlmostEqual(g[-1], 2.05, delta=0.02)
+        np.testing.assert_allclose(np.interp(lntts_base, lntts, g), g_base, atol=0.03)
+
+
+class TestRadialNumericalBHBatch(unittest.TestCase):
+
+    @staticmethod
+    def get_inputs(options=None):
+        return TestRadialNumericalBH.get_inputs(options)
+
+    soil = [{'soil-conductivity': 2.0, 'soil-density': 1500, 'soil-specific-heat': 1562},
+            {'soil-conductivity': 2.432, 'soil-density': 2000, 'soil-specific-heat': 800},
+            {'soil-conductivity': 3.2, 'soil-density': 1800, 'soil-specific-heat': 1000}]
+
+    def add_instance(self, options=None):
+        return RadialNumericalBHBatch([self.get_inputs(dict(d, **(options or {}))) for d in self.soil])
+
+    def test_init(self):
+        tst = self.add_instance()
+        self.assertEqual(tst.num_models, 3)
+        self.assertEqual(tst.capacitances.shape, (3, 535))
+        self.assertEqual(tst.conductances.shape, (3, 534))
+
+        self.assertRaises(ValueError, lambda: RadialNumericalBHBatch([]))
+
+        mixed = [self.get_inputs(), self.get_inputs({'soil-mesh': 'geometric'})]
+        self.assertRaises(ValueError, lambda: RadialNumericalBHBatch(mixed))
+
+    def test_single_model(self):
+        for options in [None, {'soil-mesh': 'geometric', 'time-stepping': 'adaptive'}]:
+            for at_wall in [False, True]:
+                tst = RadialNumericalBHBatch([self.get_inputs(options)])
+                lntts, g = tst.calc_sts_g_functions(calculate_at_bh_wall=at_wall)
+
+                ref = RadialNumericalBH(self.get_inputs(options))
+                lntts_ref, g_ref = ref.calc_sts_g_functions(calculate_at_bh_wall=at_wall)
+
+                self.assertEqual(g.shape, (1, lntts_ref.size))
+                np.testing.assert_allclose(lntts, lntts_ref, atol=1e-6)
+                np.testing.assert_allclose(g[0], g_ref, atol=1e-6)
+
+    def test_calc_sts_g_functions(self):
+        options = {'soil-mesh': 'geometric'}
+        tst = self.add_instance(options)
+        lntts, g = tst.calc_sts_g_functions()
+        self.assertEqual(g.shape, (3, lntts.size))
+
+        # no model exceeds the minimum time step
+        time_steps = np.exp(lntts[0]) * tst.t_s
+        self.assertAlmostEqual(np.max(time_steps), 120, delta=1e-6)
+
+        # each model is the same as running it alone with its time step
+        for idx, soil in enumerate(self.soil):
+            ref = RadialNumericalBH(self.get_inputs(dict(soil, **options, **{'min-time-step': time_steps[idx]})))
+            lntts_ref, g_ref = ref.calc_sts_g_functions(final_time=(lntts.size + 1) * time_steps[idx])
+            np.testing.assert_allclose(lntts_ref, lntts, atol=1e-9)
+            np.testing.assert_allclose(g_ref, g[idx], atol=1e-9)
+
+    def test_calc_sts_g_functions_adaptive(self):
+        options = {'soil-mesh': 'geometric', 'time-stepping': 'adaptive'}
+        tst = self.add_instance(options)
+        lntts, g = tst.calc_sts_g_functions(calculate_at_bh_wall=True)
+        self.assertEqual(g.shape, (3, lntts.size))
+        self.assertTrue(np.all(np.diff(lntts) > 0))
+
+        # close to running each model alone
+        ref = self.add_instance({'soil-mesh': 'geometric'})
+        lntts_ref, g_ref = ref.calc_sts_g_functions(calculate_at_bh_wall=True)
+        self.assertLess(lntts.size, lntts_ref.size / 5)
+
+        for idx in range(3):
+            np.testing.assert_allclose(np.interp(lntts_ref, lntts, g[idx]), g_ref[idx], atol=0.03)
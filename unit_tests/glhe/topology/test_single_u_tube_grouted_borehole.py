@@ -3,6 +3,9 @@ import sys
 import tempfile
 import unittest
 
+import numpy as np
+from jsonschema.exceptions import ValidationError
+
 from glhe.input_processor.input_processor import InputProcessor
 from glhe.interface.response import SimulationResponse
 from glhe.output_processor.output_processor import OutputProcessor
@@ -58,6 +61,10 @@ class TestSingleUTubeGroutedBorehole(unittest.TestCase):
                 'specific-heat': 1000}]
         }
 
+        for key in ['integration-method', 'solution-method']:
+            if key in inputs:
+                d['borehole-definitions'][0][key] = inputs[key]
+
         temp_dir = tempfile.mkdtemp()
         temp_file = os.path.join(temp_dir, 'temp.json')
         write_json(temp_file, d)
@@ -4587,12 +4594,81 @@ class TestSingleUTubeGroutedBorehole(unittest.TestCase):
             self.assertAlmostEqual(tst.theta_2, 9.0, delta=tolerance)
             self.assertAlmostEqual(tst.calc_bh_grout_resistance(20, pipe_resist=0.05), 0.04812, delta=tolerance)
 
+    def test_init_integration_method(self):
+        tst = self.add_instance()
+        self.assertEqual(tst.segments[0].integration_method, 'solve-ivp')
+
+        tst = self.add_instance({'radius': 0.048,
+                                 'shank-spacing': 0.032,
+                                 'soil-conductivity': 4.0,
+                                 'grout-conductivity': 0.6,
+                                 'integration-method': 'expm'})
+        self.assertEqual(tst.segments[0].integration_method, 'expm')
+
     def test_calc_bh_resistance(self):
         tolerance = 0.00001
         tst = self.add_instance()
         self.assertAlmostEqual(tst.calc_bh_effective_resistance_uhf(20, flow_rate=0.5), 0.21629, delta=tolerance)
 
+    def test_multipole_resistances_array(self):
+        tst = self.add_instance()
+        temps = [5, 20, 35]
+        flow_rates = [0.05, 0.2, 0.5]
+
+        r_12 = []
+        r_b = []
+        betas = []
+        for temp, flow_rate in zip(temps, flow_rates):
+            r_12_i, r_b_i = tst.calc_direct_coupling_resistance(temp, flow_rate=flow_rate)
+            r_12.append(r_12_i)
+            r_b.append(r_b_i)
+            betas.append(tst.beta)
+
+        # arrays of conditions give the same values as the borehole methods
+        beta = np.array(betas)
+        r_a = SingleUTubeGroutedBorehole.multipole_total_internal_resistance(beta, tst.theta_1, tst.theta_3,
+                                                                             tst.sigma, tst.grout.conductivity)
+        r_b_arr = SingleUTubeGroutedBorehole.multipole_average_resistance(beta, tst.theta_1, tst.theta_2,
+                                                                          tst.theta_3, tst.sigma,
+                                                                          tst.grout.conductivity)
+        np.testing.assert_array_equal(r_b_arr, r_b)
+        np.testing.assert_array_equal(SingleUTubeGroutedBorehole.direct_coupling_resistance(r_a, r_b_arr), r_12)
+
+        # negative direct-coupling resistances are reset
+        self.assertEqual(SingleUTubeGroutedBorehole.direct_coupling_resistance(1, 0.1), 70)
+
     def test_simulate_time_step(self):
         tst = self.add_instance()
         ret = tst.simulate_time_step(SimulationResponse(0, 10, 0.2, 30, 20))
         self.assertAlmostEqual(ret.temperature, 20)
+
+    def test_simulate_time_step_coupled(self):
+        inputs = {'radius': 0.048,
+                  'shank-spacing': 0.032,
+                  'soil-conductivity': 4.0,
+                  'grout-conductivity': 0.6}
+
+        tst = self.add_instance(dict(inputs, **{'solution-method': 'coupled'}))
+        ref = self.add_instance(dict(inputs, **{'integration-method': 'expm'}))
+        self.assertEqual(tst.solution_method, 'coupled')
+
+        for idx in range(100):
+            ret = tst.simulate_time_step(SimulationResponse(idx * 600, 600, 0.2, 30, 20))
+            ret_ref = ref.simulate_time_step(SimulationResponse(idx * 600, 600, 0.2, 30, 20))
+
+        # same steady state as the iterative solution
+        self.assertAlmostEqual(ret.temperature, ret_ref.temperature, delta=0.001)
+        self.assertAlmostEqual(tst.heat_rate, tst.heat_rate_bh, delta=1)
+        for seg, seg_ref in zip(tst.segments[:-1], ref.segments[:-1]):
+            np.testing.assert_allclose(seg.y, seg_ref.y, atol=0.001)
+
+        # segment inlets are the neighboring segment outlets
+        for idx in range(1, tst.num_segments):
+            self.assertEqual(tst.segments[idx].inlet_temp_1, tst.segments[idx - 1].outlet_temp_1)
+            self.assertEqual(tst.segments[idx - 1].inlet_temp_2, tst.segments[idx].outlet_temp_2)
+
+        last = tst.segments[tst.num_segments - 1]
+        self.assertEqual(last.inlet_temp_2, last.outlet_temp_1)
+        self.assertEqual(tst.segments[-1].temperature, last.outlet_temp_1)
+
+        self.assertRaises(ValidationError, lambda: self.add_instance(dict(inputs, **{'solution-method': 'direct'})))
@@ -2,6 +2,10 @@ import os
 import tempfile
 import unittest
 
+import numpy as np
+from scipy.integrate import solve_ivp
+from scipy.linalg import expm
+
 from glhe.input_processor.input_processor import InputProcessor
 from glhe.output_processor.output_processor import OutputProcessor
 from glhe.topology.single_u_tube_grouted_segment import SingleUTubeGroutedSegment
@@ -11,7 +15,7 @@ from glhe.utilities.functions import write_json
 class TestSingleUTubeGroutedSegment(unittest.TestCase):
 
     @staticmethod
-    def add_instance():
+    def add_instance(integration_method=None):
         d = {
             'fluid': {'fluid-type': 'water'},
 
@@ -50,6 +54,9 @@ class TestSingleUTubeGroutedSegment(unittest.TestCase):
                  'grout-def-name': 'standard grout',
                  'pipe-def-name': '32 mm sdr-11 hdpe'}
 
+        if integration_method:
+            d_seg['integration-method'] = integration_method
+
         return SingleUTubeGroutedSegment(d_seg, ip, op)
 
     def test_volume(self):
@@ -76,3 +83,127 @@ class TestSingleUTubeGroutedSegment(unittest.TestCase):
         self.assertAlmostEqual(ret_temps[1], 20.2262, delta=tol)
         self.assertAlmostEqual(ret_temps[2], 20.0000, delta=tol)
         self.assertAlmostEqual(ret_temps[3], 20.0005, delta=tol)
+
+    def test_calc_system_matrices(self):
+        tst = self.add_instance()
+        inputs = {'boundary-temperature': 20,
+                  'inlet-1-temp': 30,
+                  'inlet-2-temp': 25,
+                  'flow-rate': 0.2,
+                  'rb': 0.16,
+                  'dc-resist': 2.28}
+        tst.simulate_time_step(1, inputs)
+
+        # same as the right hand side of the node equations
+        a, b = tst.calc_system_matrices()
+        y = np.array([24, 22, 21, 20.5, 20.2])
+        np.testing.assert_allclose(a.dot(y) + b.dot([30, 25, 20]), tst.right_hand_side(0, y), rtol=1e-12)
+
+    def test_get_propagators(self):
+        tst = self.add_instance('expm')
+        inputs = {'boundary-temperature': 20,
+                  'inlet-1-temp': 30,
+                  'inlet-2-temp': 25,
+                  'flow-rate': 0.2,
+                  'rb': 0.16,
+                  'dc-resist': 2.28,
+                  'fluid-cp': 4000,
+                  'fluid-heat-capacity': 4e6}
+        tst.simulate_time_step(120, inputs)
+
+        # same as the matrix exponential of the augmented system
+        a, b = tst.calc_system_matrices()
+        m = np.zeros((8, 8))
+        m[:5, :5] = a
+        m[:5, 5:] = b
+        e = expm(m * 120)
+
+        phi, gamma = tst.get_propagators(120)
+        np.testing.assert_allclose(phi, e[:5, :5], atol=1e-10)
+        np.testing.assert_allclose(gamma, e[:5, 5:], atol=1e-10)
+
+        # reused for the same inputs
+        self.assertIs(tst.get_propagators(120)[0], phi)
+        self.assertEqual(len(tst.propagator_cache), 1)
+
+        tst.get_propagators(60)
+        self.assertEqual(len(tst.propagator_cache), 2)
+
+        # reused when the fluid properties only change slightly with the inlet temperature
+        tst.simulate_time_step(120, dict(inputs, **{'fluid-cp': 4000.01, 'fluid-heat-capacity': 4.00001e6}))
+        self.assertIs(tst.get_propagators(120)[0], phi)
+        self.assertEqual(len(tst.propagator_cache), 2)
+
+        tst.simulate_time_step(120, dict(inputs, **{'fluid-cp': 4100}))
+        self.assertIsNot(tst.get_propagators(120)[0], phi)
+        self.assertEqual(len(tst.propagator_cache), 3)
+
+    def test_simulate_time_step_exact(self):
+        inputs = {'boundary-temperature': 20,
+                  'inlet-1-temp': 30,
+                  'inlet-2-temp': 25,
+                  'flow-rate': 0.2,
+                  'rb': 0.16,
+                  'dc-resist': 2.28,
+                  'fluid-cp': 4000,
+                  'fluid-heat-capacity': 4e6}
+
+        tst = self.add_instance('expm')
+        ref = self.add_instance()
+        self.assertEqual(tst.integration_method, 'expm')
+        self.assertEqual(ref.integration_method, 'solve-ivp')
+
+        y_0 = tst.y.copy()
+        ret_temps = tst.simulate_time_step(300, inputs)
+        ref_temps = ref.simulate_time_step(300, inputs)
+
+        # tightly integrated solution
+        ret = solve_ivp(ref.right_hand_side, [0, 300], y_0, method='LSODA', rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(ret_temps, ret.y[:, -1], atol=1e-8)
+        np.testing.assert_allclose(ref_temps, ret.y[:, -1], atol=0.1)
+
+        self.assertRaises(ValueError, lambda: self.add_instance('rk4'))
+
+    def test_simulate_time_step_exact_reused(self):
+        tst = self.add_instance('expm')
+        ref = self.add_instance()
+
+        # the fluid properties and resistances change slightly every time step
+        y = tst.y.copy()
+        for idx in range(200):
+            inputs = {'boundary-temperature': 20,
+                      'inlet-1-temp': 30 + 0.01 * idx,
+                      'inlet-2-temp': 25 + 0.01 * idx,
+                      'flow-rate': 0.2,
+                      'rb': 0.16 + 1e-6 * idx,
+                      'dc-resist': 2.28}
+
+            ret_temps = tst.simulate_time_step(120, inputs)
+
+            # tightly integrated solution
+            ref.set_inputs(inputs)
+            ret = solve_ivp(ref.right_hand_side, [0, 120], y, method='LSODA', rtol=1e-12, atol=1e-12)
+            y = ret.y[:, -1]
+
+            # reused propagators are within the resolution of the exact ones
+            np.testing.assert_allclose(ret_temps, y, atol=1e-4)
+
+        # most time steps reuse a propagator
+        self.assertLess(len(tst.propagator_cache), 100)
+
+    def test_set_inputs(self):
+        tst = self.add_instance()
+        inputs = {'boundary-temperature': 20,
+                  'inlet-1-temp': 30,
+                  'inlet-2-temp': 25,
+                  'flow-rate': 0.2,
+                  'rb': 0.16,
+                  'dc-resist': 2.28}
+
+        tst.set_inputs(inputs)
+        self.assertAlmostEqual(tst.fluid_cp, tst.fluid.get_cp(30), delta=1e-9)
+
+        # given fluid properties are used as they are
+        tst.set_inputs(dict(inputs, **{'fluid-cp': 4000, 'fluid-heat-capacity': 4e6}))
+        self.assertEqual(tst.fluid_cp, 4000)
+        self.assertEqual(tst.fluid_heat_capacity, 4e6)
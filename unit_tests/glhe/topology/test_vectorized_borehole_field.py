@@ -0,0 +1,165 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from glhe.input_processor.input_processor import InputProcessor
+from glhe.interface.response import SimulationResponse
+from glhe.output_processor.output_processor import OutputProcessor
+from glhe.topology.ground_heat_exchanger_short_time_step import GroundHeatExchangerSTS
+from glhe.topology.pipe import Pipe
+from glhe.topology.vectorized_borehole_field import VectorizedBoreholeField
+from glhe.topology.vectorized_borehole_field import VectorizedPipes
+from glhe.utilities.functions import write_json
+
+join = os.path.join
+norm = os.path.normpath
+
+
+class TestVectorizedBoreholeField(unittest.TestCase):
+
+    @staticmethod
+    def get_inputs(num_paths=3, field_engine=None, bh_options=None):
+        f_path = os.path.dirname(os.path.abspath(__file__))
+
+        bh_def_1 = {"borehole-type": "single-grouted",
+                    "length": 76.2,
+                    "diameter": 0.114,
+                    "grout-def-name": "standard grout",
+                    "name": "borehole type 1",
+                    "pipe-def-name": "26 mm SDR-11 HDPE",
+                    "segments": 4,
+                    "shank-spacing": 0.0469,
+                    "integration-method": "expm"}
+
+        bh_def_2 = dict(bh_def_1, **{"name": "borehole type 2",
+                                     "length": 100,
+                                     "shank-spacing": 0.05})
+
+        if bh_options:
+            bh_def_1.update(bh_options)
+            bh_def_2.update(bh_options)
+
+        boreholes = []
+        paths = []
+        for idx in range(num_paths):
+            name = "bh {}".format(idx + 1)
+            boreholes.append({"name": name,
+                              "borehole-def-name": "borehole type {}".format(idx % 2 + 1),
+                              "location": {"x": 5 * idx, "y": 0, "z": 0}})
+            paths.append({"name": "path {}".format(idx + 1),
+                          "components": [{"comp-type": "borehole", "name": name}]})
+
+        ghe = {"name": "GHE 1",
+               "simulation-mode": "direct",
+               "g-function-path": join(f_path, '..', '..', '..', 'validation', 'MFRTRT_EWT_g_functions',
+                                       'EWT_experimental_g_functions.csv'),
+               "flow-paths": paths,
+               "load-aggregation": {"method": "dynamic",
+                                    "expansion-rate": 1.5,
+                                    "number-bins-per-level": 9}}
+
+        if field_engine:
+            ghe["field-engine"] = field_engine
+
+        return {"borehole-definitions": [bh_def_1, bh_def_2],
+                "borehole": boreholes,
+                "fluid": {"fluid-type": "water"},
+                "ground-temperature-model": {"ground-temperature-model-type": "constant",
+                                             "temperature": 16.1},
+                "grout-definitions": [{"name": "standard grout",
+                                       "conductivity": 0.85,
+                                       "density": 2500,
+                                       "specific-heat": 1560}],
+                "ground-heat-exchanger": [ghe],
+                "pipe-definitions": [{"name": "26 mm SDR-11 HDPE",
+                                      "outer-diameter": 0.0267,
+                                      "inner-diameter": 0.0218,
+                                      "conductivity": 0.39,
+                                      "density": 950,
+                                      "specific-heat": 1900}],
+                "simulation": {"name": "Basic GLHE",
+                               "initial-temperature": 16.1,
+                               "time-step": 30,
+                               "runtime": 3600},
+                "soil": {"name": "dirt",
+                         "conductivity": 2.7,
+                         "density": 2500,
+                         "specific-heat": 880}}
+
+    def add_instance(self, num_paths=3, field_engine=None, bh_options=None):
+        d = self.get_inputs(num_paths, field_engine, bh_options)
+
+        temp_dir = tempfile.mkdtemp()
+        temp_file = join(temp_dir, 'temp.json')
+        write_json(temp_file, d)
+
+        ip = InputProcessor(temp_file)
+        op = OutputProcessor(temp_dir, 'out.csv')
+        return GroundHeatExchangerSTS(d['ground-heat-exchanger'][0], ip, op)
+
+    def test_init(self):
+        tst = self.add_instance(field_engine='vectorized')
+        self.assertIsInstance(tst.field, VectorizedBoreholeField)
+
+        # boreholes 1 and 3 are the same, so only one of them is simulated
+        self.assertEqual(tst.path_multiplicity.tolist(), [2, 1])
+        self.assertEqual(tst.field.y.shape, (2, 4, 5))
+        self.assertEqual(tst.field.pipes_1.cell_temps.shape, (2, 16))
+
+        tst = self.add_instance()
+        self.assertIsNone(tst.field)
+
+    def test_init_not_supported(self):
+        self.assertRaises(ValueError, lambda: self.add_instance(field_engine='vectorized',
+                                                                bh_options={'solution-method': 'coupled'}))
+        self.assertRaises(ValueError, lambda: self.add_instance(field_engine='vectorized',
+                                                                bh_options={'integration-method': 'solve-ivp'}))
+
+    def test_simulate_time_step(self):
+        tst_obj = self.add_instance()
+        tst_vec = self.add_instance(field_engine='vectorized')
+
+        for idx in range(80):
+            # the low flow rate makes the pipe transit time longer than the time step
+            flow_rate = 0.3 if idx < 40 else 0.05
+            inlet_temp = 20 + 5 * np.sin(idx / 10)
+            inputs = SimulationResponse(idx * 30, 30, flow_rate, inlet_temp)
+
+            res_obj = tst_obj.simulate_time_step(inputs)
+            res_vec = tst_vec.simulate_time_step(inputs)
+
+            self.assertAlmostEqual(res_obj.temperature, res_vec.temperature, delta=1e-9)
+            self.assertAlmostEqual(tst_obj.heat_rate_bh, tst_vec.heat_rate_bh, delta=1e-7)
+
+        # report variables
+        d_obj = tst_obj.report_outputs()
+        d_vec = tst_vec.report_outputs()
+        self.assertEqual(sorted(d_obj.keys()), sorted(d_vec.keys()))
+        for key, val in d_obj.items():
+            self.assertAlmostEqual(val, d_vec[key], delta=1e-7, msg=key)
+
+    def test_pipes_simulate_time_step(self):
+        tst = self.add_instance()
+        ip = tst.ip
+        op = tst.op
+
+        pipe_inputs = {'pipe-def-name': '26 mm sdr-11 hdpe', 'name': 'pipe'}
+        pipes = [Pipe(dict(pipe_inputs, length=length), ip, op) for length in [10, 50, 100]]
+        tst_pipes = VectorizedPipes([Pipe(dict(pipe_inputs, length=length), ip, op) for length in [10, 50, 100]])
+        rows = np.arange(3)
+
+        for idx in range(100):
+            flow_rate = 0.3 if idx < 50 else 0.05
+            inlet_temp = 20 + 5 * np.sin(idx / 10)
+
+            temps = tst_pipes.simulate_time_step(rows, idx * 30, 30, flow_rate, np.full(3, inlet_temp))
+            for pipe, temp in zip(pipes, temps):
+                res = pipe.simulate_time_step(SimulationResponse(idx * 30, 30, flow_rate, inlet_temp))
+                self.assertAlmostEqual(res.temperature, temp, delta=1e-9)
+
+        np.testing.assert_allclose(tst_pipes.calc_resist(rows, 0.3, np.full(3, 20.0)),
+                                   [pipe.calc_resist(0.3, 20) for pipe in pipes], rtol=1e-12)
+        np.testing.assert_allclose(tst_pipes.calc_resist(rows, 0.05, np.full(3, 20.0)),
+                                   [pipe.calc_resist(0.05, 20) for pipe in pipes], rtol=1e-12)
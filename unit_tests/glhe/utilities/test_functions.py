@@ -13,6 +13,7 @@ from glhe.utilities.functions import hanby
 from glhe.utilities.functions import hr_to_sec
 from glhe.utilities.functions import kw_to_w
 from glhe.utilities.functions import lin_interp
+from glhe.utilities.functions import round_relative
 from glhe.utilities.functions import load_interp1d
 from glhe.utilities.functions import load_interp2d
 from glhe.utilities.functions import load_json
@@ -212,6 +213,12 @@ class TestFunctions(unittest.TestCase):
     def test_sec_to_hr(self):
         self.assertEqual(sec_to_hr(3600), 1)
 
+    def test_round_relative(self):
+        self.assertEqual(round_relative(0, 1e-4), 0)
+        self.assertAlmostEqual(round_relative(4181.34, 1e-3), 4181, delta=1e-9)
+        self.assertAlmostEqual(round_relative(0.1234567, 1e-3), 0.1235, delta=1e-12)
+        self.assertAlmostEqual(round_relative(-0.1234567, 1e-3), -0.1235, delta=1e-12)
+
     def test_lin_interp(self):
         self.assertEqual(lin_interp(0, 0, 2, 0, 2), 0)
         self.assertEqual(lin_interp(1, 0, 2, 0, 2), 1)